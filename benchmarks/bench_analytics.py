@@ -0,0 +1,72 @@
+"""Analytics throughput over a synthetic multi-year history.
+
+Writes daily inputs_YYYYMMDD.log files in the format Logger.log_input
+produces, then times `src.analytics` over them.
+
+Run from the repository root:
+    python -m benchmarks.bench_analytics --lines 2000000 --years 3
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from src.analytics import aggregate
+from src.storage.textlog import Entry, format_entry, inputs_filename
+
+WORDS = ['coffee', 'phone', 'snack', 'scroll', 'walk', 'tired', 'bored', 'stress', 'meeting', 'late']
+
+
+def write_history(logs_dir, lines, years, labels=5, seed=1):
+    """Write a synthetic history of the given size; return the bytes written."""
+    rng = random.Random(seed)
+    days = int(years * 365)
+    per_day = lines // days
+    start = time.mktime(time.localtime(time.time() - days * 86400)[:3] + (0, 0, 0, 0, 0, -1))
+    written = 0
+    for day in range(days):
+        day_start = start + day * 86400
+        count = per_day + (1 if day < lines % days else 0)
+        stamps = sorted(rng.uniform(0, 86399) for _ in range(count))
+        name = inputs_filename(time.strftime("%Y%m%d", time.localtime(day_start + 43200)))
+        with open(os.path.join(logs_dir, name), 'a', encoding='utf-8') as f:
+            for offset in stamps:
+                text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+                label = f"Label {rng.randint(1, labels)}" if rng.random() > 0.02 else None
+                line = format_entry(Entry(day_start + offset, label, text))
+                f.write(line)
+                written += len(line)
+    return written
+
+
+def main():
+    """Generate the history and time one aggregation pass."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=2000000)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--logs-dir', help="reuse or keep a history directory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logs_dir = args.logs_dir or tmp
+        os.makedirs(logs_dir, exist_ok=True)
+        if not os.listdir(logs_dir):
+            started = time.perf_counter()
+            size = write_history(logs_dir, args.lines, args.years)
+            print(f"generated {args.lines:,} lines ({size / 1e6:.1f} MB) "
+                  f"in {time.perf_counter() - started:.1f} s")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        rollup = aggregate(logs_dir, 'text')
+        elapsed = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"aggregated {rollup.total:,} entries in {elapsed:.2f} s "
+              f"({rollup.total / elapsed:,.0f} lines/s)")
+        print(f"peak RSS growth during aggregation: {(rss_after - rss_before) / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Per-keystroke filtering benchmark for the label catalog.
+
+Builds a catalog of generated label names with random usage, then types
+each query one character at a time (and deletes it again), timing every
+LabelCatalog.filter() call the search box would make.
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog --labels 1000
+Exits with status 1 when the p99 keystroke exceeds the frame budget.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from src.catalog import LabelCatalog
+from src.config import Label
+
+# One frame at 60 Hz
+FRAME_BUDGET_MS = 16.0
+
+WORDS = ['snack', 'phone', 'scroll', 'coffee', 'sugar', 'news', 'email', 'smoke',
+         'game', 'video', 'shopping', 'nap', 'check', 'social', 'late', 'night',
+         'morning', 'work', 'music', 'chat', 'drink', 'walk', 'stretch', 'read',
+         'doom', 'feed', 'reply', 'refresh', 'browse', 'binge', 'cookie', 'soda']
+QUERIES = ['snack', 'phn scr', 'coffee', 'dm', 'late night', 'xq', 'soc med', 'r', 'e']
+
+
+def make_labels(count, seed):
+    """Return count distinct Labels with two- to four-word names."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add(' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title())
+    return [Label(str(i) if i < 9 else None, name, name)
+            for i, name in enumerate(sorted(names))]
+
+
+def run(count, rounds, seed):
+    """Return (per keystroke durations in ms, build ms)."""
+    rng = random.Random(seed)
+    labels = make_labels(count, seed)
+    usage = {label.id: rng.expovariate(0.5) for label in labels if rng.random() < 0.3}
+    started = time.perf_counter()
+    catalog = LabelCatalog(labels, usage)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    durations = []
+    clock = time.perf_counter
+    for _ in range(rounds):
+        for query in QUERIES:
+            typed = [query[:i] for i in range(1, len(query) + 1)]
+            # Type the query, then delete it again character by character
+            for text in typed + typed[-2::-1] + ['']:
+                start = clock()
+                catalog.filter(text, 200)
+                durations.append((clock() - start) * 1000)
+    return durations, build_ms
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--labels', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=FRAME_BUDGET_MS)
+    args = parser.parse_args()
+
+    durations, build_ms = run(args.labels, args.rounds, args.seed)
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"Catalog of {args.labels} labels built in {build_ms:.2f} ms")
+    print(f"{len(durations)} keystrokes: mean {statistics.mean(durations):.3f} ms  "
+          f"p50 {statistics.median(durations):.3f} ms  p99 {p99:.3f} ms  max {ordered[-1]:.3f} ms")
+    if p99 > args.budget_ms:
+        print(f"p99 keystroke exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
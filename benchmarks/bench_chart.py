@@ -0,0 +1,97 @@
+"""History chart benchmark: pyramid build, reload and redraw queries.
+
+Counts a synthetic multi-year history into a fresh pyramid, saves and
+reloads it, then runs the queries a chart redraw makes for every label
+while zooming and panning between an hour and the whole history. Painting
+itself needs Qt and is not timed; the queries are the part that grows with
+the history.
+
+Run from the repository root:
+    python -m benchmarks.bench_chart --entries 3000000
+Exits with status 1 when the p99 redraw exceeds one 60 Hz frame.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from src.storage.pyramid import CountPyramid, local_seconds
+from src.storage.textlog import Entry
+
+FRAME_BUDGET_MS = 16.0
+LABELS = ['Label 1', 'Label 2', 'Label 3', 'Label 4', None]
+
+
+class _NoStore:
+    """Store stand-in for load(): every entry was already counted through add()."""
+
+    def iter_since(self, watermark):
+        return iter(())
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=3000000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--width', type=int, default=1200, help="plot width in pixels")
+    parser.add_argument('--redraws', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=FRAME_BUDGET_MS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    span = args.years * 365 * 86400
+    directory = os.path.join(tempfile.mkdtemp(prefix='urge-bench-chart-'), 'chart')
+
+    pyramid = CountPyramid(directory)
+    pyramid.load(_NoStore())
+    timestamps = sorted(now - rng.random() * span for _ in range(args.entries))
+    started = time.perf_counter()
+    for i, timestamp in enumerate(timestamps):
+        pyramid.add(Entry(timestamp, rng.choice(LABELS), ''), 'bench', i, i + 1)
+    elapsed = time.perf_counter() - started
+    print(f"Counted {args.entries} entries in {elapsed:.2f} s "
+          f"({elapsed / args.entries * 1e6:.2f} us per entry)")
+    started = time.perf_counter()
+    pyramid.close()
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"Saved in {(time.perf_counter() - started) * 1000:.0f} ms, {size / 1024:.0f} KB")
+
+    for i in range(100):
+        pyramid.add(Entry(now, 'Label 1', ''), 'bench', args.entries + i, args.entries + i + 1)
+    started = time.perf_counter()
+    pyramid.close()
+    print(f"Saved 100 new entries in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    pyramid = CountPyramid(directory)
+    started = time.perf_counter()
+    pyramid.load(_NoStore())
+    print(f"Reloaded in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    first, end = local_seconds(now - span), local_seconds(now)
+    durations = []
+    visible = end - first
+    for _ in range(args.redraws):
+        # Zoom by a random factor between an hour and the whole history, then pan
+        visible = min(max(visible * rng.choice([0.5, 0.8, 1.25, 2.0]), 3600), end - first)
+        start = first + rng.random() * (end - first - visible)
+        began = time.perf_counter()
+        for label in LABELS:
+            pyramid.series(label or '', start, start + visible, args.width)
+        durations.append((time.perf_counter() - began) * 1000)
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{len(durations)} redraws of {len(LABELS)} lines at {args.width} px: "
+          f"p50 {statistics.median(durations):.2f} ms  p99 {p99:.2f} ms  max {ordered[-1]:.2f} ms")
+    if p99 > args.budget_ms:
+        print(f"p99 redraw exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Columnar export/import benchmark.
+
+Writes a synthetic history of daily inputs logs, exports it to a columnar
+file, then imports that file into an empty logs directory and again into
+the same one. Throughput is reported next to a plain copy of the logs,
+the disk-bound floor. The imported logs must match the originals, and the
+second import must add nothing.
+
+Run from the repository root:
+    python -m benchmarks.bench_columnar --entries 1000000
+Exits with status 1 when the round trip loses or duplicates entries.
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_search import directory_size, write_history
+from src.storage.columnar import export_history, import_history
+from src.storage.textlog import iter_log_entries
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=3 * 365)
+    parser.add_argument('--jobs', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    root = tempfile.mkdtemp(prefix='urge-bench-columnar-')
+    logs_dir = os.path.join(root, 'logs')
+    os.makedirs(logs_dir)
+    # Generated in another process, so the peak memory below is the export and imports'
+    with ProcessPoolExecutor(1) as pool:
+        log_bytes = pool.submit(write_history, logs_dir, args.entries, args.days, rng).result()
+    megabytes = log_bytes / 1024 / 1024
+
+    started = time.perf_counter()
+    shutil.copytree(logs_dir, os.path.join(root, 'copy'))
+    elapsed = time.perf_counter() - started
+    print(f"Copied {megabytes:.1f} MB of logs in {elapsed:.2f} s ({megabytes / elapsed:.0f} MB/s)")
+
+    path = os.path.join(root, 'history.urgec')
+    started = time.perf_counter()
+    result = export_history(logs_dir, path, args.jobs)
+    elapsed = time.perf_counter() - started
+    print(f"Exported {result.entries} entries in {elapsed:.2f} s ({megabytes / elapsed:.0f} MB/s "
+          f"of logs, {elapsed / result.entries * 1e6:.2f} us per entry); "
+          f"{result.size / 1024 / 1024:.1f} MB in {result.blocks} blocks")
+
+    restored = os.path.join(root, 'restored')
+    for attempt in ("into an empty directory", "again"):
+        started = time.perf_counter()
+        imported = import_history(restored, path, args.jobs)
+        elapsed = time.perf_counter() - started
+        print(f"Imported {attempt} in {elapsed:.2f} s ({megabytes / elapsed:.0f} MB/s): "
+              f"{imported.added} of {imported.entries} entries added to {imported.days} days")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Peak memory {peak:.0f} MB; restored logs {directory_size(restored) / 1024 / 1024:.1f} MB")
+
+    if Counter(iter_log_entries(restored)) != Counter(iter_log_entries(logs_dir)) \
+            or imported.added:
+        print("The imported history differs from the exported one", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
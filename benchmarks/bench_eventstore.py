@@ -0,0 +1,84 @@
+"""Size and load-time comparison of the text inputs logs and the binary event store.
+
+Run from the repository root:
+    python -m benchmarks.bench_eventstore --count 500000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.storage.eventstore import EventStore, EventStoreReader
+from src.storage.textlog import Entry, TextLogStore, parse_line
+
+WORDS = ['coffee', 'phone', 'snack', 'scroll', 'walk', 'tired', 'bored', 'stress', 'meeting', 'late']
+
+
+def synthetic_entries(count, seed=1):
+    """Yield entries spread over roughly three years, oldest first."""
+    rng = random.Random(seed)
+    timestamp = time.time() - 3 * 365 * 86400
+    step = 3 * 365 * 86400 / count
+    for _ in range(count):
+        timestamp += rng.uniform(0, 2 * step)
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        yield Entry(int(timestamp), f"Label {rng.randint(1, 5)}", text)
+
+
+def directory_size(path):
+    """Return the total size in bytes of the files under path."""
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    """Write the same history to both stores and time reading it back."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=500000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        text_dir = os.path.join(root, 'text')
+        binary_dir = os.path.join(root, 'binary')
+        os.makedirs(text_dir)
+        text_store = TextLogStore(text_dir)
+        binary_store = EventStore(binary_dir)
+        batch = []
+        for entry in synthetic_entries(args.count):
+            batch.append(entry)
+            if len(batch) == 4096:
+                text_store.write(batch)
+                binary_store.write(batch)
+                batch = []
+        text_store.write(batch)
+        binary_store.write(batch)
+        text_store.close()
+        binary_store.close()
+
+        text_size = directory_size(text_dir)
+        binary_size = directory_size(binary_dir)
+        print(f"entries:        {args.count:,}")
+        print(f"text logs:      {text_size / 1e6:8.2f} MB")
+        print(f"event store:    {binary_size / 1e6:8.2f} MB ({binary_size / text_size:.0%} of text)")
+
+        start = time.perf_counter()
+        count = 0
+        for name in sorted(os.listdir(text_dir)):
+            with open(os.path.join(text_dir, name), encoding='utf-8') as f:
+                for line in f:
+                    if parse_line(line) is not None:
+                        count += 1
+        print(f"text parse:     {(time.perf_counter() - start) * 1000:8.1f} ms ({count:,} entries)")
+
+        with EventStoreReader(binary_dir) as reader:
+            start = time.perf_counter()
+            count = sum(1 for _ in reader.iter_raw())
+            print(f"binary raw:     {(time.perf_counter() - start) * 1000:8.1f} ms ({count:,} entries)")
+            start = time.perf_counter()
+            count = sum(1 for _ in reader.iter_entries())
+            print(f"binary decoded: {(time.perf_counter() - start) * 1000:8.1f} ms ({count:,} entries)")
+
+
+if __name__ == '__main__':
+    main()
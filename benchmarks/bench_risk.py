@@ -0,0 +1,83 @@
+"""Risk model benchmark: per-entry updates and tooltip forecasts.
+
+Counts a synthetic history with daily habits into a fresh hour-of-week
+model, then times the forecast the tray tooltip asks for. An update
+touches one bin and a forecast is a few passes over 168 bins per label, so
+neither grows with the history.
+
+Run from the repository root:
+    python -m benchmarks.bench_risk --entries 1000000
+Exits with status 1 when the p99 forecast exceeds the budget.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from src.storage.risk import RiskModel
+from src.storage.textlog import Entry
+
+FORECAST_BUDGET_MS = 5.0
+
+
+class _NoStore:
+    """Store stand-in for load(): every entry is counted through add()."""
+
+    def iter_since(self, watermark):
+        return iter(())
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--labels', type=int, default=20)
+    parser.add_argument('--days', type=int, default=3 * 365)
+    parser.add_argument('--forecasts', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=FORECAST_BUDGET_MS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    labels = [f"Label {i + 1}" for i in range(args.labels)]
+    # Each label peaks around its own hour of the day
+    peaks = {label: rng.randrange(24) for label in labels}
+    entries = []
+    for _ in range(args.entries):
+        label = rng.choice(labels)
+        day = now - rng.randrange(args.days) * 86400
+        hour = (peaks[label] + int(rng.gauss(0, 2))) % 24
+        entries.append(Entry(day - day % 86400 + hour * 3600 + rng.randrange(3600), label, ''))
+    entries.sort(key=lambda entry: entry.timestamp)
+
+    model = RiskModel(os.path.join(tempfile.mkdtemp(prefix='urge-bench-risk-'), 'risk.json'))
+    model.load(_NoStore())
+    started = time.perf_counter()
+    for i, entry in enumerate(entries):
+        model.add(entry, 'bench', i, i + 1)
+    elapsed = time.perf_counter() - started
+    print(f"Counted {args.entries} entries in {elapsed:.2f} s "
+          f"({elapsed / args.entries * 1e6:.2f} us per entry)")
+
+    durations = []
+    for _ in range(args.forecasts):
+        at = now + rng.random() * 7 * 86400
+        began = time.perf_counter()
+        risks = model.upcoming(6, 0.3, at)
+        durations.append((time.perf_counter() - began) * 1000)
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{len(durations)} forecasts over {args.labels} labels: "
+          f"p50 {statistics.median(durations):.3f} ms  p99 {p99:.3f} ms; "
+          f"last named {len({risk.label for risk in risks})} labels")
+    if p99 > args.budget_ms:
+        print(f"p99 forecast exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
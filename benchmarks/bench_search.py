@@ -0,0 +1,138 @@
+"""Full-text search benchmark for the inverted index.
+
+Writes a synthetic history of daily inputs logs, builds the search index
+the way the writer thread does on first start, then times ranked queries
+(single words, several words, prefixes, with label and date filters) and
+reports the index size against the raw logs. Finally appends entries in
+small saved batches so segments are merged in the background.
+
+Run from the repository root:
+    python -m benchmarks.bench_search --entries 300000
+Exits with status 1 when the p99 query exceeds the budget.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from src.storage.search import SEARCH_DIRNAME, SearchIndex
+from src.storage.textlog import Entry, TextLogStore, format_entry, inputs_filename
+
+QUERY_BUDGET_MS = 50.0
+
+WORDS = ['walked', 'away', 'from', 'the', 'fridge', 'phone', 'checked', 'email', 'again',
+         'scrolled', 'news', 'for', 'ten', 'minutes', 'had', 'a', 'coffee', 'instead',
+         'stretched', 'drank', 'water', 'went', 'outside', 'closed', 'laptop', 'breathed',
+         'craving', 'sugar', 'after', 'lunch', 'meeting', 'stress', 'bored', 'tired']
+# Rarer words, so queries span a range of posting list lengths
+RARE = [f'word{i}' for i in range(5000)]
+LABELS = ['Label 1', 'Label 2', 'Label 3', 'Label 4', 'Label 5']
+QUERIES = ['the', 'coffee', 'word17', 'fridge phone', 'sugar after lunch',
+           'word4 the', 'cof', 'wor', 'stretched water outside', 'missing']
+
+
+def make_text(rng):
+    """Return one entry text of common and occasional rare words."""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(3, 12))]
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), rng.choice(RARE))
+    return ' '.join(words).capitalize()
+
+
+def write_history(logs_dir, entries, days, rng):
+    """Write entries spread over the last days of daily inputs logs; return their size."""
+    now = time.time()
+    stamps = sorted(now - rng.random() * days * 86400 for _ in range(entries))
+    per_day = {}
+    for timestamp in stamps:
+        day = datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+        per_day.setdefault(day, []).append(Entry(timestamp, rng.choice(LABELS), make_text(rng)))
+    size = 0
+    for day, day_entries in per_day.items():
+        path = os.path.join(logs_dir, inputs_filename(day))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(format_entry(entry) for entry in day_entries)
+        size += os.path.getsize(path)
+    return size
+
+
+def directory_size(path):
+    """Return the total size of the files in a directory."""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def time_queries(index, rounds, rng, now):
+    """Return per-query durations in ms over every query and filter combination."""
+    durations = []
+    clock = time.perf_counter
+    for _ in range(rounds):
+        for query in QUERIES:
+            for label, start in ((None, None), (rng.choice(LABELS), None),
+                                 (None, now - 7 * 86400)):
+                began = clock()
+                index.search(query, label=label, start=start, limit=20, prefix=True)
+                durations.append((clock() - began) * 1000)
+    return durations
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--days', type=int, default=3 * 365)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--appends', type=int, default=40, help="saved batches appended")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=QUERY_BUDGET_MS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    logs_dir = tempfile.mkdtemp(prefix='urge-bench-search-')
+    log_bytes = write_history(logs_dir, args.entries, args.days, rng)
+    index_dir = os.path.join(logs_dir, SEARCH_DIRNAME)
+
+    index = SearchIndex(index_dir, logs_dir)
+    store = TextLogStore(logs_dir, observers=[index])
+    started = time.perf_counter()
+    store.open()
+    print(f"Indexed {len(index)} entries in {time.perf_counter() - started:.2f} s")
+    store.close()
+    index_bytes = directory_size(index_dir)
+    print(f"Index {index_bytes / 1024:.0f} KB for {log_bytes / 1024:.0f} KB of logs "
+          f"({index_bytes * 100 / log_bytes:.1f}%)")
+
+    started = time.perf_counter()
+    reopened = SearchIndex(index_dir, logs_dir)
+    store = TextLogStore(logs_dir, observers=[reopened])
+    store.open()
+    print(f"Reopened in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    now = time.time()
+    durations = time_queries(reopened, args.rounds, rng, now)
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{len(durations)} queries: mean {statistics.mean(durations):.2f} ms  "
+          f"p50 {statistics.median(durations):.2f} ms  p99 {p99:.2f} ms  "
+          f"max {ordered[-1]:.2f} ms")
+    for hit in reopened.search('sugar after lunch', limit=3):
+        print(f"  {hit.score:6.2f}  {hit.entry.text}")
+
+    # Save on every flush, so each batch adds a segment; merges keep the count bounded
+    reopened.SAVE_INTERVAL = 0.0
+    for _ in range(args.appends):
+        store.write([Entry(time.time(), rng.choice(LABELS), make_text(rng)) for _ in range(20)])
+        store.flush()
+    store.close()
+    print(f"After {args.appends} saved batches: {len(reopened.segments)} segments, "
+          f"{len(reopened)} entries")
+    if p99 > args.budget_ms:
+        print(f"p99 query exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
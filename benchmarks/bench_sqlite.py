@@ -0,0 +1,85 @@
+"""SQLite backend benchmark: import, batched writes and range queries.
+
+Writes a synthetic history of daily inputs logs, imports it into a fresh
+database the way the first start with the sqlite backend does, then
+times group-committed batches from the writer and count/list queries over
+random day, week and month ranges through the prepared-statement API.
+
+Run from the repository root:
+    python -m benchmarks.bench_sqlite --entries 300000
+Exits with status 1 when the p99 query exceeds the budget.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_search import LABELS, make_text, write_history
+from src.storage.backends import SQLITE_FILENAME
+from src.storage.sqlitestore import EntryQueries, SqliteStore
+from src.storage.textlog import Entry
+
+QUERY_BUDGET_MS = 20.0
+RANGES = [86400, 7 * 86400, 30 * 86400]
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--days', type=int, default=3 * 365)
+    parser.add_argument('--batches', type=int, default=200, help="writer batches timed")
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=QUERY_BUDGET_MS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    logs_dir = tempfile.mkdtemp(prefix='urge-bench-sqlite-')
+    log_bytes = write_history(logs_dir, args.entries, args.days, rng)
+    path = os.path.join(logs_dir, SQLITE_FILENAME)
+
+    store = SqliteStore(path, logs_dir)
+    started = time.perf_counter()
+    store.open()
+    print(f"Imported {args.entries} entries in {time.perf_counter() - started:.2f} s; "
+          f"database {os.path.getsize(path) / 1024:.0f} KB for {log_bytes / 1024:.0f} KB of logs")
+
+    for fsync in (False, True):
+        started = time.perf_counter()
+        for _ in range(args.batches):
+            store.write([Entry(time.time(), rng.choice(LABELS), make_text(rng))
+                         for _ in range(args.batch_size)])
+            store.flush(fsync)
+        elapsed = time.perf_counter() - started
+        print(f"{args.batches} batches of {args.batch_size} (fsync {fsync}): "
+              f"{elapsed / args.batches * 1000:.2f} ms per commit, "
+              f"{args.batches * args.batch_size / elapsed:.0f} entries/s")
+    store.close()
+
+    now = time.time()
+    durations = []
+    with EntryQueries(path) as queries:
+        for i in range(args.queries):
+            span = RANGES[i % len(RANGES)]
+            start = now - rng.random() * args.days * 86400
+            label = rng.choice(LABELS) if i % 2 else None
+            began = time.perf_counter()
+            queries.count(start, start + span, label)
+            queries.query(start, start + span, label, limit=100)
+            durations.append((time.perf_counter() - began) * 1000)
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{len(durations)} count+list queries: p50 {statistics.median(durations):.2f} ms  "
+          f"p99 {p99:.2f} ms  max {ordered[-1]:.2f} ms")
+    if p99 > args.budget_ms:
+        print(f"p99 query exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
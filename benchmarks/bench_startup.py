@@ -0,0 +1,113 @@
+"""Import-time and launch-to-tray benchmark with a regression budget.
+
+Runs each measurement in a fresh interpreter:
+  * `python -X importtime -c "import src.main"` for the import cost, with the
+    slowest modules listed;
+  * UrgeApp() under QT_QPA_PLATFORM=offscreen, timed until the event loop
+    first runs (the point where the tray menu responds).
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5
+Exits with status 1 when the median of either measurement exceeds its budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median budgets in milliseconds; raise them deliberately, never silently
+IMPORT_BUDGET_MS = 250
+TRAY_READY_BUDGET_MS = 600
+
+_TRAY_PROBE = """
+import time
+started = time.perf_counter()
+from PyQt5.QtCore import QTimer
+from src.main import UrgeApp
+app = UrgeApp()
+def ready():
+    print(f"{(time.perf_counter() - started) * 1000:.3f}")
+    app.app.quit()
+QTimer.singleShot(0, ready)
+app.run()
+"""
+
+
+def _environment():
+    """Return an environment isolated from a real running instance."""
+    env = dict(os.environ)
+    env['QT_QPA_PLATFORM'] = 'offscreen'
+    env['XDG_RUNTIME_DIR'] = tempfile.mkdtemp(prefix='urge-bench-')
+    env['PYTHONPATH'] = ROOT
+    return env
+
+
+def measure_imports():
+    """Return (total import ms, [(cumulative ms, module)]) for one run."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+                            cwd=ROOT, env=_environment(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return _parse_importtime(result.stderr, 'src.main')
+
+
+def _parse_importtime(output, target):
+    """Parse -X importtime output into (target ms, [(cumulative ms, module)])."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue  # column header
+        modules.append((int(cumulative) / 1000, name.strip()))
+    total = next(ms for ms, name in reversed(modules) if name == target)
+    return total, modules
+
+
+def measure_tray_ready():
+    """Return milliseconds from interpreter start of the probe to the first event loop tick."""
+    result = subprocess.run([sys.executable, '-c', _TRAY_PROBE], cwd=ROOT,
+                            env=_environment(), capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Run the measurements and compare the medians with the budgets."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--tray-budget', type=float, default=TRAY_READY_BUDGET_MS)
+    args = parser.parse_args()
+
+    import_runs = []
+    modules = []
+    for _ in range(args.runs):
+        total, modules = measure_imports()
+        import_runs.append(total)
+    tray_runs = [measure_tray_ready() for _ in range(args.runs)]
+
+    print("Slowest imports (cumulative, last run):")
+    for ms, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    for name, runs, budget in [('import src.main', import_runs, args.import_budget),
+                               ('launch to tray ready', tray_runs, args.tray_budget)]:
+        median = statistics.median(runs)
+        status = 'ok' if median <= budget else 'OVER BUDGET'
+        failed = failed or median > budget
+        print(f"{name:<22} median {median:8.1f} ms  min {min(runs):8.1f} ms  "
+              f"budget {budget:6.0f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
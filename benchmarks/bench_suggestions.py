@@ -0,0 +1,113 @@
+"""Autocomplete lookup benchmark for the suggestion index.
+
+Writes a synthetic text history (Zipf-distributed phrases across a few
+labels), loads it through SuggestionIndex the way the app does on first
+use, then times suggest() for every prefix of sampled phrases, as typed.
+
+Run from the repository root:
+    python -m benchmarks.bench_suggestions --entries 300000
+Exits with status 1 when the p99 lookup exceeds the budget.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.storage.suggestions import SuggestionIndex
+from src.storage.textlog import Entry, TextLogStore, format_entry, inputs_filename
+
+LOOKUP_BUDGET_MS = 1.0
+
+WORDS = ['walked', 'away', 'from', 'the', 'fridge', 'phone', 'checked', 'email', 'again',
+         'scrolled', 'news', 'for', 'ten', 'minutes', 'had', 'a', 'coffee', 'instead',
+         'stretched', 'drank', 'water', 'went', 'outside', 'closed', 'laptop', 'breathed']
+LABELS = ['Label 1', 'Label 2', 'Label 3', 'Label 4', 'Label 5']
+
+
+def make_phrases(count, rng):
+    """Return count distinct phrases."""
+    phrases = set()
+    while len(phrases) < count:
+        phrases.add(' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 7))).capitalize())
+    return sorted(phrases)
+
+
+def write_history(logs_dir, entries, phrases, rng):
+    """Write entries spread over the last 30 days of daily inputs logs."""
+    now = time.time()
+    per_day = {}
+    for _ in range(entries):
+        timestamp = now - rng.random() * 30 * 86400
+        # Zipf-like: a few phrases make up most entries
+        phrase = phrases[min(len(phrases) - 1, int(rng.paretovariate(1.2)) - 1)]
+        entry = Entry(timestamp, rng.choice(LABELS), phrase)
+        day = datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+        per_day.setdefault(day, []).append(entry)
+    for day, day_entries in per_day.items():
+        day_entries.sort()
+        with open(os.path.join(logs_dir, inputs_filename(day)), 'w', encoding='utf-8') as f:
+            f.writelines(format_entry(entry) for entry in day_entries)
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=300000)
+    parser.add_argument('--phrases', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=LOOKUP_BUDGET_MS)
+    parser.add_argument('--memory', action='store_true', help="also report the index size")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    phrases = make_phrases(args.phrases, rng)
+    logs_dir = tempfile.mkdtemp(prefix='urge-bench-suggest-')
+    write_history(logs_dir, args.entries, phrases, rng)
+
+    index = SuggestionIndex()
+    index.load(TextLogStore(logs_dir))
+    started = time.perf_counter()
+    index.start_loading()
+    index.loaded.wait()
+    print(f"Loaded {args.entries} entries in {time.perf_counter() - started:.2f} s")
+    if args.memory:
+        # A second load under tracemalloc, which slows it several times over
+        tracemalloc.start()
+        measured = SuggestionIndex()
+        measured.load(TextLogStore(logs_dir))
+        measured.start_loading()
+        measured.loaded.wait()
+        print(f"Index holds {tracemalloc.get_traced_memory()[0] / 1024:.0f} KB")
+        tracemalloc.stop()
+        del measured
+
+    durations = []
+    clock = time.perf_counter
+    for _ in range(args.lookups):
+        label = rng.choice(LABELS)
+        phrase = rng.choice(phrases)
+        for end in range(1, min(len(phrase), 12) + 1):
+            start = clock()
+            index.suggest(label, phrase[:end])
+            durations.append((clock() - start) * 1000)
+        # A new entry invalidates the cached rankings under its prefixes
+        index.add(Entry(time.time(), label, phrase))
+
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{len(durations)} lookups: mean {statistics.mean(durations) * 1000:.1f} us  "
+          f"p50 {statistics.median(durations) * 1000:.1f} us  p99 {p99 * 1000:.1f} us  "
+          f"max {ordered[-1] * 1000:.1f} us")
+    if p99 > args.budget_ms:
+        print(f"p99 lookup exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Multi-machine sync benchmark.
+
+Writes a year of synthetic history for two machines that share part of
+it, syncs both through a shared directory until they agree, then times a
+re-sync with nothing changed and one after a single new entry. Every
+re-sync should only compare cached day checksums, and the second one
+merge a single day.
+
+Run from the repository root:
+    python -m benchmarks.bench_sync --entries 100000
+Exits with status 1 when the unchanged re-sync exceeds the budget.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from src.storage.sync import open_target, sync
+from src.storage.textlog import Entry, format_entry, inputs_filename, iter_log_entries
+
+RESYNC_BUDGET_MS = 100.0
+LABELS = ['Label 1', 'Label 2', 'Label 3', None]
+
+
+def write_history(logs_dir, entries):
+    """Append entries to daily inputs logs, oldest first."""
+    os.makedirs(logs_dir, exist_ok=True)
+    per_day = {}
+    for entry in sorted(entries, key=lambda entry: entry.timestamp):
+        day = datetime.fromtimestamp(entry.timestamp).strftime("%Y%m%d")
+        per_day.setdefault(day, []).append(entry)
+    for day, day_entries in per_day.items():
+        with open(os.path.join(logs_dir, inputs_filename(day)), 'a', encoding='utf-8') as f:
+            f.writelines(format_entry(entry) for entry in day_entries)
+
+
+def timed(label, logs_dir, targets):
+    """Run one sync, print what it did and return its duration in ms."""
+    started = time.perf_counter()
+    result = sync(logs_dir, [open_target(target) for target in targets])
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{label:<24} {elapsed:9.1f} ms  {result.merged:4d} of {result.days} days merged, "
+          f"{result.added} entries added")
+    return elapsed
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000, help="entries per machine")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--shared', type=float, default=0.5,
+                        help="fraction of entries already on both machines")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=RESYNC_BUDGET_MS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = int(time.time())
+
+    def make(count, prefix):
+        return [Entry(now - rng.randrange(args.days * 86400), rng.choice(LABELS),
+                      f"{prefix} entry {i}") for i in range(count)]
+
+    shared = make(int(args.entries * args.shared), 'shared')
+    desktop_only = make(args.entries - len(shared), 'desktop')
+    laptop_only = make(args.entries - len(shared), 'laptop')
+    root = tempfile.mkdtemp(prefix='urge-bench-sync-')
+    desktop, laptop, hub = (os.path.join(root, name) for name in ('desktop', 'laptop', 'hub'))
+    write_history(desktop, shared + desktop_only)
+    write_history(laptop, shared + laptop_only)
+
+    timed("desktop first sync", desktop, [hub])
+    timed("laptop first sync", laptop, [hub])
+    timed("desktop catch-up", desktop, [hub])
+    if Counter(iter_log_entries(desktop)) != Counter(iter_log_entries(laptop)):
+        print("Histories differ after syncing", file=sys.stderr)
+        sys.exit(1)
+
+    resync = timed("unchanged re-sync", desktop, [hub])
+    write_history(laptop, [Entry(now, 'Label 1', "one more")])
+    timed("one new entry", laptop, [hub])
+    timed("pull one new entry", desktop, [hub])
+    if resync > args.budget_ms:
+        print(f"Unchanged re-sync exceeds the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Headless benchmark and regression check for the UI hot paths.
+
+Times window construction, label selection, submission, Logger.log_input
+and Config access under QT_QPA_PLATFORM=offscreen, then measures peak and
+retained memory of each case in a separate tracemalloc pass.
+
+Run from the repository root:
+    python -m benchmarks.bench_ui --save benchmarks/results/baseline.json
+    python -m benchmarks.bench_ui --compare benchmarks/results/baseline.json
+Comparing exits with status 1 and lists every case that got slower or
+leakier than the tolerances allow.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('URGE_LOGS_DIR', tempfile.mkdtemp(prefix='urge-bench-logs-'))
+
+# Relative slowdown of mean or p50 that counts as a regression
+DEFAULT_TIME_TOLERANCE = 0.25
+# Retained memory growth (KB) over the baseline that counts as a leak
+DEFAULT_MEMORY_TOLERANCE_KB = 64
+
+
+def summarize(durations):
+    """Return mean and percentile timings in microseconds."""
+    ordered = sorted(durations)
+    count = len(ordered)
+
+    def percentile(percent):
+        return ordered[min(count - 1, int(count * percent / 100.0))] * 1e6
+
+    return {
+        'iterations': count,
+        'mean_us': round(sum(ordered) / count * 1e6, 2),
+        'p50_us': round(percentile(50), 2),
+        'p90_us': round(percentile(90), 2),
+        'p99_us': round(percentile(99), 2),
+        'max_us': round(ordered[-1] * 1e6, 2),
+    }
+
+
+def time_case(setup, run, iterations):
+    """Time run(state) iterations times; setup() builds the state."""
+    state = setup()
+    run(state)  # warm-up
+    durations = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        start = clock()
+        run(state)
+        durations.append(clock() - start)
+    return durations
+
+
+def memory_case(setup, run, iterations, flush):
+    """Return (peak KB, retained KB) of running the case under tracemalloc."""
+    state = setup()
+    run(state)
+    flush()
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(iterations):
+        run(state)
+    flush()
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round((peak - before) / 1024, 1), round((after - before) / 1024, 1)
+
+
+def build_cases():
+    """Return {name: (setup, run)} for every benchmarked hot path."""
+    from PyQt5.QtCore import Qt, QEvent
+    from PyQt5.QtGui import QKeyEvent
+
+    from src.config import Config
+    from src.ui.input_window import InputWindow
+    from src.ui.label_window import LabelSelectionWindow
+    from src.utils.logger import Logger
+
+    def construct(window_class):
+        def run(_):
+            window = window_class()
+            window.deleteLater()
+            flush_deleted()
+        return run
+
+    def select_label(window):
+        window.reset()
+        window.keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_1, Qt.NoModifier, '1'))
+
+    def submit(window):
+        window.set_label('Label 1')
+        window.textInput.setText('benchmark entry')
+        window.onSubmit()
+
+    def config_access(_):
+        config = Config()
+        config.get('ui', 'background_color')
+        config.get('labels')
+
+    return {
+        'config_access': (lambda: None, config_access),
+        'label_window_construct': (lambda: None, construct(LabelSelectionWindow)),
+        'input_window_construct': (lambda: None, construct(InputWindow)),
+        'label_keypress': (LabelSelectionWindow, select_label),
+        'input_submit': (InputWindow, submit),
+        'log_input': (Logger, lambda logger: logger.log_input('benchmark entry', 'Label 1')),
+    }
+
+
+def flush_deleted():
+    """Process deferred deletes so destroyed windows are really freed."""
+    from PyQt5.QtCore import QCoreApplication, QEvent
+
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    QCoreApplication.processEvents()
+
+
+def run_benchmarks(iterations, memory_iterations, only=None):
+    """Run every case and return the results document."""
+    from PyQt5.QtWidgets import QApplication
+    from src.utils.logger import Logger
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    cases = build_cases()
+
+    def flush():
+        flush_deleted()
+        Logger.flush()
+
+    results = {}
+    for name, (setup, run) in cases.items():
+        if only and name not in only:
+            continue
+        count = iterations if not name.endswith('_construct') else max(1, iterations // 10)
+        stats = summarize(time_case(setup, run, count))
+        flush()
+        stats['peak_kb'], stats['retained_kb'] = memory_case(
+            setup, run, memory_iterations, flush)
+        results[name] = stats
+        print(f"{name:<24} mean {stats['mean_us']:>10.1f} us  p50 {stats['p50_us']:>10.1f} us  "
+              f"p99 {stats['p99_us']:>10.1f} us  peak {stats['peak_kb']:>8.1f} KB  "
+              f"retained {stats['retained_kb']:>8.1f} KB")
+    Logger.shutdown()
+    app.processEvents()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt_platform': os.environ.get('QT_QPA_PLATFORM'),
+            'iterations': iterations,
+            'memory_iterations': memory_iterations,
+            'written_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        'cases': results,
+    }
+
+
+def compare(current, baseline, time_tolerance, memory_tolerance_kb):
+    """Return a list of regression messages (empty when within tolerance)."""
+    problems = []
+    for name, base in baseline['cases'].items():
+        now = current['cases'].get(name)
+        if now is None:
+            continue
+        for key in ('mean_us', 'p50_us'):
+            if base[key] > 0 and now[key] > base[key] * (1 + time_tolerance):
+                problems.append(f"{name}: {key} {now[key]:.1f} vs baseline {base[key]:.1f} "
+                                f"(+{(now[key] / base[key] - 1):.0%})")
+        if now['retained_kb'] > base['retained_kb'] + memory_tolerance_kb:
+            problems.append(f"{name}: retained {now['retained_kb']:.1f} KB vs baseline "
+                            f"{base['retained_kb']:.1f} KB")
+    return problems
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--memory-iterations', type=int, default=500)
+    parser.add_argument('--case', action='append', help="run only the named case(s)")
+    parser.add_argument('--save', help="write the results JSON here")
+    parser.add_argument('--compare', help="baseline results JSON to compare against")
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance-kb', type=float, default=DEFAULT_MEMORY_TOLERANCE_KB)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.memory_iterations, args.case)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.save}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.time_tolerance, args.memory_tolerance_kb)
+        if problems:
+            print("\nREGRESSIONS against " + args.compare + ":", file=sys.stderr)
+            for problem in problems:
+                print("  " + problem, file=sys.stderr)
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
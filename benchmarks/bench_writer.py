@@ -0,0 +1,67 @@
+"""Throughput benchmark: open-per-write inputs logging vs. the batched writer.
+
+Run from the repository root:
+    python -m benchmarks.bench_writer --count 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from src.storage.textlog import Entry, TextLogStore
+from src.utils.writer import BatchWriter
+
+
+def legacy_write(logs_dir, count):
+    """Append each record by opening and closing the file, as Logger used to."""
+    inputs_file = os.path.join(logs_dir, f'inputs_{datetime.now().strftime("%Y%m%d")}.log')
+    start = time.perf_counter()
+    for i in range(count):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with open(inputs_file, 'a') as f:
+            f.write(f"{timestamp} - Input: benchmark entry {i}, Label: Label 1\n")
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def batched_write(logs_dir, count, **writer_options):
+    """Submit records to a BatchWriter; return (submit time, time until durable)."""
+    writer = BatchWriter([TextLogStore(logs_dir)], **writer_options)
+    start = time.perf_counter()
+    for i in range(count):
+        writer.submit(Entry(time.time(), 'Label 1', f"benchmark entry {i}"))
+    submitted = time.perf_counter() - start
+    writer.close()
+    return submitted, time.perf_counter() - start
+
+
+def report(name, count, submit_seconds, total_seconds):
+    """Print one result row."""
+    print(f"{name:<28} {count / total_seconds:>12,.0f} rec/s  "
+          f"caller {submit_seconds / count * 1e6:>8.2f} us/rec  total {total_seconds:.3f} s")
+
+
+def main():
+    """Run every mode against a fresh temporary directory."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000)
+    args = parser.parse_args()
+
+    modes = [
+        ('open-per-write (legacy)', None),
+        ('batched, flush always', dict(flush_mode='always')),
+        ('batched, flush every 200ms', dict(flush_mode='interval', flush_interval_ms=200)),
+        ('batched, fsync on batch', dict(flush_mode='always', fsync=True)),
+    ]
+    for name, options in modes:
+        with tempfile.TemporaryDirectory() as logs_dir:
+            if options is None:
+                result = legacy_write(logs_dir, args.count)
+            else:
+                result = batched_write(logs_dir, args.count, **options)
+            report(name, args.count, *result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Memory soak test for long-running tray sessions.
+
+Drives thousands of hotkey -> label -> submit cycles through UrgeApp under
+QT_QPA_PLATFORM=offscreen and samples, every few hundred cycles:
+  * Python heap in use (tracemalloc),
+  * live QObjects owned by the application and its windows,
+  * active QTimers among them,
+  * resident set size.
+
+Run from the repository root:
+    python -m benchmarks.soak_ui --cycles 5000
+Exits with status 1 when QObjects or active timers grow at all, or when the
+heap grows faster than the per-cycle budget after warm-up. The inputs
+history index legitimately keeps a few dozen bytes per entry in memory,
+which the default budget allows for.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('URGE_LOGS_DIR', tempfile.mkdtemp(prefix='urge-soak-logs-'))
+os.environ.setdefault('XDG_RUNTIME_DIR', tempfile.mkdtemp(prefix='urge-soak-'))
+os.environ.setdefault('URGE_HOTKEY_BACKEND', 'synthetic')
+
+# Heap growth per cycle (bytes) after warm-up that counts as a leak
+DEFAULT_HEAP_BUDGET = 96
+WARMUP_CYCLES = 200
+
+
+def resident_kb():
+    """Return the resident set size in KB, or 0 where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def count_objects(roots):
+    """Return (live QObjects, active QTimers) under the given root objects."""
+    from PyQt5.QtCore import QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    roots = list(roots) + QApplication.topLevelWidgets()
+    seen = set()
+    objects = timers = 0
+    for root in roots:
+        for obj in [root] + root.findChildren(QObject):
+            key = id(obj)
+            if key in seen:
+                continue
+            seen.add(key)
+            objects += 1
+            if isinstance(obj, QTimer) and obj.isActive():
+                timers += 1
+    return objects, timers
+
+
+def run_cycle(urge, index):
+    """Press the hotkey, pick a label and submit one entry."""
+    from PyQt5.QtCore import Qt, QEvent
+    from PyQt5.QtGui import QKeyEvent
+    from PyQt5.QtWidgets import QApplication
+
+    backend = urge.hotkey_listener.backend
+    if hasattr(backend, 'press'):
+        # The synthetic backend fires on this thread, so the popup shows synchronously
+        backend.press('ctrl+space')
+    else:
+        urge.show_selection_window()
+    urge.selection_window.keyPressEvent(
+        QKeyEvent(QEvent.KeyPress, Qt.Key_1, Qt.NoModifier, '1'))
+    urge.input_window.textInput.setText(f"soak entry {index}")
+    urge.input_window.onSubmit()
+    QApplication.processEvents()
+
+
+def sample(urge, cycle):
+    """Settle pending work and return one measurement row."""
+    from PyQt5.QtCore import QCoreApplication, QEvent
+    from src.utils.logger import Logger
+
+    # Let the refocus timer fire so it is counted only if it is stuck
+    deadline = time.perf_counter() + 0.2
+    while urge.refocus_timer.isActive() and time.perf_counter() < deadline:
+        QCoreApplication.processEvents()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    Logger.flush()
+    gc.collect()
+    objects, timers = count_objects([urge, urge.app])
+    heap, _ = tracemalloc.get_traced_memory()
+    return {'cycle': cycle, 'heap_kb': heap / 1024, 'qobjects': objects,
+            'active_timers': timers, 'rss_kb': resident_kb()}
+
+
+def check(samples, heap_budget):
+    """Return a list of problems found between the first and last sample."""
+    first, last = samples[0], samples[-1]
+    cycles = max(1, last['cycle'] - first['cycle'])
+    problems = []
+    for key in ('qobjects', 'active_timers'):
+        if last[key] > first[key]:
+            problems.append(f"{key} grew from {first[key]} to {last[key]}")
+    per_cycle = (last['heap_kb'] - first['heap_kb']) * 1024 / cycles
+    if per_cycle > heap_budget:
+        problems.append(f"heap grew {per_cycle:.1f} bytes per cycle (budget {heap_budget})")
+    return problems
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=5000)
+    parser.add_argument('--sample-every', type=int, default=500)
+    parser.add_argument('--heap-budget', type=float, default=DEFAULT_HEAP_BUDGET,
+                        help="allowed heap growth in bytes per cycle")
+    args = parser.parse_args()
+
+    from src.main import UrgeApp
+    from src.utils.logger import Logger
+
+    urge = UrgeApp()
+    urge.finish_startup()
+    for index in range(WARMUP_CYCLES):
+        run_cycle(urge, index)
+
+    tracemalloc.start()
+    samples = [sample(urge, 0)]
+    print(f"{'cycle':>7}{'heap KB':>11}{'qobjects':>10}{'timers':>8}{'rss KB':>10}")
+    started = time.perf_counter()
+    for index in range(1, args.cycles + 1):
+        run_cycle(urge, index)
+        if index % args.sample_every and index != args.cycles:
+            continue
+        row = sample(urge, index)
+        samples.append(row)
+        print(f"{row['cycle']:>7}{row['heap_kb']:>11.1f}{row['qobjects']:>10}"
+              f"{row['active_timers']:>8}{row['rss_kb']:>10}")
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    print(f"{args.cycles} cycles in {elapsed:.1f} s "
+          f"({elapsed / args.cycles * 1000:.2f} ms per cycle)")
+
+    if urge.instance_server is not None:
+        urge.instance_server.stop()
+    urge.discard_windows()
+    Logger.shutdown()
+
+    problems = check(samples, args.heap_budget)
+    if problems:
+        print("\nLEAKS:", file=sys.stderr)
+        for problem in problems:
+            print("  " + problem, file=sys.stderr)
+        sys.exit(1)
+    print("Memory, QObjects and timers stayed flat")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Streaming analytics over the urge history.
+
+Usage:
+    python -m src.analytics [--format csv|json] [--by hour|weekday|day|all]
+                            [--source auto|text|binary|sqlite]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+from datetime import date
+from itertools import islice
+
+from src.config import Config
+from src.storage.archive import open_log
+from src.storage.backends import (
+    BACKEND_SQLITE, EVENTS_DIRNAME, SQLITE_FILENAME, default_logs_dir
+)
+from src.storage.eventstore import EventStoreReader, list_segments
+from src.storage.textlog import list_input_logs
+
+CHUNK_SIZE = 65536
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+NO_LABEL = ''
+_LABEL_MARKER = ', Label: '
+_INPUT_MARKER = ' - Input: '
+# Event timestamps are bucketed to 15 minutes, a divisor of every UTC offset
+_BUCKET_SECONDS = 900
+
+
+def iter_text_keys(logs_dir):
+    """Yield (YYYY-MM-DD, HH, label) for every line of the daily inputs logs."""
+    for _, path in list_input_logs(logs_dir):
+        with io.TextIOWrapper(open_log(path), encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line[19:29] != _INPUT_MARKER:
+                    continue
+                _, sep, label = line.rpartition(_LABEL_MARKER)
+                yield line[:10], line[11:13], label.rstrip('\n') if sep else NO_LABEL
+
+
+def iter_event_keys(events_dir):
+    """Yield (15 minute bucket, label) for every event in the binary store."""
+    with EventStoreReader(events_dir) as reader:
+        labels = reader.labels
+        for timestamp, label_id, _ in reader.iter_raw():
+            yield int(timestamp // _BUCKET_SECONDS), labels.get(label_id, NO_LABEL)
+
+
+def iter_sqlite_counts(database):
+    """Yield ((15 minute bucket, label), count) from the entries database, if there is one."""
+    if not os.path.exists(database):
+        return
+    # sqlite3 is only imported when the database is in use
+    from src.storage.sqlitestore import EntryQueries
+    with EntryQueries(database) as queries:
+        for bucket, label, count in queries.bucket_counts(_BUCKET_SECONDS):
+            yield (bucket, label or NO_LABEL), count
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    """Split a stream into lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Rollup:
+    """Per-label counts by hour of day, weekday and calendar day.
+
+    Each chunk of records is collapsed with a Counter (a C-level group-by), so
+    the Python-level work per chunk is proportional to the number of distinct
+    (day, hour, label) keys rather than to the number of lines. The counts
+    live in flat arrays: 24 hours and 7 weekdays per label, and one slot per
+    day from the first day seen.
+    """
+
+    def __init__(self):
+        """Initialize empty aggregates."""
+        self.labels = []
+        self._label_slots = {}
+        self.hours = array('q')
+        self.weekdays = array('q')
+        self.days = {}
+        self.first_day = None
+        self.total = 0
+        self._dates = {}
+
+    def _slot(self, label):
+        """Return the array slot of a label, allocating its rows on first use."""
+        slot = self._label_slots.get(label)
+        if slot is None:
+            slot = len(self.labels)
+            self.labels.append(label)
+            self._label_slots[label] = slot
+            self.hours.extend([0] * 24)
+            self.weekdays.extend([0] * 7)
+            self.days[slot] = array('q')
+        return slot
+
+    def _add(self, ordinal, weekday, hour, slot, count):
+        """Add count entries for one (day, hour, label) key."""
+        self.hours[slot * 24 + hour] += count
+        self.weekdays[slot * 7 + weekday] += count
+        if self.first_day is None:
+            self.first_day = ordinal
+        elif ordinal < self.first_day:
+            shift = self.first_day - ordinal
+            for label_slot, days in self.days.items():
+                self.days[label_slot] = array('q', [0] * shift) + days
+            self.first_day = ordinal
+        days = self.days[slot]
+        index = ordinal - self.first_day
+        if index >= len(days):
+            days.extend([0] * (index + 1 - len(days)))
+        days[index] += count
+        self.total += count
+
+    def update_text(self, chunk):
+        """Aggregate a chunk of (YYYY-MM-DD, HH, label) keys."""
+        dates = self._dates
+        for (day, hour, label), count in Counter(chunk).items():
+            parsed = dates.get(day)
+            if parsed is None:
+                try:
+                    d = date(int(day[:4]), int(day[5:7]), int(day[8:10]))
+                except ValueError:
+                    continue
+                parsed = dates[day] = (d.toordinal(), d.weekday())
+            self._add(parsed[0], parsed[1], int(hour), self._slot(label), count)
+
+    def update_events(self, chunk):
+        """Aggregate a chunk of (15 minute bucket, label) keys."""
+        self.update_buckets(Counter(chunk).items())
+
+    def update_buckets(self, counts):
+        """Aggregate ((15 minute bucket, label), count) pairs."""
+        for (bucket, label), count in counts:
+            local = time.localtime(bucket * _BUCKET_SECONDS)
+            ordinal = date(local.tm_year, local.tm_mon, local.tm_mday).toordinal()
+            self._add(ordinal, local.tm_wday, local.tm_hour, self._slot(label), count)
+
+    def rows(self, by):
+        """Yield (label, dimension, bucket, count) rows for the requested dimensions."""
+        for slot, label in enumerate(self.labels):
+            if by in ('hour', 'all'):
+                for hour in range(24):
+                    yield label, 'hour', f"{hour:02d}", self.hours[slot * 24 + hour]
+            if by in ('weekday', 'all'):
+                for weekday in range(7):
+                    yield label, 'weekday', WEEKDAYS[weekday], self.weekdays[slot * 7 + weekday]
+            if by in ('day', 'all'):
+                for index, count in enumerate(self.days[slot]):
+                    if count:
+                        day = date.fromordinal(self.first_day + index).isoformat()
+                        yield label, 'day', day, count
+
+    def to_dict(self, by):
+        """Return the aggregates as a JSON-serializable dict."""
+        result = {'total': self.total, 'labels': {}}
+        for label, dimension, bucket, count in self.rows(by):
+            per_label = result['labels'].setdefault(label, {})
+            per_label.setdefault(dimension, {})[bucket] = count
+        return result
+
+
+def aggregate(logs_dir, source='auto', database=None):
+    """Stream the history of logs_dir through a Rollup and return it.
+
+    'auto' reads the text logs, or the entries database instead when one is
+    given, since it takes in the text logs on first open. Either way the
+    binary event store is read too: a store started after switching
+    backends holds only the entries logged since.
+    """
+    events_dir = os.path.join(logs_dir, EVENTS_DIRNAME)
+    if source == 'sqlite' and database is None:
+        database = os.path.join(logs_dir, SQLITE_FILENAME)
+    rollup = Rollup()
+    if source == 'text' or (source == 'auto' and database is None):
+        for chunk in chunked(iter_text_keys(logs_dir)):
+            rollup.update_text(chunk)
+    if source == 'sqlite' or (source == 'auto' and database is not None):
+        rollup.update_buckets(iter_sqlite_counts(database))
+    if source in ('auto', 'binary') and list_segments(events_dir):
+        for chunk in chunked(iter_event_keys(events_dir)):
+            rollup.update_events(chunk)
+    return rollup
+
+
+def write_output(rollup, by, fmt, out):
+    """Write the aggregates as CSV or JSON."""
+    if fmt == 'json':
+        json.dump(rollup.to_dict(by), out, indent=2)
+        out.write('\n')
+        return
+    writer = csv.writer(out)
+    writer.writerow(['label', 'dimension', 'bucket', 'count'])
+    writer.writerows(rollup.rows(by))
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Per-label urge counts by hour, weekday and day")
+    parser.add_argument('--logs-dir', default=default_logs_dir())
+    parser.add_argument('--source', choices=['auto', 'text', 'binary', 'sqlite'],
+                        default='auto',
+                        help="read only the text logs, the binary event store or the "
+                             "entries database (default: the configured history)")
+    parser.add_argument('--by', choices=['hour', 'weekday', 'day', 'all'], default='all')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--output', help="write to a file instead of stdout")
+    args = parser.parse_args(argv)
+
+    database = None
+    if args.source == 'auto' and Config().get('storage').get('backend') == BACKEND_SQLITE:
+        database = os.path.join(args.logs_dir, SQLITE_FILENAME)
+    rollup = aggregate(args.logs_dir, args.source, database)
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as out:
+            write_output(rollup, args.by, args.format, out)
+    else:
+        write_output(rollup, args.by, args.format, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
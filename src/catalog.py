@@ -0,0 +1,119 @@
+"""Label catalog with fuzzy filtering and usage ranking.
+
+The catalog precomputes, for every label, its lowercased name, the word
+starts in it and a 64-bit mask of the characters it contains. A query is
+first checked against the masks, which rejects most labels with one AND;
+only the rest are matched character by character. When a query extends the
+previous one, only the previous matches are searched again, so typing stays
+well under a frame at thousands of labels.
+"""
+import math
+
+# Weight of the usage score relative to the match score
+USAGE_WEIGHT = 8.0
+
+
+def _char_mask(text):
+    """Return a bit mask of the characters in text (collisions only weaken the filter)."""
+    mask = 0
+    for char in text:
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _word_starts(name):
+    """Return the positions in name that start a word."""
+    return frozenset(i for i, char in enumerate(name)
+                     if char.isalnum() and (i == 0 or not name[i - 1].isalnum()))
+
+
+def match_score(query, name, starts):
+    """Score how well a lowercase query matches a lowercase name; None if it does not.
+
+    Prefixes beat whole-word substrings, which beat other substrings, which
+    beat scattered subsequences; matches at word starts and runs of
+    consecutive characters score higher.
+    """
+    index = name.find(query)
+    if index == 0:
+        return 100.0 - len(name) * 0.01
+    if index > 0:
+        return (80.0 if index in starts else 60.0) - index * 0.1
+    # Greedy subsequence match
+    score = 0.0
+    position = 0
+    previous = -2
+    for char in query:
+        index = name.find(char, position)
+        if index < 0:
+            return None
+        if index in starts:
+            score += 3.0
+        elif index == previous + 1:
+            score += 2.0
+        else:
+            score += 0.5
+        previous = index
+        position = index + 1
+    return score * 40.0 / (len(query) * 3.0)
+
+
+class LabelCatalog:
+    """Every selectable label, filterable by fuzzy query and ranked by use."""
+
+    def __init__(self, labels, usage=None):
+        """Index labels (Label tuples); usage maps label id to a recency-weighted count."""
+        self.labels = list(labels)
+        self._names = [label.name.lower() for label in self.labels]
+        self._masks = [_char_mask(name) for name in self._names]
+        self._starts = [_word_starts(name) for name in self._names]
+        self.set_usage(usage or {})
+
+    def set_usage(self, usage):
+        """Replace the usage scores and re-rank."""
+        self._usage = [usage.get(label.id, 0.0) for label in self.labels]
+        self._rank_usage()
+
+    def touch(self, label_id):
+        """Count one use of a label now, so it ranks higher immediately."""
+        for i, label in enumerate(self.labels):
+            if label.id == label_id:
+                self._usage[i] += 1.0
+        self._rank_usage()
+
+    def _rank_usage(self):
+        """Precompute the empty-query order and drop the incremental cache."""
+        self._boost = [USAGE_WEIGHT * math.log1p(usage) for usage in self._usage]
+        self._order = sorted(range(len(self.labels)),
+                             key=lambda i: (-self._usage[i], self._names[i]))
+        self._last_query = None
+        self._last_matches = None
+
+    def filter(self, query, limit=None):
+        """Return the labels matching query, best first."""
+        query = query.strip().lower()
+        if not query:
+            return [self.labels[i] for i in self._order[:limit]]
+
+        if self._last_query is not None and query.startswith(self._last_query):
+            # A longer query can only match a subset of the shorter one's matches
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self.labels))
+        query_mask = _char_mask(query)
+        names, masks, starts, boost = self._names, self._masks, self._starts, self._boost
+        scored = []
+        for i in candidates:
+            if query_mask & ~masks[i]:
+                continue
+            score = match_score(query, names[i], starts[i])
+            if score is not None:
+                scored.append((score + boost[i], i))
+        self._last_query = query
+        self._last_matches = [i for _, i in scored]
+        scored.sort(key=lambda item: (-item[0], names[item[1]]))
+        return [self.labels[i] for _, i in scored[:limit]]
+
+    def __len__(self):
+        """Return the number of labels."""
+        return len(self.labels)
@@ -0,0 +1,235 @@
+"""Scheduled check-in prompts.
+
+A schedule lists the times of day a prompt is due, either fixed ("at") or
+every N minutes within a daily window, on chosen weekdays. Every schedule
+shares one deadline heap, so the app runs a single timer re-armed for the
+earliest deadline however many schedules there are.
+
+Deadlines are wall-clock times, since "09:00" means the clock on the wall,
+while the app's timer counts monotonic time that stops during suspend and
+ignores clock changes. The timer therefore never sleeps longer than
+MAX_SLEEP, and every wake compares deadlines with the wall clock. Prompts
+missed during suspend, after a clock jumped forward or while the app was
+closed collapse into the newest one, which is shown if it is within the
+grace period and skipped otherwise. A clock set back rebuilds the heap.
+The last prompt of each schedule is saved, so a restart never repeats one.
+"""
+import heapq
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from src.config import ConfigError
+from src.utils.write_behind import atomic_write
+
+CHECKINS_FILENAME = 'checkins.json'
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+# Longest the timer sleeps before the wall clock is checked again
+MAX_SLEEP = 60.0
+# A missed prompt older than this is skipped rather than shown late
+GRACE_SECONDS = 15 * 60
+# A wall clock this far behind the previous check was set back
+_BACKWARD_JUMP = 5.0
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _parse_time(value, name):
+    """Parse "HH:MM" into minutes after midnight; "24:00" is the end of the day."""
+    try:
+        hours, minutes = value.split(':')
+        total = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        raise ConfigError(f"{name} must be a time like \"09:30\", not {value!r}")
+    if not 0 <= int(minutes) < 60 or not 0 <= total <= _MINUTES_PER_DAY:
+        raise ConfigError(f"{name} must be a time like \"09:30\", not {value!r}")
+    return total
+
+
+class Schedule:
+    """The minutes of the day a check-in is due, on a set of weekdays."""
+
+    def __init__(self, key, label, days, minutes):
+        """Initialize the schedule; minutes are sorted minutes after midnight."""
+        self.key = key
+        # Label key, name or id to ask about, or None for the label popup
+        self.label = label
+        self.days = frozenset(days)
+        self.minutes = minutes
+
+    @staticmethod
+    def _epoch(day, minute):
+        """Return the epoch seconds of a local time; DST gaps resolve like mktime."""
+        return datetime(day.year, day.month, day.day, minute // 60, minute % 60).timestamp()
+
+    def next_after(self, now):
+        """Return the first occurrence strictly after epoch seconds now."""
+        start = datetime.fromtimestamp(now)
+        first = bisect_left(self.minutes, start.hour * 60 + start.minute)
+        for offset in range(8):
+            day = start.date() + timedelta(days=offset)
+            if day.weekday() not in self.days:
+                continue
+            for minute in self.minutes[first if offset == 0 else 0:]:
+                at = self._epoch(day, minute)
+                if at > now:
+                    return at
+        return None
+
+    def latest_until(self, now):
+        """Return the last occurrence at or before epoch seconds now."""
+        start = datetime.fromtimestamp(now)
+        last = bisect_right(self.minutes, start.hour * 60 + start.minute)
+        for offset in range(8):
+            day = start.date() - timedelta(days=offset)
+            if day.weekday() not in self.days:
+                continue
+            for minute in reversed(self.minutes[:last] if offset == 0 else self.minutes):
+                at = self._epoch(day, minute)
+                if at <= now:
+                    return at
+        return None
+
+
+def parse_schedules(values):
+    """Return the Schedules of the config.json checkins list; raise ConfigError if invalid.
+
+    Each schedule is an object with either "at": ["HH:MM", ...] or
+    "every_minutes": N with optional "from" and "until" times bounding the
+    daily window (until excluded), plus optional "days" (weekday names,
+    default every day), "label" (key, name or id) and "name".
+    """
+    if not isinstance(values, list):
+        raise ConfigError("checkins must be a list of schedules")
+    schedules = []
+    keys = set()
+    for value in values:
+        if not isinstance(value, dict):
+            raise ConfigError(f"check-in schedule {value!r} must be an object")
+        days = value.get('days', WEEKDAYS)
+        if not isinstance(days, list) or not days or \
+                not all(isinstance(day, str) and day.lower()[:3] in WEEKDAYS for day in days):
+            raise ConfigError(f"checkins days must be a list of weekday names, not {days!r}")
+        if 'at' in value:
+            if not isinstance(value['at'], list) or not value['at']:
+                raise ConfigError("checkins at must be a non-empty list of times")
+            minutes = sorted({_parse_time(at, 'checkins at') for at in value['at']})
+            if minutes[-1] >= _MINUTES_PER_DAY:
+                raise ConfigError("checkins at must be before 24:00")
+        elif 'every_minutes' in value:
+            step = value['every_minutes']
+            if not isinstance(step, int) or isinstance(step, bool) or step <= 0:
+                raise ConfigError("checkins every_minutes must be a positive integer")
+            start = _parse_time(value.get('from', '00:00'), 'checkins from')
+            end = _parse_time(value.get('until', '24:00'), 'checkins until')
+            minutes = list(range(start, end, step))
+            if not minutes:
+                raise ConfigError(f"checkins window {value.get('from')}-{value.get('until')} is empty")
+        else:
+            raise ConfigError("a check-in schedule needs \"at\" or \"every_minutes\"")
+        label = value.get('label')
+        if label is not None and not isinstance(label, str):
+            raise ConfigError(f"checkins label must be a string, not {label!r}")
+        # Unnamed schedules are known by their settings, so an edit starts afresh
+        key = value.get('name') or json.dumps(value, sort_keys=True)
+        if key in keys:
+            raise ConfigError(f"check-in schedule {key!r} is listed twice")
+        keys.add(key)
+        schedules.append(Schedule(key, label, [WEEKDAYS.index(day.lower()[:3]) for day in days],
+                                  minutes))
+    return schedules
+
+
+class CheckInScheduler:
+    """Deadline heap over every schedule, with the last prompt of each saved.
+
+    The owner calls due() when sleep_for() says so and shows a prompt for
+    each schedule returned. Nothing here touches Qt.
+    """
+
+    def __init__(self, state_path, grace=GRACE_SECONDS):
+        """Initialize the scheduler and load when each schedule last fired."""
+        self.state_path = state_path
+        self.grace = grace
+        self.schedules = {}
+        # (deadline, schedule key), earliest first
+        self._heap = []
+        self._last_check = None
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self._last_fired = json.load(f)['last_fired']
+        except (FileNotFoundError, KeyError, TypeError, ValueError):
+            self._last_fired = {}
+
+    def configure(self, schedules, now=None):
+        """Replace the schedules; one kept from before keeps its last prompt."""
+        self.schedules = {schedule.key: schedule for schedule in schedules}
+        self._rebuild(time.time() if now is None else now)
+
+    def _rebuild(self, now):
+        """Compute every schedule's next deadline from scratch."""
+        self._heap = []
+        for key, schedule in self.schedules.items():
+            # A recent prompt missed while the app was closed is still due
+            deadline = schedule.latest_until(now)
+            if deadline is None or not self._should_fire(key, deadline, now):
+                deadline = schedule.next_after(now)
+            if deadline is not None:
+                self._heap.append((deadline, key))
+        heapq.heapify(self._heap)
+        self._last_check = now
+
+    def _should_fire(self, key, occurrence, now):
+        """Return True if an occurrence is recent and newer than the last prompt."""
+        return now - occurrence <= self.grace and occurrence > self._last_fired.get(key, 0)
+
+    def due(self, now=None):
+        """Return the schedules to prompt for now and re-arm them.
+
+        Occurrences missed since a deadline passed collapse into the newest
+        one, which is returned only if it is recent.
+        """
+        now = time.time() if now is None else now
+        if self._last_check is not None and now < self._last_check - _BACKWARD_JUMP:
+            self._rebuild(now)
+        self._last_check = now
+        fired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            schedule = self.schedules[key]
+            occurrence = schedule.latest_until(now)
+            if occurrence is not None and self._should_fire(key, occurrence, now):
+                self._last_fired[key] = occurrence
+                fired.append(schedule)
+            deadline = schedule.next_after(now)
+            if deadline is not None:
+                heapq.heappush(heap, (deadline, key))
+        if fired:
+            self._save()
+        return fired
+
+    def next_deadline(self):
+        """Return the earliest deadline in epoch seconds, or None without schedules."""
+        return self._heap[0][0] if self._heap else None
+
+    def sleep_for(self, now=None):
+        """Return the seconds to wait before calling due(), or None to stop."""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        now = time.time() if now is None else now
+        return min(max(0.0, deadline - now), MAX_SLEEP)
+
+    def _save(self):
+        """Write when each schedule last fired, dropping removed schedules."""
+        try:
+            self._last_fired = {key: fired for key, fired in self._last_fired.items()
+                                if key in self.schedules}
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            atomic_write(self.state_path,
+                         json.dumps({'last_fired': self._last_fired}).encode('utf-8'))
+        except OSError:
+            # Worst case a restart shows the latest prompt again
+            pass
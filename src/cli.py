@@ -0,0 +1,311 @@
+"""Command line client for a running Urge instance.
+
+    urge log [--label LABEL] TEXT
+    urge log --batch [FILE]
+    urge show
+    urge status
+    urge search [--label LABEL] [--since DATE] [--until DATE] WORDS
+    urge sync [--only import|export] TARGET...
+    urge export [--jobs N] FILE
+    urge import [--jobs N] FILE
+
+Entries are handed to the running tray app over its local socket, so this
+module must not import PyQt5 or anything that does.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from src import ipc
+
+
+def _parse_batch_line(line, default_label):
+    """Turn one batch line into an entry dict.
+
+    A line is either a JSON object with "text" and optional "label" and
+    "timestamp", "LABEL<TAB>TEXT", or plain text.
+    """
+    line = line.rstrip('\n')
+    if not line.strip():
+        return None
+    if line.startswith('{'):
+        entry = json.loads(line)
+        entry.setdefault('label', default_label)
+        return entry
+    label, tab, text = line.partition('\t')
+    if tab:
+        return {'text': text, 'label': label or default_label}
+    return {'text': line, 'label': default_label}
+
+
+def _read_batch(stream, default_label, batch_size):
+    """Yield lists of at most batch_size entries read from stream.
+
+    The app only appends entries in time order, so a timestamp before the
+    previous one raises ValueError.
+    """
+    batch = []
+    last = None
+    for number, line in enumerate(stream, 1):
+        entry = _parse_batch_line(line, default_label)
+        if entry is None:
+            continue
+        timestamp = entry.get('timestamp')
+        if isinstance(timestamp, (int, float)):
+            if last is not None and timestamp < last:
+                raise ValueError(f"line {number}: timestamp is before the previous entry's")
+            last = timestamp
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def cmd_log(args):
+    """Submit one entry or a batch."""
+    if args.batch is not None:
+        # Read and checked whole before connecting, so a bad file logs nothing and
+        # a missing one is not reported as the missing socket
+        try:
+            if args.batch == '-':
+                batches = list(_read_batch(sys.stdin, args.label, args.batch_size))
+            else:
+                with open(args.batch, 'r', encoding='utf-8') as stream:
+                    batches = list(_read_batch(stream, args.label, args.batch_size))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        total = 0
+        for batch in batches:
+            total += ipc.log_entries(batch)['count']
+        print(f"Logged {total} entries")
+        return 0
+    text = ' '.join(args.text)
+    if not text:
+        print("Nothing to log: give TEXT or --batch", file=sys.stderr)
+        return 2
+    ipc.log_entries([{'text': text, 'label': args.label}])
+    return 0
+
+
+def cmd_show(args):
+    """Open the label selection popup in the running instance."""
+    ipc.request({'op': 'show'})
+    return 0
+
+
+def cmd_status(args):
+    """Report whether an instance is running."""
+    try:
+        reply = ipc.request({'op': 'ping'}, timeout=1.0)
+    except (OSError, ipc.IPCError):
+        print("Urge is not running")
+        return 1
+    print(f"Urge is running (pid {reply.get('pid')}) at {ipc.socket_path()}")
+    return 0
+
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD[ HH:MM] argument into epoch seconds."""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Invalid date: {value}")
+
+
+def _logs_dir():
+    """Return the logs directory the app writes to."""
+    from src.storage.backends import default_logs_dir
+    return default_logs_dir()
+
+
+def _search_offline(query, label, start, end, limit):
+    """Search the saved index directly when no instance is running."""
+    from src.config import Config
+    from src.storage.search import SEARCH_DIRNAME, SearchIndex
+
+    logs_dir = _logs_dir()
+    config = Config()
+    index = SearchIndex(os.path.join(logs_dir, SEARCH_DIRNAME), logs_dir)
+    # Read only: entries logged after the app last saved its index are not found
+    index.load(None)
+    if label is not None:
+        label = config.label_id(label)
+    return [{'timestamp': hit.entry.timestamp, 'text': hit.entry.text, 'score': hit.score,
+             'label': config.label_name(hit.entry.label) if hit.entry.label else None}
+            for hit in index.search(query, label, start, end, limit)]
+
+
+def cmd_search(args):
+    """Print past entries containing every given word, best match first."""
+    query = ' '.join(args.words)
+    results = None
+    if ipc.is_supported():
+        try:
+            results = ipc.search(query, args.label, args.since, args.until, args.limit)
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+    if results is None:
+        results = _search_offline(query, args.label, args.since, args.until, args.limit)
+    for result in results:
+        stamp = datetime.fromtimestamp(result['timestamp']).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{stamp}\t{result['label'] or ''}\t{result['text']}")
+    if not results:
+        print("No matching entries", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _is_running():
+    """Return True if an instance answers on its socket."""
+    if not ipc.is_supported():
+        return False
+    try:
+        ipc.request({'op': 'ping'}, timeout=1.0)
+    except (OSError, ipc.IPCError):
+        return False
+    return True
+
+
+def cmd_sync(args):
+    """Merge the history with other machines through shared directories or URLs."""
+    from src.config import Config
+    from src.storage import sync
+
+    backend = Config().get('storage').get('backend', 'text')
+    if backend != 'text':
+        print(f"Sync works on the text logs; the {backend} storage backend is in use",
+              file=sys.stderr)
+        return 1
+    pull = args.only != 'export'
+    if pull and _is_running():
+        # The app keeps today's log open for appending, so it must not be replaced
+        print("Quit Urge before importing, or sync with --only export", file=sys.stderr)
+        return 1
+    result = sync.sync(_logs_dir(), [sync.open_target(target) for target in args.targets],
+                       pull=pull, push=args.only != 'import')
+    if not result.merged:
+        print(f"Up to date ({result.days} days)")
+        return 0
+    print(f"{result.merged} of {result.days} days differed: {result.pulled} updated here "
+          f"({result.added} entries added), {result.pushed} updated on the targets")
+    return 0
+
+
+def cmd_export(args):
+    """Write the whole history to a columnar export file."""
+    from src.config import Config
+    from src.storage import columnar
+    from src.storage.backends import (
+        BACKEND_BINARY, BACKEND_SQLITE, EVENTS_DIRNAME, SQLITE_FILENAME
+    )
+
+    logs_dir = _logs_dir()
+    backend = Config().get('storage').get('backend', 'text')
+    database = events = None
+    if backend == BACKEND_SQLITE:
+        database = os.path.join(logs_dir, SQLITE_FILENAME)
+    elif backend == BACKEND_BINARY:
+        events = os.path.join(logs_dir, EVENTS_DIRNAME)
+    try:
+        result = columnar.export_history(logs_dir, args.file, args.jobs, database, events)
+    except FileNotFoundError as e:
+        # Not the missing socket that main() reports as "not running"
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {result.entries} entries in {result.blocks} blocks "
+          f"({result.size / 1024:.0f} KB) to {args.file}")
+    return 0
+
+
+def cmd_import(args):
+    """Merge the entries of a columnar export file into the history."""
+    from src.config import Config
+    from src.storage import columnar
+
+    backend = Config().get('storage').get('backend', 'text')
+    if backend != 'text':
+        print(f"Import writes the text logs; the {backend} storage backend is in use",
+              file=sys.stderr)
+        return 1
+    if _is_running():
+        # The app keeps today's log open for appending, so it must not be replaced
+        print("Quit Urge before importing", file=sys.stderr)
+        return 1
+    try:
+        result = columnar.import_history(_logs_dir(), args.file, args.jobs)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Read {result.entries} entries: {result.added} added to {result.days} days")
+    return 0
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog='urge', description="Talk to the running Urge tray app")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    log = commands.add_parser('log', help="record an entry")
+    log.add_argument('--label', help="label key from config.json (e.g. 2) or label text")
+    log.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                     help="read one entry per line from FILE or stdin")
+    log.add_argument('--batch-size', type=int, default=1000)
+    log.add_argument('text', nargs='*')
+    log.set_defaults(func=cmd_log)
+
+    show = commands.add_parser('show', help="open the label selection popup")
+    show.set_defaults(func=cmd_show)
+
+    status = commands.add_parser('status', help="check whether the tray app is running")
+    status.set_defaults(func=cmd_status)
+
+    search = commands.add_parser('search', help="find past entries by the words in them")
+    search.add_argument('--label', help="only entries with this label (key, name or id)")
+    search.add_argument('--since', type=_parse_date, help="from YYYY-MM-DD[ HH:MM]")
+    search.add_argument('--until', type=_parse_date, help="before YYYY-MM-DD[ HH:MM]")
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('words', nargs='+', help="words to find; end one with * for a prefix")
+    search.set_defaults(func=cmd_search)
+
+    sync = commands.add_parser('sync', help="merge the history with other machines")
+    sync.add_argument('--only', choices=['import', 'export'],
+                      help="only update this machine, or only the targets")
+    sync.add_argument('targets', nargs='+',
+                      help="shared directory or URL of a server started with "
+                           "'python -m src.storage.sync serve DIR'")
+    sync.set_defaults(func=cmd_sync)
+
+    export = commands.add_parser('export', help="write the history to a columnar file")
+    export.add_argument('--jobs', type=int, help="parsing processes (default: one per CPU)")
+    export.add_argument('file')
+    export.set_defaults(func=cmd_export)
+
+    import_ = commands.add_parser('import', help="merge the entries of an exported file")
+    import_.add_argument('--jobs', type=int, help="formatting processes (default: one per CPU)")
+    import_.add_argument('file')
+    import_.set_defaults(func=cmd_import)
+
+    args = parser.parse_args(argv)
+    if not ipc.is_supported() and args.func not in (cmd_search, cmd_sync, cmd_export,
+                                                         cmd_import):
+        print("This platform has no Unix domain sockets", file=sys.stderr)
+        return 1
+    try:
+        return args.func(args)
+    except (ConnectionRefusedError, FileNotFoundError):
+        print("Urge is not running", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, ipc.IPCError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
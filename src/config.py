@@ -1,40 +1,283 @@
+import copy
 import json
 import os
+import threading
+from collections import namedtuple
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'config.json')
+
+# Default configuration; config.json overrides it key by key within each section
+DEFAULTS = {
+    "app": {"name": "Urge", "window_width": 600, "window_height": 40,
+            "prewarm_windows": True},
+    "ui": {"background_color": "#333", "text_color": "#fff",
+           "font_size_normal": "14px", "font_size_large": "16px"},
+    "labels": {"1": "Label 1", "2": "Label 2", "3": "Label 3",
+               "4": "Label 4", "5": "Label 5"},
+    "paths": {"logs": "./logs", "assets": "./assets"},
+    "storage": {"backend": "text", "index": True, "search": True, "chart": True,
+                "risk": True, "flush_mode": "interval", "flush_interval_ms": 200,
+                "fsync": False},
+    "catalog": [],
+    "checkins": [],
+    "risk": {"horizon_hours": 6, "threshold": 0.3},
+    "hotkey": {"backend": "auto", "combos": ["ctrl+space"]},
+    "logging": {"compress_after_days": 2, "retention_days": 90},
+    "diagnostics": {"heartbeat_ms": 100, "stall_threshold_ms": 500,
+                    "profiler": "sampling", "sample_interval_ms": 10}
+}
+
+# Typed views of the settings the windows use on every popup
+UISettings = namedtuple('UISettings', ['background_color', 'text_color',
+                                       'font_size_normal', 'font_size_large'])
+Geometry = namedtuple('Geometry', ['window_width', 'window_height'])
+# A selectable label: its shortcut key, the stable id stored with entries,
+# and the name shown in the windows. The id is the label's first name, so
+# renaming it never splits its history.
+Label = namedtuple('Label', ['key', 'id', 'name'])
+# One validated, immutable version of the configuration
+# labels holds the labels with shortcut keys; catalog holds every configured
+# label, shortcuts first, with key None for the rest
+Snapshot = namedtuple('Snapshot', ['version', 'data', 'ui', 'geometry', 'labels', 'catalog'])
+
+
+class ConfigError(ValueError):
+    """Raised when config.json cannot be parsed or fails validation."""
+
+
+def _merge(data):
+    """Return DEFAULTS overridden by the sections and keys present in data."""
+    if not isinstance(data, dict):
+        raise ConfigError("config.json must hold a JSON object")
+    merged = copy.deepcopy(DEFAULTS)
+    for section, values in data.items():
+        if isinstance(values, dict) and isinstance(merged.get(section), dict) \
+                and section != 'labels':
+            merged[section].update(values)
+        else:
+            # The label set is replaced as a whole so labels can be removed
+            merged[section] = values
+    return merged
+
+
+def _parse_label(key, value):
+    """Return the Label for a config value: a name, or {"id": ..., "name": ...}."""
+    if isinstance(value, dict):
+        name = value.get('name')
+        label_id = value.get('id', name)
+    else:
+        name = label_id = value
+    for field in (label_id, name):
+        if not isinstance(field, str) or not field.strip() or '\n' in field:
+            raise ConfigError(f"label {value!r} needs a non-empty single-line name and id")
+    return Label(key, label_id, name)
+
+
+def validate(data, version=0):
+    """Check a parsed config.json and return its Snapshot."""
+    data = _merge(data)
+    for section, default in DEFAULTS.items():
+        # A section given as something else replaces the defaults whole
+        if isinstance(default, dict) and section != 'labels' \
+                and not isinstance(data[section], dict):
+            raise ConfigError(f"{section} must be an object")
+    app, ui, labels = data['app'], data['ui'], data['labels']
+    for key in ('window_width', 'window_height'):
+        if not isinstance(app.get(key), int) or isinstance(app[key], bool) or app[key] <= 0:
+            raise ConfigError(f"app.{key} must be a positive integer")
+    for key in UISettings._fields:
+        if not isinstance(ui.get(key), str) or not ui[key]:
+            raise ConfigError(f"ui.{key} must be a non-empty string")
+    if not isinstance(labels, dict) or not labels:
+        raise ConfigError("labels must map keys to label names")
+    parsed = []
+    for key, value in labels.items():
+        if len(key) != 1 or not key.isalnum():
+            raise ConfigError(f"label key {key!r} must be a single letter or digit")
+        parsed.append(_parse_label(key, value))
+    if len({label.id for label in parsed}) != len(parsed):
+        raise ConfigError("label ids must be unique")
+    if not isinstance(data['catalog'], list):
+        raise ConfigError("catalog must be a list of labels")
+    catalog = list(parsed)
+    seen = {label.id for label in parsed}
+    for value in data['catalog']:
+        label = _parse_label(None, value)
+        # A catalog entry that also has a shortcut is listed once
+        if label.id not in seen:
+            seen.add(label.id)
+            catalog.append(label)
+    # Imported here since the check-in module itself imports ConfigError
+    from src.checkins import parse_schedules
+    parse_schedules(data['checkins'])
+    combos = data['hotkey'].get('combos')
+    if not isinstance(combos, list) or not all(isinstance(c, str) for c in combos):
+        raise ConfigError("hotkey.combos must be a list of strings")
+    return Snapshot(
+        version,
+        data,
+        UISettings(*(ui[key] for key in UISettings._fields)),
+        Geometry(app['window_width'], app['window_height']),
+        tuple(parsed),
+        tuple(catalog),
+    )
+
+
+def labels_section(labels):
+    """Return the config.json form of a sequence of Labels."""
+    return {label.key: label.name if label.id == label.name
+            else {'id': label.id, 'name': label.name}
+            for label in labels}
+
+
+def _build_label_lookup(snapshot):
+    """Return {key, id or name: id} for resolving labels given by clients."""
+    lookup = {}
+    for label in snapshot.catalog:
+        lookup[label.name] = label.id
+        lookup[label.id] = label.id
+    for label in snapshot.labels:
+        lookup[label.key] = label.id
+    return lookup
+
+
+def _build_label_names(snapshot):
+    """Return {id: name} for display."""
+    return {label.id: label.name for label in snapshot.catalog}
+
 
 class Config:
-    """Configuration handler for the application."""
-    
+    """Configuration handler for the application.
+
+    The configuration is held as an immutable Snapshot that reload() swaps
+    for a new version. Values computed from it (stylesheets, key maps) are
+    cached per version with derived().
+    """
+
     _instance = None
     _config = None
-    
+
     def __new__(cls):
         """Implement singleton pattern."""
         if cls._instance is None:
             cls._instance = super(Config, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._writer = None
+            # Called with the exception when label edits could not be written
+            cls._instance.on_save_error = None
             cls._instance._load_config()
         return cls._instance
-    
+
+    @property
+    def path(self):
+        """Path of the config.json file."""
+        return CONFIG_PATH
+
+    def _read(self):
+        """Read and parse config.json; None if it does not exist."""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise ConfigError(f"config.json is not valid JSON: {str(e)}")
+
+    def _install(self, snapshot):
+        """Make a snapshot current and drop values derived from the old one."""
+        self._snapshot = snapshot
+        self._config = snapshot.data
+        self._derived = {}
+
     def _load_config(self):
         """Load configuration from config.json file."""
         try:
-            config_path = os.path.join(os.path.dirname(os.path.dirname(
-                os.path.dirname(os.path.abspath(__file__)))), 'config.json')
-            
-            with open(config_path, 'r') as f:
-                self._config = json.load(f)
-        except FileNotFoundError:
-            # Default configuration if file not found
-            self._config = {
-                "app": {"name": "Urge", "window_width": 600, "window_height": 40},
-                "ui": {"background_color": "#333", "text_color": "#fff", 
-                      "font_size_normal": "14px", "font_size_large": "16px"},
-                "labels": {"1": "Label 1", "2": "Label 2", "3": "Label 3", 
-                          "4": "Label 4", "5": "Label 5"},
-                "paths": {"logs": "./logs", "assets": "./assets"}
-            }
-    
+            data = self._read()
+            self._install(validate(data or {}))
+        except ConfigError:
+            # An invalid file at startup falls back to the defaults; reload()
+            # reports the error once the file is being watched
+            self._install(validate({}))
+
+    def reload(self):
+        """Re-read config.json; return the new Snapshot, or None if nothing changed.
+
+        Raises ConfigError and keeps the current version when the file is invalid.
+        """
+        if self._writer is not None and self._writer.pending:
+            # Our own write is on its way and will trigger another reload
+            return None
+        data = self._read()
+        with self._lock:
+            snapshot = validate(data or {}, self._snapshot.version + 1)
+            if snapshot.data == self._snapshot.data:
+                return None
+            self._install(snapshot)
+            return snapshot
+
+    def rename_labels(self, names):
+        """Rename labels given as {key: new name}; return the new Snapshot.
+
+        The change applies in memory at once; config.json is rewritten in the
+        background, once for a burst of edits.
+        """
+        with self._lock:
+            current = self._snapshot
+            labels = [label._replace(name=names.get(label.key, label.name).strip() or label.name)
+                      for label in current.labels]
+            data = dict(current.data, labels=labels_section(labels))
+            snapshot = validate(data, current.version + 1)
+            self._install(snapshot)
+            if self._writer is None:
+                from src.utils.write_behind import WriteBehind
+                self._writer = WriteBehind(self._save_labels, name='urge-config-writer',
+                                           on_error=self._save_failed)
+            self._writer.schedule()
+            return snapshot
+
+    def _save_labels(self):
+        """Write the current labels into config.json, keeping its other sections."""
+        from src.utils.write_behind import atomic_write
+        
+        # An unparsable file raises here, so a half-edited file is never overwritten
+        data = self._read() or {}
+        data['labels'] = labels_section(self._snapshot.labels)
+        atomic_write(self.path, (json.dumps(data, indent=2) + '\n').encode('utf-8'))
+
+    def _save_failed(self, error):
+        """Pass a failed write of config.json on; runs on the writer thread."""
+        if self.on_save_error is not None:
+            self.on_save_error(error)
+
+    def flush(self, timeout=None):
+        """Block until pending label edits are written to config.json."""
+        if self._writer is not None:
+            return self._writer.flush(timeout)
+        return True
+
+    def label_id(self, value):
+        """Return the id of a label given by key, name or id; unknown values pass through."""
+        return self.derived('label_lookup', _build_label_lookup).get(value, value)
+
+    def label_name(self, label_id):
+        """Return the display name of a label id."""
+        return self.derived('label_names', _build_label_names).get(label_id, label_id)
+
+    def snapshot(self):
+        """Return the current Snapshot."""
+        return self._snapshot
+
+    def derived(self, name, build):
+        """Return build(snapshot) for the current version, computing it only once."""
+        derived = self._derived
+        value = derived.get(name)
+        if value is None:
+            value = derived[name] = build(self._snapshot)
+        return value
+
     def get(self, section, key=None):
         """Get configuration value."""
         if key is None:
             return self._config.get(section, {})
-        return self._config.get(section, {}).get(key)
\ No newline at end of file
+        return self._config.get(section, {}).get(key)
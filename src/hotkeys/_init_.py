@@ -0,0 +1,4 @@
+from .base import Combo, HotkeyBackend, HotkeyError, parse_combo
+from .backends import start_backend
+
+__all__ = ['Combo', 'HotkeyBackend', 'HotkeyError', 'parse_combo', 'start_backend']
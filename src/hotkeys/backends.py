@@ -0,0 +1,57 @@
+import os
+import sys
+
+from src.hotkeys.base import HotkeyError
+
+BACKEND_AUTO = 'auto'
+BACKEND_X11 = 'x11'
+BACKEND_KEYBOARD = 'keyboard'
+BACKEND_SYNTHETIC = 'synthetic'
+DEFAULT_COMBOS = ['ctrl+space']
+
+
+def _backend_class(name):
+    """Return the backend class for a name, importing only that backend."""
+    if name == BACKEND_X11:
+        from src.hotkeys.x11 import X11HotkeyBackend
+        return X11HotkeyBackend
+    if name == BACKEND_KEYBOARD:
+        from src.hotkeys.fallback import KeyboardHotkeyBackend
+        return KeyboardHotkeyBackend
+    if name == BACKEND_SYNTHETIC:
+        from src.hotkeys.synthetic import SyntheticHotkeyBackend
+        return SyntheticHotkeyBackend
+    raise ValueError(f"Unknown hotkey backend: {name}")
+
+
+def candidate_backends(name=None):
+    """Return the backend names to try, best first.
+
+    URGE_HOTKEY_BACKEND overrides the configured name; benchmarks and soak
+    runs set it to 'synthetic'.
+    """
+    name = os.environ.get('URGE_HOTKEY_BACKEND') or name or BACKEND_AUTO
+    if name != BACKEND_AUTO:
+        return [name]
+    if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        return [BACKEND_X11, BACKEND_KEYBOARD]
+    return [BACKEND_KEYBOARD]
+
+
+def start_backend(name, combos, callback, logger=None):
+    """Start the first backend that works and return it.
+
+    With 'auto', a grab-based backend is preferred and the keyboard package
+    is the fallback. Raises HotkeyError when no backend could register.
+    """
+    errors = []
+    for candidate in candidate_backends(name):
+        backend = _backend_class(candidate)(combos or DEFAULT_COMBOS, callback)
+        try:
+            backend.start()
+            return backend
+        except HotkeyError as e:
+            errors.append(f"{candidate}: {str(e)}")
+            if logger is not None:
+                logger.warning(f"Hotkey backend {candidate} unavailable: {str(e)}")
+    raise HotkeyError("; ".join(errors) or "No hotkey backend available")
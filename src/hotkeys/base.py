@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+# A key combination: a frozenset of modifier names and one key name
+Combo = namedtuple('Combo', ['modifiers', 'key'])
+
+MODIFIERS = {
+    'ctrl': 'ctrl', 'control': 'ctrl',
+    'shift': 'shift',
+    'alt': 'alt', 'option': 'alt',
+    'super': 'super', 'win': 'super', 'windows': 'super', 'meta': 'super', 'cmd': 'super',
+}
+
+
+class HotkeyError(Exception):
+    """Raised when a backend cannot register its combos on this system."""
+
+
+def parse_combo(text):
+    """Parse a combo such as 'ctrl+space' or 'Ctrl+Alt+U' into a Combo."""
+    parts = [part.strip().lower() for part in text.split('+')]
+    if not parts or not all(parts):
+        raise ValueError(f"Invalid hotkey combo: {text!r}")
+    *modifiers, key = parts
+    unknown = [name for name in modifiers if name not in MODIFIERS]
+    if unknown:
+        raise ValueError(f"Unknown modifier {unknown[0]!r} in hotkey combo {text!r}")
+    if key in MODIFIERS:
+        raise ValueError(f"Hotkey combo {text!r} has no non-modifier key")
+    return Combo(frozenset(MODIFIERS[name] for name in modifiers), key)
+
+
+def format_combo(combo):
+    """Return the canonical text form of a Combo."""
+    order = ['ctrl', 'shift', 'alt', 'super']
+    return '+'.join([name for name in order if name in combo.modifiers] + [combo.key])
+
+
+class HotkeyBackend:
+    """Base class of the global hotkey backends.
+
+    A backend registers its combos in start() and then calls callback(combo)
+    from its own thread whenever one is pressed; stop() unregisters them.
+    """
+
+    name = None
+
+    def __init__(self, combos, callback):
+        """Initialize the backend with combo strings and the press callback."""
+        self.combos = [parse_combo(combo) for combo in combos]
+        self.callback = callback
+
+    def start(self):
+        """Register the combos; raise HotkeyError if this backend is unavailable."""
+        raise NotImplementedError
+
+    def stop(self):
+        """Unregister the combos and stop any background thread."""
+        raise NotImplementedError
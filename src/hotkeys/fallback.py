@@ -0,0 +1,55 @@
+import threading
+
+from src.hotkeys.base import HotkeyBackend, HotkeyError, format_combo
+
+
+class KeyboardHotkeyBackend(HotkeyBackend):
+    """Backend built on the keyboard package.
+
+    keyboard hooks every key event system-wide and matches combos in Python,
+    so it is only used where no grab-based backend is available.
+    """
+
+    name = 'keyboard'
+
+    def __init__(self, combos, callback):
+        """Initialize the backend."""
+        super().__init__(combos, callback)
+        self._keyboard = None
+        self._handles = []
+
+    def start(self):
+        """Import keyboard and register the combos on a background thread."""
+        try:
+            import keyboard
+        except ImportError as e:
+            raise HotkeyError(f"keyboard package unavailable: {str(e)}")
+        self._keyboard = keyboard
+        ready = threading.Event()
+        errors = []
+
+        def register():
+            try:
+                for combo in self.combos:
+                    self._handles.append(keyboard.add_hotkey(
+                        format_combo(combo), self.callback, args=(combo,)))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                ready.set()
+
+        # Installing the hook can block on some platforms; keep it off the caller
+        threading.Thread(target=register, name='urge-hotkeys', daemon=True).start()
+        ready.wait(5)
+        if errors:
+            raise HotkeyError(f"keyboard could not register hotkeys: {str(errors[0])}")
+
+    def stop(self):
+        """Remove the registered hotkeys."""
+        if self._keyboard is not None:
+            for handle in self._handles:
+                try:
+                    self._keyboard.remove_hotkey(handle)
+                except (KeyError, ValueError):
+                    pass
+            self._handles = []
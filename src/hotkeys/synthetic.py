@@ -0,0 +1,33 @@
+from src.hotkeys.base import HotkeyBackend, parse_combo
+
+
+class SyntheticHotkeyBackend(HotkeyBackend):
+    """Backend that never touches the real keyboard; tests inject presses.
+
+    press() accepts any combo string and fires the callback on the calling
+    thread only when it matches a registered combo, the same filtering the
+    real backends do.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, combos, callback):
+        """Initialize the backend."""
+        super().__init__(combos, callback)
+        self.running = False
+
+    def start(self):
+        """Start accepting synthetic presses."""
+        self.running = True
+
+    def stop(self):
+        """Ignore further presses."""
+        self.running = False
+
+    def press(self, combo):
+        """Inject a key press; return True if it matched a registered combo."""
+        pressed = parse_combo(combo)
+        if self.running and pressed in self.combos:
+            self.callback(pressed)
+            return True
+        return False
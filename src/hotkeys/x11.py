@@ -0,0 +1,205 @@
+"""Global hotkeys through X11 passive key grabs.
+
+XGrabKey asks the X server to deliver only the registered combos to this
+client, so the process sleeps in select() until one of them is pressed.
+Nothing runs for ordinary keystrokes. libX11 is loaded with ctypes, so
+no extra package is needed.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import threading
+
+from src.hotkeys.base import HotkeyBackend, HotkeyError
+
+KEY_PRESS = 2
+GRAB_MODE_ASYNC = 1
+BAD_ACCESS = 10
+
+SHIFT_MASK = 1 << 0
+LOCK_MASK = 1 << 1
+CONTROL_MASK = 1 << 2
+MOD1_MASK = 1 << 3  # Alt
+MOD2_MASK = 1 << 4  # Num Lock
+MOD4_MASK = 1 << 6  # Super
+MODIFIER_MASKS = {'shift': SHIFT_MASK, 'ctrl': CONTROL_MASK, 'alt': MOD1_MASK, 'super': MOD4_MASK}
+# Caps Lock and Num Lock must not stop a combo from matching, so every combo
+# is grabbed once per combination of them
+IGNORED_MASKS = [0, LOCK_MASK, MOD2_MASK, LOCK_MASK | MOD2_MASK]
+
+
+class _XKeyEvent(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('serial', ctypes.c_ulong),
+        ('send_event', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('window', ctypes.c_ulong),
+        ('root', ctypes.c_ulong),
+        ('subwindow', ctypes.c_ulong),
+        ('time', ctypes.c_ulong),
+        ('x', ctypes.c_int),
+        ('y', ctypes.c_int),
+        ('x_root', ctypes.c_int),
+        ('y_root', ctypes.c_int),
+        ('state', ctypes.c_uint),
+        ('keycode', ctypes.c_uint),
+        ('same_screen', ctypes.c_int),
+    ]
+
+
+class _XEvent(ctypes.Union):
+    _fields_ = [('type', ctypes.c_int), ('xkey', _XKeyEvent), ('pad', ctypes.c_long * 24)]
+
+
+class _XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('resourceid', ctypes.c_ulong),
+        ('serial', ctypes.c_ulong),
+        ('error_code', ctypes.c_ubyte),
+        ('request_code', ctypes.c_ubyte),
+        ('minor_code', ctypes.c_ubyte),
+    ]
+
+
+_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(_XErrorEvent))
+
+
+def _load_xlib():
+    """Load libX11 and declare the functions used here."""
+    name = ctypes.util.find_library('X11')
+    if not name:
+        raise HotkeyError("libX11 not found")
+    xlib = ctypes.cdll.LoadLibrary(name)
+    xlib.XOpenDisplay.restype = ctypes.c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+    xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+    xlib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+    xlib.XStringToKeysym.restype = ctypes.c_ulong
+    xlib.XStringToKeysym.argtypes = [ctypes.c_char_p]
+    xlib.XKeysymToKeycode.restype = ctypes.c_ubyte
+    xlib.XKeysymToKeycode.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+    xlib.XGrabKey.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong,
+                              ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    xlib.XUngrabKey.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong]
+    xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    xlib.XPending.argtypes = [ctypes.c_void_p]
+    xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XEvent)]
+    xlib.XSetErrorHandler.restype = ctypes.c_void_p
+    xlib.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+    return xlib
+
+
+def _keysym(xlib, key):
+    """Return the X keysym of a key name such as 'space', 'u' or 'f1'."""
+    for name in (key, key.capitalize(), key.upper()):
+        keysym = xlib.XStringToKeysym(name.encode('ascii'))
+        if keysym:
+            return keysym
+    raise HotkeyError(f"Unknown key for X11: {key!r}")
+
+
+class X11HotkeyBackend(HotkeyBackend):
+    """Backend using XGrabKey on the root window of the default display."""
+
+    name = 'x11'
+
+    def __init__(self, combos, callback):
+        """Initialize the backend."""
+        super().__init__(combos, callback)
+        self._xlib = None
+        self._display = None
+        self._grabs = {}
+        self._thread = None
+        self._wakeup = None
+        self._errors = []
+        self._error_handler = None
+
+    def start(self):
+        """Open the display, grab every combo and start the event thread."""
+        if not os.environ.get('DISPLAY'):
+            raise HotkeyError("No X11 display")
+        self._xlib = xlib = _load_xlib()
+        # The connection is private to this backend: Qt keeps its own
+        self._display = xlib.XOpenDisplay(None)
+        if not self._display:
+            raise HotkeyError("Cannot open the X11 display")
+
+        def on_error(display, event):
+            self._errors.append(event.contents.error_code)
+            return 0
+
+        # Keep the callback referenced for as long as it is installed
+        self._error_handler = _ERROR_HANDLER(on_error)
+        previous = xlib.XSetErrorHandler(ctypes.cast(self._error_handler, ctypes.c_void_p))
+        root = xlib.XDefaultRootWindow(self._display)
+        try:
+            for combo in self.combos:
+                keycode = xlib.XKeysymToKeycode(self._display, _keysym(xlib, combo.key))
+                if not keycode:
+                    raise HotkeyError(f"No keycode for {combo.key!r} on this keyboard")
+                mask = 0
+                for modifier in combo.modifiers:
+                    mask |= MODIFIER_MASKS[modifier]
+                self._grabs[(keycode, mask)] = combo
+                for ignored in IGNORED_MASKS:
+                    xlib.XGrabKey(self._display, keycode, mask | ignored, root, True,
+                                  GRAB_MODE_ASYNC, GRAB_MODE_ASYNC)
+            # Errors are reported asynchronously; sync to collect them now
+            xlib.XSync(self._display, False)
+        except HotkeyError:
+            self._close_display()
+            raise
+        finally:
+            xlib.XSetErrorHandler(previous)
+        if BAD_ACCESS in self._errors:
+            self._close_display()
+            raise HotkeyError("Hotkey already grabbed by another application")
+
+        self._wakeup = os.pipe()
+        self._thread = threading.Thread(target=self._run, name='urge-hotkeys', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Wait for grabbed key presses and dispatch them."""
+        xlib = self._xlib
+        display_fd = xlib.XConnectionNumber(self._display)
+        event = _XEvent()
+        while True:
+            readable, _, _ = select.select([display_fd, self._wakeup[0]], [], [])
+            if self._wakeup[0] in readable:
+                break
+            while xlib.XPending(self._display):
+                xlib.XNextEvent(self._display, ctypes.byref(event))
+                if event.type != KEY_PRESS:
+                    continue
+                state = event.xkey.state & ~(LOCK_MASK | MOD2_MASK)
+                combo = self._grabs.get((event.xkey.keycode, state))
+                if combo is not None:
+                    self.callback(combo)
+        self._close_display()
+
+    def _close_display(self):
+        """Release the grabs and the display connection."""
+        if self._display:
+            root = self._xlib.XDefaultRootWindow(self._display)
+            for keycode, mask in self._grabs:
+                for ignored in IGNORED_MASKS:
+                    self._xlib.XUngrabKey(self._display, keycode, mask | ignored, root)
+            self._xlib.XCloseDisplay(self._display)
+            self._display = None
+
+    def stop(self):
+        """Wake the event thread so it ungrabs and closes the display."""
+        if self._thread is not None:
+            os.write(self._wakeup[1], b'x')
+            self._thread.join(2)
+            for fd in self._wakeup:
+                os.close(fd)
+            self._thread = None
+            self._wakeup = None
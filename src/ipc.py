@@ -0,0 +1,232 @@
+"""Local socket API of the running Urge instance.
+
+The protocol is newline-delimited JSON over a Unix domain socket: each
+request is one object with an "op" field and gets one object back.
+
+    {"op": "ping"}                                  -> {"ok": true}
+    {"op": "show"}                                  -> {"ok": true}
+    {"op": "log", "entries": [{"text": "...", "label": "2", "timestamp": 1700000000.0}]}
+                                                    -> {"ok": true, "count": 1}
+    {"op": "search", "query": "...", "label": "2", "start": 1700000000.0,
+     "end": null, "limit": 20}
+                                                    -> {"ok": true, "results": [{"timestamp":
+                                                        ..., "label": "...", "text": "...",
+                                                        "score": 7.1}]}
+
+Entries are appended in time order: a "log" request with a timestamp before
+the last entry logged, or more than a few minutes ahead of the clock, gets
+{"ok": false, "error": "..."} and logs nothing.
+
+This module only uses the standard library so clients start quickly.
+"""
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+
+SOCKET_NAME = 'urge.sock'
+LOCK_NAME = 'urge.lock'
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+
+class IPCError(Exception):
+    """Raised when the running instance rejects or fails a request."""
+
+
+def is_supported():
+    """Return True if this platform has Unix domain sockets."""
+    return hasattr(socket, 'AF_UNIX')
+
+
+def runtime_dir():
+    """Return the per-user directory holding the socket and lock file."""
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base and os.path.isdir(base):
+        return base
+    return os.path.join(tempfile.gettempdir(), f'urge-{os.getuid()}')
+
+
+def socket_path():
+    """Return the path of the instance socket."""
+    return os.path.join(runtime_dir(), SOCKET_NAME)
+
+
+# ----------------------------------------------------------------------- client
+
+def request(message, timeout=5.0, path=None):
+    """Send one request to the running instance and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise IPCError("No reply from the running instance")
+    reply = json.loads(line)
+    if not reply.get('ok'):
+        raise IPCError(reply.get('error', 'request failed'))
+    return reply
+
+
+def ping(timeout=0.5, path=None):
+    """Return True if an instance is listening."""
+    try:
+        request({'op': 'ping'}, timeout=timeout, path=path)
+        return True
+    except (OSError, ValueError, IPCError):
+        return False
+
+
+def log_entries(entries, timeout=5.0, path=None):
+    """Submit a batch of {"text", "label", "timestamp"} dicts in one request."""
+    return request({'op': 'log', 'entries': list(entries)}, timeout=timeout, path=path)
+
+
+def search(query, label=None, start=None, end=None, limit=20, timeout=5.0, path=None):
+    """Search the entry history of the running instance; return the result dicts."""
+    return request({'op': 'search', 'query': query, 'label': label, 'start': start,
+                    'end': end, 'limit': limit}, timeout=timeout, path=path)['results']
+
+
+# ----------------------------------------------------------------------- server
+
+def claim_instance(path=None):
+    """Take the per-user instance lock; return its open file, or None if another instance holds it.
+
+    The lock is held until the file is closed, so it is released when the
+    process exits however it ends.
+    """
+    import fcntl
+
+    directory = os.path.dirname(path or socket_path())
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    lock_file = open(os.path.join(directory, LOCK_NAME), 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serve newline-delimited JSON requests on one connection."""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES)
+            if not line:
+                return
+            try:
+                reply = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class InstanceServer:
+    """Socket server owned by the running instance.
+
+    on_log is called with a list of validated entry dicts, on_show with no
+    arguments and on_search with (query, label, start, end, limit), returning
+    a list of result dicts; all run on a server thread. lock_file is the
+    instance lock when the caller already holds it, from claim_instance().
+    """
+
+    def __init__(self, on_log, on_show, path=None, on_search=None, lock_file=None):
+        """Initialize the server; call start() to claim the socket."""
+        self.on_log = on_log
+        self.on_show = on_show
+        self.on_search = on_search
+        self.path = path or socket_path()
+        self._lock_file = lock_file
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Claim the instance lock and start serving; False if another instance owns it."""
+        if self._lock_file is None:
+            self._lock_file = claim_instance(self.path)
+            if self._lock_file is None:
+                return False
+
+        # Holding the lock means any existing socket file is stale
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        old_umask = os.umask(0o077)
+        try:
+            self._server = _UnixServer(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.dispatch = self.dispatch
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='urge-ipc', daemon=True)
+        self._thread.start()
+        return True
+
+    def dispatch(self, message):
+        """Handle one decoded request and return the reply."""
+        op = message.get('op')
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if op == 'show':
+            self.on_show()
+            return {'ok': True}
+        if op == 'log':
+            # Only the server side needs the storage code
+            from src.storage.textlog import check_timestamp
+
+            entries = message.get('entries')
+            if not isinstance(entries, list):
+                raise ValueError("'entries' must be a list")
+            for entry in entries:
+                if not isinstance(entry, dict) or not isinstance(entry.get('text'), str) \
+                        or not entry['text']:
+                    raise ValueError("each entry needs a non-empty 'text'")
+                if entry.get('label') is not None and not isinstance(entry['label'], str):
+                    raise ValueError("'label' must be a string")
+                if any(c in value for value in (entry['text'], entry.get('label') or '')
+                       for c in '\r\n'):
+                    raise ValueError("'text' and 'label' must be single lines")
+                if entry.get('timestamp') is not None:
+                    check_timestamp(entry['timestamp'])
+            self.on_log(entries)
+            return {'ok': True, 'count': len(entries)}
+        if op == 'search' and self.on_search is not None:
+            query = message.get('query')
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("'query' must be a non-empty string")
+            if message.get('label') is not None and not isinstance(message['label'], str):
+                raise ValueError("'label' must be a string")
+            for key in ('start', 'end'):
+                if message.get(key) is not None and not isinstance(message[key], (int, float)):
+                    raise ValueError(f"'{key}' must be epoch seconds")
+            limit = message.get('limit', 20)
+            if not isinstance(limit, int) or limit <= 0:
+                raise ValueError("'limit' must be a positive integer")
+            results = self.on_search(query, message.get('label'), message.get('start'),
+                                     message.get('end'), limit)
+            return {'ok': True, 'results': results}
+        raise ValueError(f"Unknown op: {op}")
+
+    def stop(self):
+        """Stop serving and release the socket and lock."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
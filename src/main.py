@@ -1,54 +1,157 @@
 import sys
 import os
-import keyboard
-import threading
+import time
+from datetime import datetime
+
+# Reference point for the tray-ready time reported at startup
+_STARTED_AT = time.perf_counter()
 
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt, QTimer
-from src.ui.label_window import LabelSelectionWindow
+from src import ipc
+from src.config import Config
 from src.utils.logger import Logger
+from src.utils.metrics import Metrics
+
+# The popup windows, the hotkey backends and the storage code are imported on
+# first use so the tray icon appears as early as possible.
+
+# How often the tray tooltip's high-risk forecast is recomputed
+RISK_REFRESH_MS = 60 * 1000
+# Labels named in the tooltip at most, soonest first
+MAX_TOOLTIP_RISKS = 3
+# Heartbeat interval of the stall watchdog while no window is shown
+IDLE_HEARTBEAT_MS = 1000
+# Seconds a second launch waits for the running instance to answer
+HAND_OFF_TIMEOUT = 5.0
 
 class HotkeyListener(QObject):
     """A separate class to handle global hotkeys with signal support."""
     hotkey_triggered = pyqtSignal()
     
-    def __init__(self):
+    def __init__(self, backend=None, combos=None):
         super().__init__()
+        self.backend_name = backend
+        self.combos = combos
+        # The started hotkey backend; see src/hotkeys
+        self.backend = None
+        # perf_counter() of the most recent hotkey press, used for latency reports
+        self.last_triggered = None
         
     def start_listening(self):
-        """Start listening for the hotkey in a separate thread."""
-        # Run this in a separate thread to avoid blocking the Qt event loop
-        self.listener_thread = threading.Thread(target=self._listen_for_hotkey, daemon=True)
-        self.listener_thread.start()
+        """Register the hotkeys with the best available backend."""
+        from src.hotkeys.backends import start_backend
         
-    def _listen_for_hotkey(self):
-        """Listen for the Ctrl+Space hotkey."""
-        keyboard.add_hotkey('ctrl+space', self.hotkey_triggered.emit)
-        # This is a blocking call that keeps the thread alive
-        keyboard.wait()
+        # Backends call _on_hotkey from their own thread; the signal crosses to Qt
+        self.backend = start_backend(self.backend_name, self.combos, self._on_hotkey, Logger())
+        return self.backend
+
+    def stop_listening(self):
+        """Unregister the hotkeys."""
+        if self.backend is not None:
+            self.backend.stop()
+            self.backend = None
+
+    def _on_hotkey(self, combo=None):
+        """Record when the hotkey fired and notify the Qt thread."""
+        self.last_triggered = time.perf_counter()
+        self.hotkey_triggered.emit()
 
 class UrgeApp(QObject):  # Make UrgeApp inherit from QObject
     """Main application class that manages the system tray and hotkeys."""
+    # Emitted from the socket server thread when a client asks for the popup
+    show_requested = pyqtSignal()
     
-    def __init__(self):
+    def __init__(self, instance_lock=None):
         super().__init__()  # Initialize the QObject base class first
         self.app = QApplication(sys.argv)
+        # Held from before startup so a second launch hands off instead of starting
+        self.instance_lock = instance_lock
+        self.config = Config()
+        # The config version the windows and hotkeys were built from
+        self.config_snapshot = self.config.snapshot()
+        self.config_watcher = None
         self.logger = Logger()
+        self.metrics = Metrics()
         self.selection_window = None
+        self.input_window = None
+        self.stats_window = None
+        self.search_window = None
+        self.chart_window = None
+        self.instance_server = None
+        # Event-loop stall detection and the tray profiler toggle
+        self.watchdog = None
+        self.heartbeat_timer = None
+        self.heartbeat_active = False
+        self.profiler = None
+        # Scheduled check-in prompts share one timer re-armed for the next deadline
+        self.checkins = None
+        self.checkin_timer = QTimer(self)
+        self.checkin_timer.setSingleShot(True)
+        self.checkin_timer.timeout.connect(self.run_checkins)
+        # The tray tooltip names the labels likely to come up in the next hours
+        self.risk_timer = QTimer(self)
+        self.risk_timer.setInterval(RISK_REFRESH_MS)
+        self.risk_timer.timeout.connect(self.update_tooltip)
         self.app.setQuitOnLastWindowClosed(False)
+        # One reusable timer for the delayed second focus attempt, so repeated
+        # hotkeys restart it instead of queuing a new timer each time
+        self.refocus_timer = QTimer(self)
+        self.refocus_timer.setSingleShot(True)
+        self.refocus_timer.timeout.connect(self._force_focus_again)
         # Create system tray icon first
         self.setup_tray()
         
         # Create hotkey listener AFTER fully initializing the parent object
-        self.hotkey_listener = HotkeyListener()
+        self.hotkey_listener = HotkeyListener(self.config.get('hotkey', 'backend'),
+                                              self.config.get('hotkey', 'combos'))
         # Connect the signal properly - this should work now
         self.hotkey_listener.hotkey_triggered.connect(self.show_selection_window)
         
         # Start listening for hotkeys
         self.register_hotkey()
         
+        # Show requests from the socket server arrive on another thread
+        self.show_requested.connect(self.show_selection_window)
+        
+        # Everything else waits until the event loop is running
+        QTimer.singleShot(0, self.finish_startup)
+        
         self.logger.info("Application starting in background")
+
+    def finish_startup(self):
+        """Do the startup work the tray icon does not need, once the event loop runs."""
+        self.logger.info(f"Tray ready in {(time.perf_counter() - _STARTED_AT) * 1000:.1f} ms")
+        try:
+            # Start the input writer so stored history loads in the background
+            self.logger.start()
+            
+            # Log thread stacks whenever the event loop freezes
+            self.start_watchdog()
+            
+            # Accept entries and show requests from later launches and the CLI
+            self.start_instance_server()
+            
+            # Prompt at the times configured in config.json
+            self.start_checkins()
+            
+            # Forecast high-risk hours in the tray tooltip once the history has loaded
+            self.risk_timer.start()
+            
+            # Apply edits to config.json without a restart
+            from src.ui.config_watcher import ConfigWatcher
+            self.config_watcher = ConfigWatcher(self)
+            self.config_watcher.config_changed.connect(self.apply_config)
+            self.config_watcher.save_failed.connect(self.report_save_error)
+            self.config_watcher.start()
+            
+            # Build the popup windows up front so the hotkey only has to show them
+            prewarm = self.config.get('app', 'prewarm_windows')
+            if prewarm is None or prewarm:
+                self.build_windows()
+        except Exception as e:
+            self.logger.error(f"Error finishing startup: {str(e)}")
         
     def setup_tray(self):
         """Set up the system tray icon and menu."""
@@ -74,14 +177,34 @@ class UrgeApp(QObject):  # Make UrgeApp inherit from QObject
                 self.tray_icon.setIcon(self.app.style().standardIcon(
                     self.app.style().SP_ComputerIcon))
             
-            # Create the menu
-            tray_menu = QMenu()
+            # Create the menu; keep a reference since the tray icon does not own it
+            tray_menu = self.tray_menu = QMenu()
             
             # Add actions to the menu
             show_action = QAction("Show Urge Input", self.tray_icon)
             show_action.triggered.connect(self.show_selection_window)
             tray_menu.addAction(show_action)
             
+            stats_action = QAction("Stats", self.tray_icon)
+            stats_action.triggered.connect(self.show_stats_window)
+            tray_menu.addAction(stats_action)
+            
+            search_action = QAction("Search History", self.tray_icon)
+            search_action.triggered.connect(self.show_search_window)
+            tray_menu.addAction(search_action)
+            
+            chart_action = QAction("History Chart", self.tray_icon)
+            chart_action.triggered.connect(self.show_chart_window)
+            tray_menu.addAction(chart_action)
+            
+            metrics_action = QAction("Dump Latency Metrics", self.tray_icon)
+            metrics_action.triggered.connect(self.dump_metrics)
+            tray_menu.addAction(metrics_action)
+            
+            self.profiler_action = QAction("Start Profiler", self.tray_icon)
+            self.profiler_action.triggered.connect(self.toggle_profiler)
+            tray_menu.addAction(self.profiler_action)
+            
             exit_action = QAction("Exit", self.tray_icon)
             exit_action.triggered.connect(self.exit_app)
             tray_menu.addAction(exit_action)
@@ -97,106 +220,467 @@ class UrgeApp(QObject):  # Make UrgeApp inherit from QObject
     def register_hotkey(self):
         """Register the global hotkey."""
         try:
-            # Start the hotkey listener in a separate thread
-            self.hotkey_listener.start_listening()
-            self.logger.info("Global hotkey registered (Ctrl+Space)")
+            backend = self.hotkey_listener.start_listening()
+            combos = ', '.join(self.hotkey_listener.combos or ['ctrl+space'])
+            self.logger.info(f"Global hotkey registered ({combos}) with the {backend.name} backend")
         except Exception as e:
             self.logger.error(f"Error registering hotkey: {str(e)}")
     
+    def build_windows(self):
+        """Create the reusable label selection and input windows."""
+        from src.ui.label_window import LabelSelectionWindow
+        from src.ui.input_window import InputWindow
+        
+        try:
+            if self.selection_window is None:
+                self.selection_window = LabelSelectionWindow()
+                # Set window flags once; changing them later recreates the native window
+                self.selection_window.setWindowFlags(
+                    self.selection_window.windowFlags() | 
+                    Qt.WindowStaysOnTopHint | 
+                    Qt.WindowActive
+                )
+                self.selection_window.label_selected.connect(self.show_input_window)
+                self.selection_window.center_on_screen()
+            if self.input_window is None:
+                self.input_window = InputWindow()
+                self.input_window.center_on_screen()
+        except Exception as e:
+            self.logger.error(f"Error building windows: {str(e)}")
+            raise
+
+    @pyqtSlot(str)
+    def report_save_error(self, message):
+        """Tell the user label edits were not saved and will not survive a restart."""
+        self.tray_icon.showMessage("Urge could not save config.json",
+                                   f"Label changes are lost when Urge quits: {message}",
+                                   QSystemTrayIcon.Warning)
+
+    @pyqtSlot(object)
+    def apply_config(self, snapshot):
+        """Bring the windows and hotkeys up to date with a reloaded config."""
+        previous, self.config_snapshot = self.config_snapshot, snapshot
+        try:
+            # The stylesheet is already applied; only structure and size are left
+            if [label.key for label in snapshot.labels] != \
+                    [label.key for label in previous.labels]:
+                # A different set of shortcuts needs new option rows; renamed
+                # labels are picked up when the popup is next shown
+                visible = self.selection_window is not None and self.selection_window.isVisible()
+                self.discard_windows()
+                if visible or snapshot.data['app'].get('prewarm_windows', True):
+                    self.build_windows()
+            elif snapshot.geometry != previous.geometry:
+                for window in (self.selection_window, self.input_window, self.stats_window,
+                               self.search_window, self.chart_window):
+                    if window is not None:
+                        window.apply_geometry()
+            diagnostics = snapshot.data['diagnostics']
+            if diagnostics != previous.data['diagnostics']:
+                if self.watchdog is not None:
+                    self.set_heartbeat(self.heartbeat_active)
+                if self.profiler is not None and not self.profiler.running:
+                    # Built again with the new settings on the next start
+                    self.profiler = None
+            if snapshot.data['checkins'] != previous.data['checkins']:
+                self.start_checkins()
+            if snapshot.data['risk'] != previous.data['risk']:
+                self.update_tooltip()
+            if snapshot.data['hotkey'] != previous.data['hotkey']:
+                self.hotkey_listener.stop_listening()
+                self.hotkey_listener.backend_name = snapshot.data['hotkey'].get('backend')
+                self.hotkey_listener.combos = snapshot.data['hotkey'].get('combos')
+                self.register_hotkey()
+        except Exception as e:
+            self.logger.error(f"Error applying configuration: {str(e)}")
+
+    def discard_windows(self):
+        """Close the popup windows and free them along with their timers."""
+        self.refocus_timer.stop()
+        for name in ('selection_window', 'input_window', 'stats_window', 'search_window',
+                     'chart_window'):
+            window = getattr(self, name)
+            if window is not None:
+                window.close()
+                window.deleteLater()
+                setattr(self, name, None)
+
+    def start_instance_server(self):
+        """Listen on the local socket so other processes can reach this instance."""
+        if not ipc.is_supported():
+            self.logger.warning("Unix domain sockets unavailable; single-instance API disabled")
+            return
+        try:
+            server = ipc.InstanceServer(self.log_remote_entries, self.show_requested.emit,
+                                        on_search=self.search_entries,
+                                        lock_file=self.instance_lock)
+            if server.start():
+                self.instance_server = server
+                self.logger.info(f"Listening for clients on {server.path}")
+            else:
+                self.logger.warning("Another instance owns the socket; API disabled")
+        except Exception as e:
+            self.logger.error(f"Error starting instance server: {str(e)}")
+
+    def log_remote_entries(self, entries):
+        """Record entries received over the socket; runs on a server thread.
+
+        A batch with a timestamp before the last entry is refused as a whole.
+        """
+        inputs = []
+        for entry in entries:
+            # Clients may name a label by its key, name or id; entries store the id
+            label = entry.get('label')
+            if label is not None:
+                label = self.config.label_id(label)
+            inputs.append((entry['text'], label, entry.get('timestamp')))
+        self.logger.log_inputs(inputs)
+        self.logger.info(f"Logged {len(entries)} entries from a client")
+
+    def search_entries(self, query, label, start, end, limit):
+        """Search the entry history for a client; runs on a server thread."""
+        index = self.logger.search_index()
+        if index is None:
+            raise ValueError("Search is disabled in config.json")
+        if label is not None:
+            label = self.config.label_id(label)
+        return [{'timestamp': hit.entry.timestamp, 'text': hit.entry.text,
+                 'score': round(hit.score, 3),
+                 'label': self.config.label_name(hit.entry.label) if hit.entry.label else None}
+                for hit in index.search(query, label, start, end, limit)]
+
     @pyqtSlot()        
     def show_selection_window(self):
         """Show the label selection window."""
         try:
-            # Important: Log first to verify the hotkey is being detected
-            self.logger.info("Hotkey triggered - attempting to show window")
-            
-            # If window already exists, close it first
-            if self.selection_window is not None:
-                self.selection_window.close()
+            # Time each stage from the hook callback, or from now for the tray menu
+            started_at = self.hotkey_listener.last_triggered
+            self.hotkey_listener.last_triggered = None
+            timer = self.metrics.timer(started_at)
+            if started_at is not None:
+                timer.mark('signal')
                 
-            # Create and show the window
-            self.selection_window = LabelSelectionWindow()
-            
-            # Set window flags to ensure it appears on top and gets focus
-            self.selection_window.setWindowFlags(
-                self.selection_window.windowFlags() | 
-                Qt.WindowStaysOnTopHint | 
-                Qt.WindowActive
-            )
+            # Build the windows on first use if they were not prewarmed
+            self.build_windows()
+            timer.mark('construct')
             
-            # Show the window first so it has a size
-            self.selection_window.show()
+            if self.input_window.isVisible():
+                self.input_window.hide()
+            self.selection_window.reset()
+            self.selection_window.center_on_screen()
+            timer.mark('center')
             
-            # Center the window after it's shown and has proper geometry
-            QTimer.singleShot(10, self.selection_window.center_on_screen)
+            # Show the window; it already has its final size and position
+            self.selection_window.show()
+            timer.mark('show')
             
             # On Windows, enhanced focus handling needs to be done after the window is shown
             if sys.platform == 'win32':
-                try:
-                    import ctypes
-                    from ctypes import wintypes
-                    
-                    # Get window handle
-                    hwnd = int(self.selection_window.winId())
-                    
-                    # More aggressive focus methods for Windows
-                    # 1. Set as foreground window
-                    ctypes.windll.user32.SetForegroundWindow(hwnd)
-                    
-                    # 2. Force window to top and activate it
-                    SW_SHOW = 5
-                    ctypes.windll.user32.ShowWindow(hwnd, SW_SHOW)
-                    
-                    # 3. Set active window
-                    ctypes.windll.user32.SetActiveWindow(hwnd)
-                    
-                    # 4. Flash window to get attention (more noticeable)
-                    FLASHW_ALL = 0x00000003
-                    FLASHW_TIMERNOFG = 0x0000000C
-                    
-                    class FLASHWINFO(ctypes.Structure):
-                        _fields_ = [
-                            ("cbSize", wintypes.UINT),
-                            ("hwnd", wintypes.HWND),
-                            ("dwFlags", wintypes.DWORD),
-                            ("uCount", wintypes.UINT),
-                            ("dwTimeout", wintypes.DWORD)
-                        ]
-                    
-                    flash_info = FLASHWINFO(
-                        ctypes.sizeof(FLASHWINFO),
-                        hwnd,
-                        FLASHW_ALL | FLASHW_TIMERNOFG,
-                        3,  # flash count
-                        0   # default flash rate
-                    )
-                    
-                    ctypes.windll.user32.FlashWindowEx(ctypes.byref(flash_info))
-                    
-                    # 5. Simulate Alt key press to force window activation
-                    keybd_event = ctypes.windll.user32.keybd_event
-                    KEYEVENTF_KEYUP = 0x0002
-                    VK_MENU = 0x12  # Alt key
-                    
-                    # Press and release Alt key to help focus
-                    keybd_event(VK_MENU, 0, 0, 0)
-                    keybd_event(VK_MENU, 0, KEYEVENTF_KEYUP, 0)
-                    
-                    self.logger.info("Enhanced Windows focus methods applied")
-                except Exception as e:
-                    self.logger.warning(f"Could not use Windows-specific focus methods: {str(e)}")
+                self._apply_windows_focus(self.selection_window)
             
             # Additional PyQt methods to ensure focus
             self.selection_window.raise_()
             self.selection_window.activateWindow()
             
+            timer.mark('focus')
+            
             # Use a timer to make a second attempt at focusing the window
-            QTimer.singleShot(100, lambda: self._force_focus_again())
+            self.refocus_timer.start(100)
             
-            self.logger.info("Label selection window displayed via hotkey")
+            elapsed_ms = timer.total('hotkey_to_visible')
+            self.logger.info(f"Label selection window displayed in {elapsed_ms:.2f} ms")
+            self.wake_heartbeat()
         except Exception as e:
             self.logger.error(f"Error showing selection window: {str(e)}")
 
+    @pyqtSlot(str, float)
+    def show_input_window(self, label, pressed_at):
+        """Show the input window for the label chosen in the selection window."""
+        try:
+            timer = self.metrics.timer(pressed_at)
+            timer.mark('label_keypress')
+            self.input_window.set_label(label)
+            self.input_window.show()
+            timer.mark('input_show')
+            self.input_window.raise_()
+            self.input_window.activateWindow()
+            timer.mark('input_focus')
+            
+            elapsed_ms = timer.total('key_to_input_ready')
+            self.logger.info(f"Input window ready in {elapsed_ms:.2f} ms")
+            self.wake_heartbeat()
+        except Exception as e:
+            self.logger.error(f"Error showing input window: {str(e)}")
+
+    def start_checkins(self):
+        """Load the check-in schedules from config.json and arm the timer."""
+        from src.checkins import CHECKINS_FILENAME, CheckInScheduler, parse_schedules
+        
+        try:
+            if self.checkins is None:
+                self.checkins = CheckInScheduler(
+                    os.path.join(self.logger.logs_dir, CHECKINS_FILENAME))
+            self.checkins.configure(parse_schedules(self.config.get('checkins')))
+            self.arm_checkins()
+        except Exception as e:
+            self.logger.error(f"Error scheduling check-ins: {str(e)}")
+
+    def arm_checkins(self):
+        """Start the timer for the next deadline, or stop it without schedules."""
+        delay = self.checkins.sleep_for()
+        if delay is None:
+            self.checkin_timer.stop()
+        else:
+            self.checkin_timer.start(int(delay * 1000))
+
+    @pyqtSlot()
+    def run_checkins(self):
+        """Prompt for every check-in that is due, then re-arm the timer."""
+        try:
+            due = self.checkins.due()
+            if due:
+                self.logger.info(f"Check-in due: {', '.join(schedule.key for schedule in due)}")
+                # Several schedules due at once make a single prompt
+                labels = {schedule.label for schedule in due}
+                label = labels.pop() if len(labels) == 1 else None
+                if label is None:
+                    self.show_selection_window()
+                else:
+                    self.show_checkin_input(self.config.label_id(label))
+        except Exception as e:
+            self.logger.error(f"Error running check-ins: {str(e)}")
+        finally:
+            self.arm_checkins()
+
+    def show_checkin_input(self, label):
+        """Ask for an entry under a schedule's label, skipping the label popup."""
+        # Not timed: the keypress latency metrics only cover the hotkey flow
+        self.build_windows()
+        if self.selection_window.isVisible():
+            self.selection_window.hide()
+        self.input_window.set_label(label)
+        self.input_window.show()
+        self.input_window.raise_()
+        self.input_window.activateWindow()
+        self.wake_heartbeat()
+
+    def start_watchdog(self):
+        """Beat a heartbeat timer on the GUI thread for the stall watchdog."""
+        from src.utils.watchdog import StallWatchdog
+        
+        settings = self.config.get('diagnostics')
+        self.watchdog = StallWatchdog(self.logger, settings.get('heartbeat_ms', 100),
+                                      settings.get('stall_threshold_ms', 500))
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(self.heartbeat)
+        self.set_heartbeat(False)
+        self.watchdog.start()
+
+    def set_heartbeat(self, active):
+        """Beat every heartbeat_ms while the app is in use, and slower when idle.
+
+        Only the precise timer's beats measure event loop lag; while idle a
+        coarse timer lets the system batch the wakeups, and a stall still
+        shows as missed beats.
+        """
+        settings = self.config.get('diagnostics')
+        interval = settings.get('heartbeat_ms', 100)
+        if active:
+            # The last idle beat may be older than the shorter threshold allows
+            self.watchdog.beat()
+        else:
+            interval = max(interval, IDLE_HEARTBEAT_MS)
+        self.heartbeat_active = active
+        self.watchdog.configure(interval, settings.get('stall_threshold_ms', 500), active)
+        self.heartbeat_timer.setTimerType(Qt.PreciseTimer if active else Qt.CoarseTimer)
+        self.heartbeat_timer.start(interval)
+
+    def wake_heartbeat(self):
+        """Switch to the fast heartbeat once a window is shown or the profiler runs."""
+        if self.watchdog is not None and not self.heartbeat_active:
+            self.set_heartbeat(True)
+
+    def in_use(self):
+        """Return True while a window is shown or the profiler is running."""
+        if self.profiler is not None and self.profiler.running:
+            return True
+        return any(window is not None and window.isVisible()
+                   for window in (self.selection_window, self.input_window, self.stats_window,
+                                  self.search_window, self.chart_window))
+
+    def heartbeat(self):
+        """Beat the watchdog, and go back to the idle heartbeat once nothing is in use."""
+        self.watchdog.beat()
+        if self.heartbeat_active and not self.in_use():
+            self.set_heartbeat(False)
+
+    def toggle_profiler(self):
+        """Start or stop profiling; the profile is written to the logs directory."""
+        try:
+            if self.profiler is None:
+                from src.utils.profiler import Profiler
+                settings = self.config.get('diagnostics')
+                self.profiler = Profiler(self.logger.logs_dir,
+                                         settings.get('profiler', 'sampling'),
+                                         settings.get('sample_interval_ms', 10))
+            if self.profiler.running:
+                path = self.profiler.stop()
+                self.profiler_action.setText("Start Profiler")
+                self.logger.info(f"Profile written to {path}")
+                self.tray_icon.showMessage("Urge profile written", path)
+            else:
+                self.profiler.start()
+                self.profiler_action.setText("Stop Profiler")
+                self.logger.info(f"Started the {self.profiler.mode} profiler")
+                self.wake_heartbeat()
+        except Exception as e:
+            self.logger.error(f"Error toggling the profiler: {str(e)}")
+
+    @pyqtSlot()
+    def update_tooltip(self):
+        """Name the labels at high risk in the coming hours in the tray tooltip."""
+        try:
+            model = self.logger.risk_model()
+            lines = ["Urge"]
+            if model is not None:
+                settings = self.config.get('risk')
+                now = time.time()
+                seen = set()
+                for risk in model.upcoming(settings.get('horizon_hours', 6),
+                                           settings.get('threshold', 0.3), now):
+                    # Only the soonest high-risk hour of each label
+                    if risk.label in seen or len(seen) == MAX_TOOLTIP_RISKS:
+                        continue
+                    seen.add(risk.label)
+                    when = "now" if risk.start <= now else \
+                        f"at {datetime.fromtimestamp(risk.start):%H:%M}"
+                    lines.append(f"{self.config.label_name(risk.label)} {when} "
+                                 f"({risk.probability:.0%})")
+            self.tray_icon.setToolTip('\n'.join(lines))
+        except Exception as e:
+            self.logger.error(f"Error updating tray tooltip: {str(e)}")
+
+    def dump_metrics(self):
+        """Write the latency histograms to the metrics file and show p50/p99."""
+        try:
+            path = os.path.join(self.logger.logs_dir, 'latency.json')
+            self.metrics.dump(path)
+            self.logger.info(f"Latency metrics written to {path}\n{self.metrics.format_table()}")
+            self.tray_icon.showMessage("Urge latency (p50 / p99 ms)", self._metrics_message())
+        except Exception as e:
+            self.logger.error(f"Error dumping metrics: {str(e)}")
+
+    def _metrics_message(self):
+        """Return a short p50/p99 summary for a tray notification."""
+        lines = [f"{stage}: {s['p50_ms']:.1f} / {s['p99_ms']:.1f}"
+                 for stage, s in self.metrics.summary().items()]
+        return '\n'.join(lines) or "No popups measured yet"
+
+    @pyqtSlot()
+    def show_stats_window(self):
+        """Show the per-label stats window."""
+        try:
+            if self.stats_window is None:
+                from src.ui.stats_window import StatsWindow
+                self.stats_window = StatsWindow()
+            self.stats_window.refresh()
+            self.stats_window.center_on_screen()
+            self.stats_window.show()
+            self.stats_window.raise_()
+            self.stats_window.activateWindow()
+            self.wake_heartbeat()
+        except Exception as e:
+            self.logger.error(f"Error showing stats window: {str(e)}")
+
+    @pyqtSlot()
+    def show_search_window(self):
+        """Show the history search window."""
+        try:
+            if self.search_window is None:
+                from src.ui.search_window import SearchWindow
+                self.search_window = SearchWindow()
+            self.search_window.reset()
+            self.search_window.center_on_screen()
+            self.search_window.show()
+            self.search_window.raise_()
+            self.search_window.activateWindow()
+            self.wake_heartbeat()
+        except Exception as e:
+            self.logger.error(f"Error showing search window: {str(e)}")
+
+    @pyqtSlot()
+    def show_chart_window(self):
+        """Show the history chart window."""
+        try:
+            if self.logger.pyramid() is None:
+                self.tray_icon.showMessage("Urge chart", "The chart is disabled in config.json")
+                return
+            if self.chart_window is None:
+                from src.ui.chart_window import ChartWindow
+                self.chart_window = ChartWindow()
+            self.chart_window.reset()
+            self.chart_window.center_on_screen()
+            self.chart_window.show()
+            self.chart_window.raise_()
+            self.chart_window.activateWindow()
+            self.wake_heartbeat()
+        except Exception as e:
+            self.logger.error(f"Error showing chart window: {str(e)}")
+
+    def _apply_windows_focus(self, window):
+        """Force a window to the foreground using the Win32 API."""
+        try:
+            import ctypes
+            from ctypes import wintypes
+            
+            # Get window handle
+            hwnd = int(window.winId())
+            
+            # More aggressive focus methods for Windows
+            # 1. Set as foreground window
+            ctypes.windll.user32.SetForegroundWindow(hwnd)
+            
+            # 2. Force window to top and activate it
+            SW_SHOW = 5
+            ctypes.windll.user32.ShowWindow(hwnd, SW_SHOW)
+            
+            # 3. Set active window
+            ctypes.windll.user32.SetActiveWindow(hwnd)
+            
+            # 4. Flash window to get attention (more noticeable)
+            FLASHW_ALL = 0x00000003
+            FLASHW_TIMERNOFG = 0x0000000C
+            
+            class FLASHWINFO(ctypes.Structure):
+                _fields_ = [
+                    ("cbSize", wintypes.UINT),
+                    ("hwnd", wintypes.HWND),
+                    ("dwFlags", wintypes.DWORD),
+                    ("uCount", wintypes.UINT),
+                    ("dwTimeout", wintypes.DWORD)
+                ]
+            
+            flash_info = FLASHWINFO(
+                ctypes.sizeof(FLASHWINFO),
+                hwnd,
+                FLASHW_ALL | FLASHW_TIMERNOFG,
+                3,  # flash count
+                0   # default flash rate
+            )
+            
+            ctypes.windll.user32.FlashWindowEx(ctypes.byref(flash_info))
+            
+            # 5. Simulate Alt key press to force window activation
+            keybd_event = ctypes.windll.user32.keybd_event
+            KEYEVENTF_KEYUP = 0x0002
+            VK_MENU = 0x12  # Alt key
+            
+            # Press and release Alt key to help focus
+            keybd_event(VK_MENU, 0, 0, 0)
+            keybd_event(VK_MENU, 0, KEYEVENTF_KEYUP, 0)
+        except Exception as e:
+            self.logger.warning(f"Could not use Windows-specific focus methods: {str(e)}")
+
     def _force_focus_again(self):
         """Make a second attempt to force focus after a short delay."""
         if self.selection_window and self.selection_window.isVisible():
@@ -215,8 +699,22 @@ class UrgeApp(QObject):  # Make UrgeApp inherit from QObject
         """Exit the application cleanly."""
         try:
             # Unregister hotkey before exit
-            keyboard.unhook_all()
+            self.hotkey_listener.stop_listening()
+            self.checkin_timer.stop()
+            self.risk_timer.stop()
+            if self.instance_server is not None:
+                self.instance_server.stop()
+            self.metrics.dump(os.path.join(self.logger.logs_dir, 'latency.json'))
+            if self.profiler is not None and self.profiler.running:
+                self.logger.info(f"Profile written to {self.profiler.stop()}")
+            if self.watchdog is not None:
+                self.heartbeat_timer.stop()
+                self.watchdog.stop()
+            self.discard_windows()
             self.logger.info("Application exiting via tray menu")
+            # Write out any queued inputs and label edits before the event loop stops
+            Logger.shutdown()
+            self.config.flush(5)
             self.app.quit()
         except Exception as e:
             self.logger.error(f"Error during application exit: {str(e)}")
@@ -226,14 +724,39 @@ class UrgeApp(QObject):  # Make UrgeApp inherit from QObject
         return self.app.exec_()
 
 
+def hand_off():
+    """Open the popup of the instance holding the lock, waiting while it starts up."""
+    deadline = time.monotonic() + HAND_OFF_TIMEOUT
+    while True:
+        try:
+            ipc.request({'op': 'show'})
+            print("Urge is already running; opened its popup")
+            return
+        except (OSError, ipc.IPCError):
+            # Its socket is only listening once its event loop runs
+            if time.monotonic() >= deadline:
+                print("Urge is already running but did not answer", file=sys.stderr)
+                return
+            time.sleep(0.1)
+
+
 def main():
     """Main entry point for the application."""
     try:
+        # The instance lock is taken before anything starts, so of two launches
+        # close together only one runs and the other hands off to it
+        instance_lock = None
+        if ipc.is_supported():
+            instance_lock = ipc.claim_instance()
+            if instance_lock is None:
+                hand_off()
+                sys.exit(0)
+        
         # Create assets directories if they don't exist
         os.makedirs('./assets/images', exist_ok=True)
         
         # Initialize and run the application
-        urge_app = UrgeApp()
+        urge_app = UrgeApp(instance_lock)
         exit_code = urge_app.run()
         
         # Exit code
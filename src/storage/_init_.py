@@ -0,0 +1,8 @@
+from .textlog import Entry, TextLogStore
+from .eventstore import EventStore, EventStoreReader
+from .index import HistoryIndex
+from .sqlitestore import SqliteStore, EntryQueries
+from .backends import create_store
+
+__all__ = ['Entry', 'TextLogStore', 'EventStore', 'EventStoreReader',
+           'HistoryIndex', 'SqliteStore', 'EntryQueries', 'create_store']
\ No newline at end of file
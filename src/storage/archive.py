@@ -0,0 +1,333 @@
+import gzip
+import io
+import json
+import os
+import zlib
+from bisect import bisect_right
+
+ARCHIVE_SUFFIX = '.gz'
+INDEX_SUFFIX = '.idx'
+# Uncompressed bytes per gzip member; each member can be decompressed alone
+BLOCK_SIZE = 256 * 1024
+
+
+def archive_path(path):
+    """Return the archive path for a plain log path."""
+    return path + ARCHIVE_SUFFIX
+
+
+def is_archive(path):
+    """Return True if path names a compressed archive."""
+    return path.endswith(ARCHIVE_SUFFIX)
+
+
+def _identity(path):
+    """Return the inode, size and modification time telling a plain log's versions apart."""
+    stat = os.stat(path)
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _write_index(target, index):
+    """Atomically write the sidecar index of an archive."""
+    with open(target + INDEX_SUFFIX + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(target + INDEX_SUFFIX + '.tmp', target + INDEX_SUFFIX)
+
+
+def _compressed_end(target, index):
+    """Return the byte length of the members an archive's index lists."""
+    if 'compressed' in index:
+        return index['compressed']
+    if not index['blocks']:
+        return 0
+    # Indexes written before the length was recorded: find where the last member ends
+    start = index['blocks'][-1][1]
+    with open(target, 'rb') as f:
+        f.seek(start)
+        data = f.read()
+    decompressor = zlib.decompressobj(wbits=31)
+    decompressor.decompress(data)
+    return start + len(data) - len(decompressor.unused_data)
+
+
+def compress_file(path, block_size=BLOCK_SIZE):
+    """Compress a finished log into a seekable archive and remove the original.
+
+    The archive is a valid multi-member gzip file (readable with zcat) in
+    which every member holds block_size uncompressed bytes. A sidecar .idx
+    file lists the uncompressed and compressed offset of every member so
+    readers can seek without decompressing from the start.
+
+    A log started again after its day was archived is appended to the
+    archive as further members, so offsets into the day stay valid. The
+    index names the log it took in, so a log left behind by a crash is
+    recognised and not read or archived twice.
+    """
+    target = archive_path(path)
+    index = _load_index(target) if os.path.exists(target) else None
+    if index is not None and index.get('merged') == _identity(path):
+        # A previous pass stopped before removing the log it had archived
+        os.unlink(path)
+        return target
+    blocks = []
+    uncompressed = 0
+    compressed = 0
+    with open(path, 'rb') as source, open(target + '.tmp', 'wb') as out:
+        if index is not None:
+            blocks = index['blocks']
+            uncompressed = index['size']
+            compressed = _compressed_end(target, index)
+            # Archived members are copied as they are, without recompressing
+            with open(target, 'rb') as archived:
+                remaining = compressed
+                while remaining:
+                    chunk = archived.read(min(remaining, block_size))
+                    if not chunk:
+                        raise ValueError(f"archive is shorter than its index: {target}")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+        start = uncompressed
+        while True:
+            chunk = source.read(block_size)
+            if not chunk:
+                break
+            member = gzip.compress(chunk, mtime=0)
+            out.write(member)
+            blocks.append([uncompressed, compressed])
+            uncompressed += len(chunk)
+            compressed += len(member)
+        out.flush()
+        os.fsync(out.fileno())
+    if uncompressed - start != os.path.getsize(path):
+        # The log grew while it was being compressed; try again later
+        os.unlink(target + '.tmp')
+        return None
+
+    new_index = {'size': uncompressed, 'compressed': compressed, 'blocks': blocks,
+                 'merged': _identity(path)}
+    if index is None:
+        # The index is in place before the archive, and the archive before the
+        # original is removed, so a crash never leaves a day unreadable
+        _write_index(target, new_index)
+        os.replace(target + '.tmp', target)
+    else:
+        # The old index still reads the start of the longer archive, while the
+        # new one would overrun the old archive, so here the archive goes first
+        os.replace(target + '.tmp', target)
+        _write_index(target, new_index)
+    os.unlink(path)
+    return target
+
+
+def discard_merged(path):
+    """Remove a plain log its archive already holds, left by an interrupted compression.
+
+    Call before appending to a log whose day may have been archived.
+    """
+    target = archive_path(path)
+    try:
+        if os.path.exists(target) and _load_index(target).get('merged') == _identity(path):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def replace_log(source, path):
+    """Move the plain log source into place as the whole of the log at path.
+
+    An archive of the log is dropped. Its index first names source as the
+    replacement, so from the rename on readers skip the archive, and a
+    crash leaves either the old log or the new one.
+    """
+    target = archive_path(path)
+    if os.path.exists(target):
+        index = _load_index(target)
+        index['replaced_by'] = _identity(source)
+        _write_index(target, index)
+    os.replace(source, path)
+    for stale in (target, target + INDEX_SUFFIX):
+        if os.path.exists(stale):
+            os.unlink(stale)
+
+
+def _load_index(path):
+    """Return the sidecar index of an archive."""
+    with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _parts(path):
+    """Return [(path, size)] of the archive and plain log making up a log, in order.
+
+    path names either file. A day archived and then logged to again has
+    both: the archive holds its start and the plain log the rest.
+    """
+    plain = path[:-len(ARCHIVE_SUFFIX)] if is_archive(path) else path
+    target = archive_path(plain)
+    index = _load_index(target) if os.path.exists(target) else None
+    try:
+        identity = _identity(plain)
+    except FileNotFoundError:
+        identity = None
+    parts = []
+    if index is not None and (identity is None or index.get('replaced_by') != identity):
+        parts.append((target, index['size']))
+    if identity is not None and (index is None or index.get('merged') != identity):
+        parts.append((plain, identity[1]))
+    if not parts:
+        raise FileNotFoundError(path)
+    return parts
+
+
+def log_size(path):
+    """Return the uncompressed size of a log, its archive and plain parts together."""
+    return sum(size for _, size in _parts(path))
+
+
+class _ArchiveRaw(io.RawIOBase):
+    """Raw seekable reader over the blocks of an archive."""
+
+    def __init__(self, path):
+        index = _load_index(path)
+        self._size = index['size']
+        self._starts = [block[0] for block in index['blocks']]
+        self._offsets = [block[1] for block in index['blocks']]
+        self._file = open(path, 'rb')
+        self._position = 0
+        self._block = -1
+        self._data = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def _load_block(self, block):
+        """Decompress one member into memory."""
+        if block != self._block:
+            self._file.seek(self._offsets[block])
+            end = self._offsets[block + 1] if block + 1 < len(self._offsets) else None
+            member = self._file.read(end - self._offsets[block] if end else -1)
+            self._data = zlib.decompressobj(wbits=31).decompress(member)
+            self._block = block
+
+    def readinto(self, buffer):
+        if self._position >= self._size or not self._starts:
+            return 0
+        block = bisect_right(self._starts, self._position) - 1
+        self._load_block(block)
+        start = self._position - self._starts[block]
+        data = self._data[start:start + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class _JoinedRaw(io.RawIOBase):
+    """Raw seekable reader over an archive and the plain log continuing it."""
+
+    def __init__(self, archive, plain):
+        self._head = _ArchiveRaw(archive)
+        self._split = self._head._size
+        self._tail = open(plain, 'rb', buffering=0)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._split + os.fstat(self._tail.fileno()).st_size
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer):
+        if self._position < self._split:
+            part, start = self._head, self._position
+        else:
+            part, start = self._tail, self._position - self._split
+        part.seek(start)
+        read = part.readinto(buffer)
+        self._position += read
+        return read
+
+    def close(self):
+        if not self.closed:
+            self._head.close()
+            self._tail.close()
+        super().close()
+
+
+def open_log(path):
+    """Open a log as a seekable binary file, reading its archive and plain parts as one."""
+    parts = _parts(path)
+    if len(parts) == 2:
+        return io.BufferedReader(_JoinedRaw(parts[0][0], parts[1][0]))
+    if is_archive(parts[0][0]):
+        return io.BufferedReader(_ArchiveRaw(parts[0][0]))
+    return open(parts[0][0], 'rb')
+
+
+def _day_of(name, prefix):
+    """Return the YYYYMMDD day of a '<prefix>YYYYMMDD.log' name, or None."""
+    if not name.startswith(prefix) or not name.endswith('.log'):
+        return None
+    day = name[len(prefix):-len('.log')]
+    return day if len(day) == 8 and day.isdigit() else None
+
+
+def compress_finished_logs(logs_dir, prefixes, before_day, delete_before=None):
+    """Compress '<prefix>YYYYMMDD.log' files for days before before_day.
+
+    When delete_before is given, archives of days before it are deleted;
+    pass it only for prefixes whose history may be discarded.
+    Returns the list of archives written.
+    """
+    written = []
+    try:
+        names = os.listdir(logs_dir)
+    except FileNotFoundError:
+        return written
+    for name in sorted(names):
+        for prefix in prefixes:
+            if is_archive(name):
+                day = _day_of(name[:-len(ARCHIVE_SUFFIX)], prefix)
+                if day and delete_before and day < delete_before:
+                    path = os.path.join(logs_dir, name)
+                    os.unlink(path)
+                    if os.path.exists(path + INDEX_SUFFIX):
+                        os.unlink(path + INDEX_SUFFIX)
+                continue
+            day = _day_of(name, prefix)
+            if day and day < before_day:
+                target = compress_file(os.path.join(logs_dir, name))
+                if target:
+                    written.append(target)
+    return written
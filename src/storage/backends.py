@@ -0,0 +1,37 @@
+import os
+
+from src.storage.eventstore import EventStore
+from src.storage.index import INDEX_DIRNAME, HistoryIndex
+from src.storage.textlog import TextLogStore
+
+BACKEND_TEXT = 'text'
+BACKEND_BINARY = 'binary'
+BACKEND_SQLITE = 'sqlite'
+EVENTS_DIRNAME = 'events'
+SQLITE_FILENAME = 'entries.db'
+
+
+def default_logs_dir():
+    """Return the logs directory the app writes to; URGE_LOGS_DIR redirects it."""
+    return os.environ.get('URGE_LOGS_DIR') or os.path.join(os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs')
+
+
+def create_store(backend, logs_dir, index=True, observers=()):
+    """Create the storage sink for the backend named in config.json.
+
+    The observers are attached to the store; the history index is added for
+    the text backend when index is set.
+    """
+    observers = list(observers)
+    if backend in (None, BACKEND_TEXT):
+        if index:
+            observers.append(HistoryIndex(os.path.join(logs_dir, INDEX_DIRNAME), logs_dir))
+        return TextLogStore(logs_dir, observers=observers)
+    if backend == BACKEND_BINARY:
+        return EventStore(os.path.join(logs_dir, EVENTS_DIRNAME), observers=observers)
+    if backend == BACKEND_SQLITE:
+        # sqlite3 is only imported when the database is in use
+        from src.storage.sqlitestore import SqliteStore
+        return SqliteStore(os.path.join(logs_dir, SQLITE_FILENAME), logs_dir, observers=observers)
+    raise ValueError(f"Unknown storage backend: {backend}")
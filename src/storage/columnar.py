@@ -0,0 +1,313 @@
+"""Columnar export files of the entry history.
+
+An export is a short file header followed by blocks of up to BLOCK_ENTRIES
+entries. A block stores its entries column by column, each column
+compressed with zlib on its own:
+
+- timestamps as int64 microsecond deltas;
+- labels as uint32 indexes into the block's own table of label ids;
+- texts as a single UTF-8 string plus a column of character lengths.
+
+Similar values sit next to each other, so the columns compress far better
+than log lines. Whole columns are converted with array and bytes
+operations instead of line by line. Numbers are little-endian.
+
+Exporting and importing stream one block at a time, so memory does not
+grow with the history. The text logs are parsed, and imported blocks
+turned back into log lines, on a process pool. Each task covers whole
+logs, and only a few tasks per worker are in flight at once.
+"""
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, chain
+
+from src.storage.textlog import find_input_log, inputs_filename, iter_log_rows, list_input_logs
+
+MAGIC = b'URGECOL1'
+_BLOCK_MAGIC = b'BLK1'
+# Block magic, entry count and the compressed sizes of its five sections
+_BLOCK = struct.Struct('<4sI5I')
+BLOCK_ENTRIES = 65536
+# Logs are grouped into parse tasks of about this many bytes
+TASK_BYTES = 4 * 1024 * 1024
+# zlib's fastest level; higher levels gain little on these columns
+COMPRESS_LEVEL = 1
+
+ExportResult = namedtuple('ExportResult', ['entries', 'blocks', 'size'])
+ImportResult = namedtuple('ImportResult', ['entries', 'days', 'added'])
+
+
+def _to_bytes(values):
+    """Return the little-endian bytes of an array."""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode, data):
+    """Return the array of little-endian bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def encode_block(timestamps, labels, texts):
+    """Return one block holding equally long timestamp, label and text columns."""
+    micros = [round(timestamp * 1e6) for timestamp in timestamps]
+    deltas = array('q', [now - before for before, now in zip([0] + micros, micros)])
+    table = {}
+    codes = array('I', [table.setdefault(label, len(table)) for label in labels])
+    lengths = array('I', map(len, texts))
+    sections = [zlib.compress(data, COMPRESS_LEVEL) for data in (
+        _to_bytes(deltas), json.dumps(list(table)).encode('utf-8'), _to_bytes(codes),
+        _to_bytes(lengths), ''.join(texts).encode('utf-8'))]
+    return _BLOCK.pack(_BLOCK_MAGIC, len(micros), *map(len, sections)) + b''.join(sections)
+
+
+def decode_block(block):
+    """Return the (timestamps, labels, texts) columns of a block."""
+    magic, count, *sizes = _BLOCK.unpack_from(block)
+    if magic != _BLOCK_MAGIC:
+        raise ValueError("not an export block")
+    sections = []
+    start = _BLOCK.size
+    try:
+        for size in sizes:
+            sections.append(zlib.decompress(block[start:start + size]))
+            start += size
+    except zlib.error as e:
+        raise ValueError(f"corrupt export block: {e}")
+    timestamps = [micros / 1e6 for micros in accumulate(_from_bytes('q', sections[0]))]
+    table = json.loads(sections[1])
+    labels = [table[code] for code in _from_bytes('I', sections[2])]
+    ends = list(accumulate(_from_bytes('I', sections[3])))
+    text = sections[4].decode('utf-8')
+    texts = [text[start:end] for start, end in zip([0] + ends, ends)]
+    if not len(timestamps) == len(labels) == len(texts) == count:
+        raise ValueError("corrupt export block: columns differ in length")
+    return timestamps, labels, texts
+
+
+def iter_blocks(f):
+    """Yield the blocks of an export file opened for binary reading."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not an Urge export file")
+    while True:
+        header = f.read(_BLOCK.size)
+        if not header:
+            return
+        if len(header) < _BLOCK.size:
+            raise ValueError("export file is truncated")
+        size = sum(_BLOCK.unpack(header)[2:])
+        payload = f.read(size)
+        if len(payload) < size:
+            raise ValueError("export file is truncated")
+        yield header + payload
+
+
+def _ordered_map(function, items, jobs):
+    """Yield function(item) for every item in order, run on jobs worker processes.
+
+    At most two items per worker are in flight, so finished results wait
+    for the consumer without piling up in memory.
+    """
+    if jobs == 1:
+        yield from map(function, items)
+        return
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(function, item))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _log_groups(logs_dir):
+    """Yield lists of consecutive log paths of about TASK_BYTES each."""
+    group, size = [], 0
+    for _, path in list_input_logs(logs_dir):
+        group.append(path)
+        size += os.path.getsize(path)
+        if size >= TASK_BYTES:
+            yield group
+            group, size = [], 0
+    if group:
+        yield group
+
+
+def _encode_logs(paths):
+    """Return [(entry count, block)] for a group of inputs logs; runs in a worker."""
+    blocks = []
+    timestamps, labels, texts = [], [], []
+    for path in paths:
+        for timestamp, label, text in iter_log_rows(path):
+            timestamps.append(timestamp)
+            labels.append(label)
+            texts.append(text)
+            if len(texts) == BLOCK_ENTRIES:
+                blocks.append((len(texts), encode_block(timestamps, labels, texts)))
+                timestamps, labels, texts = [], [], []
+    if texts:
+        blocks.append((len(texts), encode_block(timestamps, labels, texts)))
+    return blocks
+
+
+def _entry_blocks(entries):
+    """Yield [(entry count, block)] for every BLOCK_ENTRIES of a stream of entries."""
+    columns = ([], [], [])
+    for entry in entries:
+        for column, value in zip(columns, entry):
+            column.append(value)
+        if len(columns[0]) == BLOCK_ENTRIES:
+            yield [(BLOCK_ENTRIES, encode_block(*columns))]
+            columns = ([], [], [])
+    if columns[0]:
+        yield [(len(columns[0]), encode_block(*columns))]
+
+
+def _sqlite_blocks(path):
+    """Yield [(entry count, block)] for every BLOCK_ENTRIES entries of a database."""
+    from src.storage.sqlitestore import EntryQueries
+
+    with EntryQueries(path) as queries:
+        yield from _entry_blocks(queries.iter_entries())
+
+
+def _event_blocks(directory):
+    """Yield [(entry count, block)] for every BLOCK_ENTRIES entries of an event store."""
+    from src.storage.eventstore import EventStoreReader
+
+    with EventStoreReader(directory) as reader:
+        yield from _entry_blocks(reader.iter_entries())
+
+
+def export_history(logs_dir, path, jobs=None, database=None, events=None):
+    """Write the history to an export file at path and return an ExportResult.
+
+    The daily inputs logs of logs_dir are exported, or the entries of the
+    SQLite database file given as database. The segments of the event store
+    directory given as events follow the logs, since the store only holds
+    what was logged after it replaced them. The file appears only once it
+    is complete.
+    """
+    if database is not None:
+        groups = _sqlite_blocks(database)
+    else:
+        groups = _ordered_map(_encode_logs, _log_groups(logs_dir), jobs or os.cpu_count() or 1)
+    if events is not None:
+        groups = chain(groups, _event_blocks(events))
+    entries = blocks = 0
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            for group in groups:
+                for count, block in group:
+                    f.write(block)
+                    entries += count
+                    blocks += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return ExportResult(entries, blocks, os.path.getsize(path))
+
+
+def _format_block(block):
+    """Return [(YYYYMMDD day, inputs log lines, entry count)] for a block; runs in a worker.
+
+    Lines match format_entry. The local UTC offset is looked up once per
+    hour, and each local hour formatted once.
+    """
+    days = []
+    # UTC hour -> local UTC offset, or None if it changes within the hour
+    offsets = {}
+    # Local hour -> (YYYYMMDD day, "YYYY-MM-DD HH")
+    hours = {}
+    current, lines = None, []
+    for timestamp, label, text in zip(*decode_block(block)):
+        seconds = int(timestamp)
+        utc_hour = seconds // 3600
+        if utc_hour not in offsets:
+            start = utc_hour * 3600
+            offset = time.localtime(start).tm_gmtoff
+            offsets[utc_hour] = offset if time.localtime(start + 3599).tm_gmtoff == offset \
+                else None
+        offset = offsets[utc_hour]
+        if offset is None:
+            offset = time.localtime(seconds).tm_gmtoff
+        local = seconds + offset
+        hour = hours.get(local // 3600)
+        if hour is None:
+            at = time.gmtime(local - local % 3600)
+            hour = hours[local // 3600] = (time.strftime("%Y%m%d", at),
+                                           time.strftime("%Y-%m-%d %H", at))
+        day, prefix = hour
+        if day != current:
+            if lines:
+                days.append((current, ''.join(lines), len(lines)))
+            current, lines = day, []
+        label_info = f", Label: {label}" if label else ""
+        lines.append(f"{prefix}:{local % 3600 // 60:02d}:{local % 60:02d} - Input: "
+                     f"{text}{label_info}\n")
+    if lines:
+        days.append((current, ''.join(lines), len(lines)))
+    return days
+
+
+def import_history(logs_dir, path, jobs=None):
+    """Merge the entries of an export file into the daily inputs logs; return an ImportResult.
+
+    The entries are written to daily logs in a staging directory inside
+    logs_dir. A day the history does not have yet is moved into place;
+    the other days are merged in like a sync target, so entries already in
+    the history are not added twice. The app must not be writing to
+    logs_dir.
+    """
+    # Imported here since sync needs the derived-state modules
+    from src.storage.sync import DirectoryTarget, drop_derived, sync
+
+    with open(path, 'rb') as f:
+        os.makedirs(logs_dir, exist_ok=True)
+        # Inside logs_dir so days move with a rename; daily logs are only listed at the top
+        staging = tempfile.mkdtemp(prefix='.import-', dir=logs_dir)
+        try:
+            entries = 0
+            counts = {}
+            for days in _ordered_map(_format_block, iter_blocks(f), jobs or os.cpu_count() or 1):
+                for day, lines, count in days:
+                    with open(os.path.join(staging, inputs_filename(day)), 'a',
+                              encoding='utf-8') as log:
+                        log.write(lines)
+                    counts[day] = counts.get(day, 0) + count
+                    entries += count
+            moved = added = pulled = 0
+            for day, count in counts.items():
+                if find_input_log(logs_dir, day) is None:
+                    name = inputs_filename(day)
+                    os.replace(os.path.join(staging, name), os.path.join(logs_dir, name))
+                    moved += 1
+                    added += count
+            if moved < len(counts):
+                result = sync(logs_dir, [DirectoryTarget(staging)], push=False)
+                pulled, added = result.pulled, added + result.added
+            if moved and not pulled:
+                drop_derived(logs_dir)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+    return ImportResult(entries, moved + pulled, added)
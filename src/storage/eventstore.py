@@ -0,0 +1,371 @@
+import json
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+from src.storage.textlog import Entry, ObserverGroup, StaleWatermark, in_order
+
+# Every segment starts with this magic so foreign files are never misread
+SEGMENT_MAGIC = b'URGEVT1\n'
+SEGMENT_PREFIX = 'events_'
+SEGMENT_SUFFIX = '.seg'
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+CHECKPOINT_FILENAME = 'checkpoint.json'
+
+# Record framing: u32 body length, then a one byte record kind
+_LENGTH = struct.Struct('<I')
+_KIND = struct.Struct('<B')
+_FRAME = struct.Struct('<IB')
+# Label definition body: u32 label id, then the UTF-8 label name
+_LABEL = struct.Struct('<I')
+# Event body: f64 epoch seconds, u32 label id (0 = no label), then UTF-8 text
+_EVENT = struct.Struct('<dI')
+_TIMESTAMP = struct.Struct('<d')
+
+KIND_LABEL = 1
+KIND_EVENT = 2
+NO_LABEL = 0
+
+# An event as stored: the text is a memoryview into the mapped segment
+RawEvent = namedtuple('RawEvent', ['timestamp', 'label_id', 'text'])
+
+
+def segment_filename(number):
+    """Return the file name of the numbered segment."""
+    return f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory):
+    """Return the segment paths in a directory, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    names = sorted(n for n in names
+                   if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+def read_event(f, offset):
+    """Return the RawEvent of the event record at offset in an open segment, or None.
+
+    The text is returned as bytes.
+    """
+    f.seek(offset)
+    header = f.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    length, kind = _FRAME.unpack(header)
+    body = f.read(length - _KIND.size)
+    if kind != KIND_EVENT or len(body) < length - _KIND.size:
+        return None
+    timestamp, label_id = _EVENT.unpack_from(body)
+    return RawEvent(timestamp, label_id, body[_EVENT.size:])
+
+
+def _scan(buf, labels, start=None):
+    """Yield (offset, kind, body start, body end) for each complete record.
+
+    Label definitions are added to the labels dict as they are met. Scanning
+    stops at the first truncated record, so a torn tail is ignored.
+    """
+    size = len(buf)
+    offset = len(SEGMENT_MAGIC) if start is None else start
+    while offset + _LENGTH.size + _KIND.size <= size:
+        (length,) = _LENGTH.unpack_from(buf, offset)
+        start = offset + _LENGTH.size
+        end = start + length
+        if length < _KIND.size or end > size:
+            break
+        (kind,) = _KIND.unpack_from(buf, start)
+        body = start + _KIND.size
+        if kind == KIND_LABEL:
+            (label_id,) = _LABEL.unpack_from(buf, body)
+            labels[label_id] = bytes(buf[body + _LABEL.size:end]).decode('utf-8')
+        yield offset, kind, body, end
+        offset = end
+
+
+class EventStoreReader:
+    """Memory-mapped, zero-copy reader over every segment in a directory.
+
+    The memoryviews yielded by iter_raw() point into the mapped files and are
+    only valid until the reader is closed.
+    """
+
+    def __init__(self, directory):
+        """Map every non-empty segment in the directory."""
+        self.labels = {}
+        self._maps = []
+        for path in list_segments(directory):
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size <= len(SEGMENT_MAGIC):
+                    continue
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                mapped.close()
+                raise ValueError(f"Not an event segment: {path}")
+            self._maps.append(mapped)
+
+    def iter_raw(self):
+        """Yield RawEvent tuples without copying the text payloads."""
+        header = _FRAME.unpack_from
+        event = _EVENT.unpack_from
+        head_size = _FRAME.size
+        for mapped in self._maps:
+            view = memoryview(mapped)
+            try:
+                size = len(view)
+                offset = len(SEGMENT_MAGIC)
+                while offset + head_size <= size:
+                    length, kind = header(view, offset)
+                    end = offset + _LENGTH.size + length
+                    if length < _KIND.size or end > size:
+                        break
+                    body = offset + head_size
+                    if kind == KIND_EVENT:
+                        timestamp, label_id = event(view, body)
+                        yield RawEvent(timestamp, label_id, view[body + _EVENT.size:end])
+                    elif kind == KIND_LABEL:
+                        (label_id,) = _LABEL.unpack_from(view, body)
+                        self.labels[label_id] = str(view[body + _LABEL.size:end], 'utf-8')
+                    offset = end
+            finally:
+                view.release()
+
+    def iter_entries(self):
+        """Yield decoded Entry tuples."""
+        labels = self.labels
+        for timestamp, label_id, text in self.iter_raw():
+            label = labels.get(label_id) if label_id != NO_LABEL else None
+            yield Entry(timestamp, label, str(text, 'utf-8'))
+
+    def close(self):
+        """Unmap every segment."""
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a text view; the map is freed with it
+                pass
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventStore:
+    """Append-only binary store of length-prefixed records in segment files.
+
+    Labels are interned: the first time a label is written a definition
+    record assigns it a numeric id, and events only carry that id. Observers
+    are notified like those of TextLogStore, with the segment file name as
+    the source.
+
+    Every segment declares all labels known when it was started, so opening
+    the store only scans the newest segment, and only past the checkpoint
+    saved with the last flush: the label table, the newest timestamp and how
+    far the segment was valid.
+    """
+
+    SAVE_INTERVAL = 5.0
+
+    def __init__(self, directory, segment_size=DEFAULT_SEGMENT_SIZE, observers=()):
+        """Initialize the store; segments are opened on the writer thread, on first use."""
+        self.directory = directory
+        self.segment_size = segment_size
+        self.observers = ObserverGroup(observers)
+        self.label_ids = {}
+        # Newest event timestamp in the segments, known once the store is open
+        self.last_timestamp = None
+        self._file = None
+        self._last_checkpoint = 0.0
+
+    def _open(self):
+        """Open the newest segment for appending, recovering the label table."""
+        if self._file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        segments = list_segments(self.directory)
+        if not segments:
+            self._number = 1
+            self._open_segment(os.path.join(self.directory, segment_filename(1)), 0)
+            return
+        path = segments[-1]
+        labels, start = {}, None
+        checkpoint = self._load_checkpoint(path)
+        if checkpoint is not None:
+            start, labels, self.last_timestamp = checkpoint
+        valid_end = self._recover(path, labels, start)
+        # A segment just started holds only label definitions; the newest event is further back
+        for older in reversed(segments[:-1]):
+            if self.last_timestamp is not None:
+                break
+            self._recover(older, {})
+        self.label_ids = {name: label_id for label_id, name in labels.items()}
+        self._number = int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        self._open_segment(path, valid_end)
+
+    def _load_checkpoint(self, path):
+        """Return (valid offset, labels, newest timestamp) saved for a segment, or None."""
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILENAME), 'r',
+                      encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved['segment'] != os.path.basename(path) or \
+                    saved['offset'] > os.path.getsize(path):
+                return None
+            labels = {int(label_id): name for label_id, name in saved['labels'].items()}
+            return saved['offset'], labels, saved['last_timestamp']
+        except (FileNotFoundError, KeyError, TypeError, ValueError):
+            return None
+
+    def _save_checkpoint(self):
+        """Record how far the current segment is valid, with the labels and newest timestamp."""
+        path = os.path.join(self.directory, CHECKPOINT_FILENAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segment': self._source, 'offset': self._size,
+                       'labels': {label_id: name for name, label_id in self.label_ids.items()},
+                       'last_timestamp': self.last_timestamp}, f)
+        os.replace(tmp_path, path)
+        self._last_checkpoint = time.monotonic()
+
+    def _recover(self, path, labels, start=None):
+        """Scan a segment from start for labels and the newest event; return its valid length.
+
+        The segment is mapped rather than read, so memory does not grow with it.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 0
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mapped[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                raise ValueError(f"Not an event segment: {path}")
+            valid_end = len(SEGMENT_MAGIC) if start is None else start
+            for _, kind, body, end in _scan(mapped, labels, start):
+                if kind == KIND_EVENT:
+                    (timestamp,) = _TIMESTAMP.unpack_from(mapped, body)
+                    self.last_timestamp = max(timestamp, self.last_timestamp or timestamp)
+                valid_end = end
+        finally:
+            mapped.close()
+        return valid_end
+
+    def _open_segment(self, path, valid_end):
+        """Open a segment for appending, dropping any torn record at its tail."""
+        self._source = os.path.basename(path)
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if valid_end < len(SEGMENT_MAGIC):
+            self._file.truncate(0)
+            self._file.write(SEGMENT_MAGIC)
+        else:
+            self._file.truncate(valid_end)
+            self._file.seek(valid_end)
+        self._size = self._file.tell()
+
+    def _roll(self):
+        """Start a new segment once the current one is full."""
+        self._file.close()
+        self._number += 1
+        self._open_segment(os.path.join(self.directory, segment_filename(self._number)), 0)
+        # Segments must be readable on their own, so labels are declared again
+        for name, label_id in self.label_ids.items():
+            self._append(KIND_LABEL, _LABEL.pack(label_id) + name.encode('utf-8'))
+
+    def _append(self, kind, body):
+        """Write one framed record."""
+        record = _LENGTH.pack(len(body) + _KIND.size) + _KIND.pack(kind) + body
+        self._file.write(record)
+        self._size += len(record)
+
+    def _label_id(self, label):
+        """Return the interned id of a label, defining it on first use."""
+        if not label:
+            return NO_LABEL
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            label_id = len(self.label_ids) + 1
+            self.label_ids[label] = label_id
+            self._append(KIND_LABEL, _LABEL.pack(label_id) + label.encode('utf-8'))
+        return label_id
+
+    def open(self):
+        """Recover the newest segment and let observers load; runs on the writer thread."""
+        self._open()
+        self.observers.load(self)
+
+    def write(self, entries):
+        """Append a batch of entries, keeping them in time order like TextLogStore."""
+        self._open()
+        for entry in entries:
+            entry = in_order(entry, self.last_timestamp)
+            self.last_timestamp = entry.timestamp
+            if self._size >= self.segment_size:
+                self._roll()
+            label_id = self._label_id(entry.label)
+            offset = self._size
+            self._append(KIND_EVENT, _EVENT.pack(entry.timestamp, label_id)
+                         + entry.text.encode('utf-8'))
+            self.observers.add(entry, self._source, offset, self._size)
+
+    def flush(self, fsync=False):
+        """Flush buffered records to the OS, and to disk when fsync is set."""
+        if self._file is not None:
+            self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+            if time.monotonic() - self._last_checkpoint >= self.SAVE_INTERVAL:
+                self._save_checkpoint()
+        self.observers.flush(self, fsync)
+
+    def close(self):
+        """Flush and close the current segment."""
+        if self._file is not None:
+            self._file.flush()
+            self._save_checkpoint()
+            self._file.close()
+            self._file = None
+        self.observers.close()
+
+    def iter_since(self, watermark):
+        """Yield (entry, source, offset, end_offset) for records past a watermark.
+
+        Label definitions are yielded with entry None so the watermark still
+        advances past them. Segments are mapped, and those already consumed
+        are skipped without reading them.
+        """
+        self._open()
+        self._file.flush()
+        labels = {label_id: name for name, label_id in self.label_ids.items()}
+        for path in list_segments(self.directory):
+            source = os.path.basename(path)
+            consumed = watermark.get(source, 0)
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < consumed:
+                    raise StaleWatermark(source)
+                if size == consumed:
+                    continue
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for offset, kind, body, end in _scan(data, {}, max(consumed, len(SEGMENT_MAGIC))):
+                    entry = None
+                    if kind == KIND_EVENT:
+                        timestamp, label_id = _EVENT.unpack_from(data, body)
+                        label = labels.get(label_id) if label_id != NO_LABEL else None
+                        entry = Entry(timestamp, label,
+                                      data[body + _EVENT.size:end].decode('utf-8'))
+                    yield entry, source, offset, end
+            finally:
+                data.close()
+
+    def reader(self):
+        """Return a reader over everything flushed so far."""
+        return EventStoreReader(self.directory)
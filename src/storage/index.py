@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from src.storage.archive import log_size, open_log
+from src.storage.textlog import (
+    day_of_source, find_input_log, iter_file_lines, list_input_logs, parse_line
+)
+
+INDEX_DIRNAME = 'index'
+NO_LABEL = 0
+
+# Column files: one value per indexed entry, in log order
+_COLUMNS = {
+    'timestamps': 'd',  # epoch seconds
+    'labels': 'I',      # label id, 0 = no label
+    'offsets': 'Q',     # byte offset of the line in its daily log
+}
+# Hour table: first entry position of every hour (epoch // 3600) with entries
+_HOUR_COLUMNS = {
+    'hours': 'q',
+    'hour_starts': 'I',
+}
+
+
+def _to_epoch(value):
+    """Accept epoch seconds or a datetime and return epoch seconds."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class HistoryIndex:
+    """Time-range and label index over the daily inputs logs.
+
+    Entries are stored as fixed-width column files so the whole index loads
+    with a handful of array reads. An hour table and a per-day table give the
+    first entry of each hour and day, and every label has a posting list of
+    entry positions, so query() and count() bisect instead of scanning.
+    """
+
+    def __init__(self, index_dir, logs_dir):
+        """Initialize the index; files are loaded on first use."""
+        self.index_dir = index_dir
+        self.logs_dir = logs_dir
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    # ------------------------------------------------------------------ loading
+
+    def _path(self, name):
+        """Return the path of an index file."""
+        return os.path.join(self.index_dir, name)
+
+    def _reset(self):
+        """Start from an empty in-memory index."""
+        self.columns = {name: array(code) for name, code in _COLUMNS.items()}
+        self.hour_columns = {name: array(code) for name, code in _HOUR_COLUMNS.items()}
+        self.label_names = []
+        self.label_ids = {}
+        self.postings = {}
+        # Rows of [day, first entry position, end byte offset of the day's log]
+        self.days = []
+        self._persisted = {}
+
+    def _ensure_loaded(self):
+        """Load the index from disk and index any log lines written since."""
+        if self._loaded:
+            return
+        self._reset()
+        self._loaded = True
+        try:
+            with open(self._path('meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.label_names = meta['labels']
+            self.days = meta['days']
+            count = meta['count']
+        except (FileNotFoundError, KeyError, ValueError):
+            self._rebuild_locked()
+            return
+        self.label_ids = {name: i + 1 for i, name in enumerate(self.label_names)}
+        for name in _COLUMNS:
+            self._load_column(name, self.columns[name])
+        for name in _HOUR_COLUMNS:
+            self._load_column(name, self.hour_columns[name])
+        for label_id in range(1, len(self.label_names) + 1):
+            self.postings[label_id] = array('I')
+            self._load_column(f'label_{label_id}', self.postings[label_id])
+
+        # meta.json is replaced after the columns are appended, so columns may
+        # run past its count after a crash but never fall short of it
+        if any(len(values) < count for values in self.columns.values()):
+            self._rebuild_locked()
+            return
+        for values in self.columns.values():
+            del values[count:]
+        starts = self.hour_columns['hour_starts']
+        keep = bisect_left(starts, count)
+        for values in self.hour_columns.values():
+            del values[keep:]
+        for positions in self.postings.values():
+            del positions[bisect_left(positions, count):]
+        self._truncate_files()
+        if not self._catch_up():
+            self._rebuild_locked()
+
+    def _load_column(self, name, values):
+        """Read one column file into memory."""
+        try:
+            with open(self._path(f'{name}.bin'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        values.frombytes(data[:len(data) - len(data) % values.itemsize])
+
+    def _named_columns(self):
+        """Return every persisted array keyed by its file name."""
+        named = dict(self.columns)
+        named.update(self.hour_columns)
+        for label_id, positions in self.postings.items():
+            named[f'label_{label_id}'] = positions
+        return named
+
+    def _truncate_files(self):
+        """Cut column files back to the values kept in memory."""
+        for name, values in self._named_columns().items():
+            path = self._path(f'{name}.bin')
+            size = len(values) * values.itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+            self._persisted[name] = len(values)
+
+    def _catch_up(self):
+        """Index log lines written after the last flush; False if a rebuild is needed."""
+        known = {row[0]: row for row in self.days}
+        last_day = self.days[-1][0] if self.days else None
+        for day, path in list_input_logs(self.logs_dir):
+            size = log_size(path)
+            row = known.get(day)
+            if row is not None:
+                if size < row[2]:
+                    return False
+                if size == row[2]:
+                    continue
+                if day != last_day:
+                    # Only the newest day may grow; older days changed underneath us
+                    return False
+                start = row[2]
+            elif last_day is not None and day < last_day:
+                return False
+            else:
+                start = 0
+            for offset, end_offset, line in iter_file_lines(path, start):
+                entry = parse_line(line)
+                if entry is not None:
+                    self._add(entry, day, offset, end_offset)
+                else:
+                    self._set_day_end(day, end_offset)
+            last_day = day
+        return True
+
+    # ----------------------------------------------------------------- updating
+
+    def _set_day_end(self, day, end_offset):
+        """Record how far into a day's log has been indexed."""
+        if self.days and self.days[-1][0] == day:
+            self.days[-1][2] = end_offset
+        else:
+            self.days.append([day, len(self.columns['timestamps']), end_offset])
+
+    def _add(self, entry, day, offset, end_offset):
+        """Append one entry to the in-memory index."""
+        timestamps = self.columns['timestamps']
+        position = len(timestamps)
+        self._set_day_end(day, end_offset)
+
+        label_id = NO_LABEL
+        if entry.label:
+            label_id = self.label_ids.get(entry.label)
+            if label_id is None:
+                self.label_names.append(entry.label)
+                label_id = len(self.label_names)
+                self.label_ids[entry.label] = label_id
+                self.postings[label_id] = array('I')
+            self.postings[label_id].append(position)
+
+        hour = int(entry.timestamp // 3600)
+        hours = self.hour_columns['hours']
+        if not hours or hour != hours[-1]:
+            hours.append(hour)
+            self.hour_columns['hour_starts'].append(position)
+
+        timestamps.append(entry.timestamp)
+        self.columns['labels'].append(label_id)
+        self.columns['offsets'].append(offset)
+
+    def load(self, store=None):
+        """Load the index from disk and catch up with the logs, dropping any state in memory."""
+        with self._lock:
+            self._loaded = False
+            self._ensure_loaded()
+
+    def add(self, entry, source, offset, end_offset):
+        """Index an entry just appended to the named daily log at offset."""
+        with self._lock:
+            self._ensure_loaded()
+            self._add(entry, day_of_source(source), offset, end_offset)
+
+    def flush(self, fsync=False):
+        """Append new column values to disk and save the day and label tables."""
+        with self._lock:
+            if not self._loaded:
+                return
+            os.makedirs(self.index_dir, exist_ok=True)
+            for name, values in self._named_columns().items():
+                done = self._persisted.get(name, 0)
+                if done == len(values) and os.path.exists(self._path(f'{name}.bin')):
+                    continue
+                mode = 'ab' if done else 'wb'
+                with open(self._path(f'{name}.bin'), mode) as f:
+                    values[done:].tofile(f)
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                self._persisted[name] = len(values)
+            # The metadata is replaced last, so it never points past the columns
+            tmp_path = self._path('meta.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'count': len(self.columns['timestamps']),
+                           'labels': self.label_names, 'days': self.days}, f)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self._path('meta.json'))
+
+    def close(self):
+        """Persist the index."""
+        self.flush()
+
+    def rebuild(self):
+        """Recreate the index from the daily inputs logs."""
+        with self._lock:
+            self._rebuild_locked()
+            self.flush()
+
+    def _rebuild_locked(self):
+        """Drop the in-memory index and reindex every log from the start."""
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+        self._reset()
+        self._loaded = True
+        self._catch_up()
+
+    # ------------------------------------------------------------------ queries
+
+    def _position(self, timestamp):
+        """Return the first entry position at or after timestamp."""
+        timestamps = self.columns['timestamps']
+        hours = self.hour_columns['hours']
+        starts = self.hour_columns['hour_starts']
+        slot = bisect_right(hours, int(timestamp // 3600)) - 1
+        if slot < 0:
+            return 0
+        lo = starts[slot]
+        hi = starts[slot + 1] if slot + 1 < len(starts) else len(timestamps)
+        return bisect_left(timestamps, timestamp, lo, hi)
+
+    def _range(self, start, end, label):
+        """Return the entry positions in [start, end) for an optional label."""
+        lo = self._position(_to_epoch(start))
+        hi = self._position(_to_epoch(end))
+        if label is None:
+            return range(lo, hi)
+        positions = self.postings.get(self.label_ids.get(label), array('I'))
+        return positions[bisect_left(positions, lo):bisect_left(positions, hi)]
+
+    def count(self, start, end, label=None):
+        """Return how many entries fall in [start, end), optionally for one label."""
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._range(start, end, label))
+
+    def query(self, start, end, label=None):
+        """Return the entries in [start, end), optionally for one label."""
+        with self._lock:
+            self._ensure_loaded()
+            positions = self._range(start, end, label)
+            day_starts = [row[1] for row in self.days]
+            located = [(self.days[bisect_right(day_starts, p) - 1][0],
+                        self.columns['offsets'][p]) for p in positions]
+        entries = []
+        current_day = None
+        f = None
+        try:
+            for day, offset in located:
+                if day != current_day:
+                    if f is not None:
+                        f.close()
+                    path = find_input_log(self.logs_dir, day)
+                    f = open_log(path) if path else None
+                    current_day = day
+                if f is None:
+                    continue
+                f.seek(offset)
+                entry = parse_line(f.readline().decode('utf-8', errors='replace'))
+                if entry is not None:
+                    entries.append(entry)
+        finally:
+            if f is not None:
+                f.close()
+        return entries
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self.columns['timestamps'])
+
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD[ HH:MM] command line argument."""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Invalid date: {value}")
+
+
+def main():
+    """Command line entry point: rebuild or query the history index."""
+    # Imported here since the backends module itself imports this one
+    from src.storage.backends import default_logs_dir
+
+    parser = argparse.ArgumentParser(description="Urge history index")
+    parser.add_argument('--logs-dir', default=default_logs_dir())
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('rebuild', help="recreate the index from the daily logs")
+    query = commands.add_parser('query', help="count or list entries in a time range")
+    query.add_argument('start', type=_parse_date)
+    query.add_argument('end', type=_parse_date)
+    query.add_argument('--label')
+    query.add_argument('--list', action='store_true', help="print the entries")
+    args = parser.parse_args()
+
+    index = HistoryIndex(os.path.join(args.logs_dir, INDEX_DIRNAME), args.logs_dir)
+    if args.command == 'rebuild':
+        started = time.perf_counter()
+        index.rebuild()
+        print(f"Indexed {len(index)} entries in {time.perf_counter() - started:.2f} s")
+        return
+    if args.list:
+        for entry in index.query(args.start, args.end, args.label):
+            stamp = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{stamp}\t{entry.label or ''}\t{entry.text}")
+    else:
+        print(index.count(args.start, args.end, args.label))
+    index.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""Multi-resolution entry counts for the history chart.
+
+For every label, entries are counted in minute, hour, day and week buckets
+of local time. Each level keeps only its non-empty buckets, as two parallel
+arrays sorted by bucket, so a new entry usually increments the last bucket
+of each level and memory follows the number of busy minutes rather than the
+span of the history. Saves rewrite only the tail of each array that changed
+since the last save.
+
+A chart query reads the finest level that has at most POINTS_PER_PIXEL
+buckets per pixel over the visible range, fills in the empty buckets and
+reduces the series to the pixel width with Largest-Triangle-Three-Buckets,
+so a redraw costs about the same over an hour or over ten years.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+from src.storage.textlog import StaleWatermark
+
+PYRAMID_DIRNAME = 'chart'
+PYRAMID_VERSION = 1
+META_FILENAME = 'meta.json'
+# (name, bucket seconds, shift added before dividing); weeks start on a
+# Monday, and 1970-01-01 was a Thursday
+LEVELS = (('minute', 60, 0), ('hour', 3600, 0), ('day', 86400, 0),
+          ('week', 7 * 86400, 3 * 86400))
+# Buckets a query may read per pixel before a coarser level is used
+POINTS_PER_PIXEL = 2
+NO_LABEL = ''
+
+# Entries per bucket: bucket length in seconds, bucket starts in local seconds, counts
+Series = namedtuple('Series', ['bucket_seconds', 'xs', 'ys'])
+
+
+def local_seconds(timestamp):
+    """Return epoch seconds shifted by the local UTC offset, so buckets follow local days."""
+    return int(timestamp) + time.localtime(timestamp).tm_gmtoff
+
+
+def lttb(xs, ys, threshold):
+    """Downsample a series to threshold points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept. From each of threshold - 2 equal
+    buckets in between, the point kept is the one forming the largest
+    triangle with the point kept before it and the average of the next
+    bucket, so peaks survive that plain decimation would drop.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return xs, ys
+    every = (n - 2) / (threshold - 2)
+    bounds = [int(i * every) + 1 for i in range(threshold - 1)] + [n]
+    # Prefix sums give each bucket's average without summing it again
+    sum_x = [0, *accumulate(xs)]
+    sum_y = [0, *accumulate(ys)]
+    out_x = [xs[0]]
+    out_y = [ys[0]]
+    ax, ay = xs[0], ys[0]
+    for lo, hi, next_hi in zip(bounds, bounds[1:], bounds[2:]):
+        span = next_hi - hi
+        dx = (sum_x[next_hi] - sum_x[hi]) / span - ax
+        dy = (sum_y[next_hi] - sum_y[hi]) / span - ay
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            # Twice the triangle area; buckets hold a few points, so a plain loop is fastest
+            area = abs(dx * (ys[i] - ay) - dy * (xs[i] - ax))
+            if area > best_area:
+                best, best_area = i, area
+        ax, ay = xs[best], ys[best]
+        out_x.append(ax)
+        out_y.append(ay)
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+class CountPyramid:
+    """Per-label entry counts at every level, kept current as entries are written.
+
+    Like the rollups, the counts are saved together with a watermark of how
+    far into each log they reach, and on load only later records are
+    counted.
+    """
+
+    SAVE_INTERVAL = 5.0
+
+    def __init__(self, directory):
+        """Initialize the pyramid; state is loaded on the writer thread."""
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._dirty = False
+        self._last_save = 0.0
+        # Bumped on every change, so a chart can tell when to redraw
+        self.version = 0
+        self._reset()
+
+    def _reset(self):
+        """Start from empty counts."""
+        # label -> [keys, counts] for each level in turn
+        self.labels = {}
+        # log file name -> byte offset already counted
+        self.watermark = {}
+        # (label, level) -> first array index changed since the last save
+        self._changed = {}
+        # Local UTC offset of the hour last seen; it only changes on the hour
+        self._hour = None
+        self._offset = 0
+
+    def _path(self, number, level, kind):
+        """Return the file of one array: label number, level number, 'keys' or 'counts'."""
+        return os.path.join(self.directory, f"{number}_{LEVELS[level][0]}_{kind}.bin")
+
+    @property
+    def ready(self):
+        """True once the saved counts are loaded and caught up."""
+        return self._ready.is_set()
+
+    def load(self, store):
+        """Load the saved counts and count whatever the store wrote since.
+
+        Counts in memory are dropped first, so the store can call this again
+        after add() failed.
+        """
+        try:
+            with self._lock:
+                self._reset()
+                try:
+                    self._load_saved()
+                except (FileNotFoundError, KeyError, ValueError, OSError):
+                    self._reset()
+                    shutil.rmtree(self.directory, ignore_errors=True)
+                try:
+                    self._catch_up(store)
+                except StaleWatermark:
+                    self._reset()
+                    shutil.rmtree(self.directory, ignore_errors=True)
+                    self._catch_up(store)
+                self._dirty = True
+                self._save()
+        finally:
+            self._ready.set()
+
+    def _load_saved(self):
+        """Read meta.json and every array it lists."""
+        with open(os.path.join(self.directory, META_FILENAME), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != PYRAMID_VERSION:
+            raise ValueError("chart pyramid version changed")
+        for number, (label, lengths) in enumerate(zip(meta['labels'], meta['lengths'])):
+            arrays = self._arrays(label)
+            for level, length in enumerate(lengths):
+                for kind, values in (('keys', arrays[2 * level]), ('counts', arrays[2 * level + 1])):
+                    with open(self._path(number, level, kind), 'rb') as f:
+                        values.frombytes(f.read())
+                    if len(values) != length:
+                        raise ValueError("chart pyramid arrays do not match meta.json")
+        self.watermark = meta['watermark']
+        self._changed = {}
+
+    def _catch_up(self, store):
+        """Count every record past the watermark."""
+        for entry, source, _, end_offset in store.iter_since(self.watermark):
+            if entry is not None:
+                self._add(entry)
+            self.watermark[source] = end_offset
+
+    def _arrays(self, label):
+        """Return the arrays of a label, creating them on first use."""
+        arrays = self.labels.get(label)
+        if arrays is None:
+            arrays = self.labels[label] = [array('q') if i % 2 == 0 else array('I')
+                                           for i in range(2 * len(LEVELS))]
+        return arrays
+
+    def _add(self, entry):
+        """Count one entry at every level."""
+        label = entry.label or NO_LABEL
+        arrays = self._arrays(label)
+        seconds = int(entry.timestamp)
+        if seconds // 3600 != self._hour:
+            self._hour = seconds // 3600
+            self._offset = time.localtime(seconds).tm_gmtoff
+        local = seconds + self._offset
+        changed = self._changed
+        for level, (_, size, shift) in enumerate(LEVELS):
+            keys, counts = arrays[2 * level], arrays[2 * level + 1]
+            key = (local + shift) // size
+            if keys and keys[-1] == key:
+                index = len(keys) - 1
+                counts[index] += 1
+            elif not keys or keys[-1] < key:
+                index = len(keys)
+                keys.append(key)
+                counts.append(1)
+            else:
+                # An entry logged with an earlier timestamp than the last one
+                index = bisect_left(keys, key)
+                if keys[index] == key:
+                    counts[index] += 1
+                else:
+                    keys.insert(index, key)
+                    counts.insert(index, 1)
+            mark = (label, level)
+            if index < changed.get(mark, index + 1):
+                changed[mark] = index
+        self.version += 1
+
+    def add(self, entry, source, offset, end_offset):
+        """Count an entry just written to source."""
+        with self._lock:
+            self._add(entry)
+            self.watermark[source] = end_offset
+            self._dirty = True
+
+    def _save(self):
+        """Write the changed array tails, then meta.json."""
+        if not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, META_FILENAME)
+        # Arrays are rewritten in place, so a crash mid-save must not leave the
+        # old meta.json in charge: without it the next start recounts instead
+        if os.path.exists(meta_path):
+            os.unlink(meta_path)
+        labels = list(self.labels)
+        for number, label in enumerate(labels):
+            arrays = self.labels[label]
+            for level in range(len(LEVELS)):
+                start = self._changed.get((label, level))
+                if start is None:
+                    continue
+                for kind, values in (('keys', arrays[2 * level]), ('counts', arrays[2 * level + 1])):
+                    path = self._path(number, level, kind)
+                    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                        f.truncate(start * values.itemsize)
+                        f.seek(start * values.itemsize)
+                        values[start:].tofile(f)
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PYRAMID_VERSION, 'labels': labels,
+                       'lengths': [[len(self.labels[label][2 * level])
+                                    for level in range(len(LEVELS))] for label in labels],
+                       'watermark': self.watermark}, f)
+        os.replace(tmp_path, meta_path)
+        self._changed = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self, fsync=False):
+        """Save at most every SAVE_INTERVAL seconds; the watermark covers the rest."""
+        with self._lock:
+            if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+                self._save()
+
+    def close(self):
+        """Save any unsaved counts."""
+        with self._lock:
+            self._save()
+
+    def label_names(self):
+        """Return the labels with entries; NO_LABEL stands for entries without one."""
+        with self._lock:
+            return list(self.labels)
+
+    def extent(self):
+        """Return (first, end) local seconds of the days with entries, or None."""
+        size = LEVELS[2][1]
+        with self._lock:
+            days = [self.labels[label][4] for label in self.labels if self.labels[label][4]]
+            if not days:
+                return None
+            return (min(keys[0] for keys in days) * size,
+                    (max(keys[-1] for keys in days) + 1) * size)
+
+    def series(self, label, start, end, width):
+        """Return the Series of a label's entries over [start, end) in local seconds.
+
+        The result has at most width points. Returns None while the history
+        is still loading.
+        """
+        if not self._ready.is_set():
+            return None
+        start, end = int(start), int(end)
+        width = max(int(width), 3)
+        for level, (_, size, shift) in enumerate(LEVELS):
+            if (end - start) / size <= width * POINTS_PER_PIXEL:
+                break
+        first = (start + shift) // size
+        last = (end - 1 + shift) // size
+        ys = [0] * (last - first + 1)
+        with self._lock:
+            arrays = self.labels.get(label)
+            if arrays is not None:
+                keys, counts = arrays[2 * level], arrays[2 * level + 1]
+                lo = bisect_left(keys, first)
+                hi = bisect_right(keys, last)
+                for key, count in zip(keys[lo:hi], counts[lo:hi]):
+                    ys[key - first] = count
+        xs = list(range(first * size - shift, (last + 1) * size - shift, size))
+        if len(xs) > width:
+            xs, ys = lttb(xs, ys, width)
+        return Series(size, xs, ys)
@@ -0,0 +1,238 @@
+"""Hour-of-week risk model.
+
+For every label, entries are counted in 168 hour-of-week bins of local time
+with exponentially decayed weights, so a habit that stopped fades with a
+half-life of HALF_LIFE_DAYS. Decaying every bin on every entry would cost
+O(bins); instead weights are stored relative to a reference time and a new
+entry adds 2 ** (age / half-life), which grows over time. When that nears
+the float range, every bin is rescaled to a new reference in one O(bins)
+pass.
+
+A bin's expected entries per week is its decayed count over the decayed
+number of weeks the label has been seen. Counts are smoothed with the
+neighbouring hours and shrunk toward the label's mean, so a sparse history
+does not produce confident spikes, and the chance of at least one entry in
+the hour is 1 - exp(-rate), treating entries as a Poisson process.
+"""
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from src.storage.textlog import StaleWatermark
+
+RISK_FILENAME = 'risk.json'
+RISK_VERSION = 1
+NO_LABEL = ''
+HOURS_PER_WEEK = 168
+HALF_LIFE_DAYS = 28
+# Pseudo-weeks at the label's mean rate added to every bin
+PRIOR_WEEKS = 1.0
+# Weights of neighbouring hours when smoothing: previous, same, next
+SMOOTHING = (0.15, 0.7, 0.15)
+# Largest weight exponent before the bins are rescaled; 2 ** 64 keeps full precision
+_RESCALE_EXPONENT = 64
+# 1970-01-01 was a Thursday, 72 hours after the start of a Monday-based week
+_EPOCH_HOUR_OF_WEEK = 72
+
+# A label likely to be logged in the hour starting at start (epoch seconds)
+Risk = namedtuple('Risk', ['label', 'start', 'probability'])
+
+
+def hour_of_week(timestamp):
+    """Return the local hour of the week of epoch seconds, 0 being Monday 00:00."""
+    local = int(timestamp) + time.localtime(timestamp).tm_gmtoff
+    return (local // 3600 + _EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+
+class RiskModel:
+    """Decayed hour-of-week histograms per label, kept current as entries are written.
+
+    Like the rollups, the histograms are saved together with a watermark of
+    how far into each log they reach, and on load only later records are
+    counted.
+    """
+
+    SAVE_INTERVAL = 5.0
+
+    def __init__(self, path, half_life_days=HALF_LIFE_DAYS):
+        """Initialize the model; state is loaded on the writer thread."""
+        self.path = path
+        self.half_life = half_life_days * 86400.0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._dirty = False
+        self._last_save = 0.0
+        self._reset()
+
+    def _reset(self):
+        """Start from empty histograms."""
+        # label -> 168 weights relative to the reference time
+        self.bins = {}
+        # label -> timestamp of its first entry
+        self.first = {}
+        self.reference = None
+        # log file name -> byte offset already counted
+        self.watermark = {}
+        # Local hour of the week of the hour last seen
+        self._hour = None
+        self._hour_of_week = 0
+
+    @property
+    def ready(self):
+        """True once the saved histograms are loaded and caught up."""
+        return self._ready.is_set()
+
+    def load(self, store):
+        """Load the saved histograms and count whatever the store wrote since.
+
+        Histograms in memory are dropped first, so the store can call this
+        again after add() failed.
+        """
+        try:
+            with self._lock:
+                self._reset()
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        saved = json.load(f)
+                    if saved.get('version') != RISK_VERSION or \
+                            saved.get('half_life') != self.half_life:
+                        raise ValueError("risk model settings changed")
+                    self.bins = {label: array('d', weights)
+                                 for label, weights in saved['bins'].items()}
+                    self.first = saved['first']
+                    self.reference = saved['reference']
+                    self.watermark = saved['watermark']
+                except (FileNotFoundError, KeyError, TypeError, ValueError):
+                    self._reset()
+                try:
+                    self._catch_up(store)
+                except StaleWatermark:
+                    self._reset()
+                    self._catch_up(store)
+                self._dirty = True
+                self._save()
+        finally:
+            self._ready.set()
+
+    def _catch_up(self, store):
+        """Count every record past the watermark."""
+        for entry, source, _, end_offset in store.iter_since(self.watermark):
+            if entry is not None:
+                self._add(entry)
+            self.watermark[source] = end_offset
+
+    def _rescale(self, reference):
+        """Express every weight relative to a new reference time."""
+        factor = 2.0 ** ((self.reference - reference) / self.half_life)
+        for label, weights in self.bins.items():
+            self.bins[label] = array('d', [weight * factor for weight in weights])
+        self.reference = reference
+
+    def _add(self, entry):
+        """Count one entry in its hour-of-week bin."""
+        label = entry.label or NO_LABEL
+        timestamp = entry.timestamp
+        if self.reference is None:
+            self.reference = timestamp
+        exponent = (timestamp - self.reference) / self.half_life
+        if exponent > _RESCALE_EXPONENT:
+            self._rescale(timestamp)
+            exponent = 0.0
+        weights = self.bins.get(label)
+        if weights is None:
+            weights = self.bins[label] = array('d', bytes(8 * HOURS_PER_WEEK))
+            self.first[label] = timestamp
+        elif timestamp < self.first[label]:
+            self.first[label] = timestamp
+        # The local offset only changes on the hour
+        hour = int(timestamp) // 3600
+        if hour != self._hour:
+            self._hour = hour
+            self._hour_of_week = hour_of_week(timestamp)
+        weights[self._hour_of_week] += 2.0 ** exponent
+
+    def add(self, entry, source, offset, end_offset):
+        """Count an entry just written to source."""
+        with self._lock:
+            self._add(entry)
+            self.watermark[source] = end_offset
+            self._dirty = True
+
+    def _save(self):
+        """Atomically write the histograms and watermark."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': RISK_VERSION, 'half_life': self.half_life,
+                       'bins': {label: weights.tolist() for label, weights in self.bins.items()},
+                       'first': self.first, 'reference': self.reference,
+                       'watermark': self.watermark}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self, fsync=False):
+        """Save at most every SAVE_INTERVAL seconds; the watermark covers the rest."""
+        with self._lock:
+            if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+                self._save()
+
+    def close(self):
+        """Save any unsaved histograms."""
+        with self._lock:
+            self._save()
+
+    def probabilities(self, label, now=None):
+        """Return the chance of at least one entry of a label in each hour of the week.
+
+        The list is indexed by hour_of_week(), and is empty for a label
+        without entries.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            weights = self.bins.get(label)
+            if weights is None:
+                return []
+            # Weights as of now, and the matching decayed count of weeks observed
+            scale = 2.0 ** ((self.reference - now) / self.half_life)
+            counts = [weight * scale for weight in weights]
+            weeks = max((now - self.first[label]) / (7 * 86400), 1.0)
+        ratio = 0.5 ** (7 * 86400 / self.half_life)
+        exposure = (1 - ratio ** weeks) / (1 - ratio)
+        before, same, after = SMOOTHING
+        smoothed = [before * p + same * c + after * n for p, c, n in
+                    zip(counts[-1:] + counts[:-1], counts, counts[1:] + counts[:1])]
+        prior = PRIOR_WEEKS * sum(counts) / HOURS_PER_WEEK
+        scale = 1.0 / (exposure + PRIOR_WEEKS)
+        return [1.0 - math.exp(-(count + prior) * scale) for count in smoothed]
+
+    def upcoming(self, hours=6, threshold=0.3, now=None):
+        """Return the Risks at or above threshold from this hour on, soonest first.
+
+        Entries without a label are left out. Returns [] while the history
+        is still loading.
+        """
+        if not self._ready.is_set():
+            return []
+        now = time.time() if now is None else now
+        # The local start of every hour ahead; the last one may cross a DST change
+        starts = []
+        for ahead in range(hours):
+            at = int(now) + ahead * 3600
+            starts.append((at - (at + time.localtime(at).tm_gmtoff) % 3600,
+                           hour_of_week(at)))
+        with self._lock:
+            labels = [label for label in self.bins if label != NO_LABEL]
+        risks = []
+        for label in labels:
+            probabilities = self.probabilities(label, now)
+            risks.extend(Risk(label, start, probabilities[index]) for start, index in starts
+                         if probabilities[index] >= threshold)
+        risks.sort(key=lambda risk: (risk.start, -risk.probability))
+        return risks
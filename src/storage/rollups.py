@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from src.storage.textlog import StaleWatermark
+
+ROLLUPS_FILENAME = 'rollups.json'
+ROLLUPS_VERSION = 1
+NO_LABEL = ''
+
+# One row of the stats view
+LabelStats = namedtuple('LabelStats', ['label', 'today', 'week', 'all_time', 'streak'])
+
+
+def _day_key(day):
+    """Return the YYYYMMDD key of a date."""
+    return day.strftime("%Y%m%d")
+
+
+class RollupStore:
+    """Materialized per-label counts kept current as entries are written.
+
+    Each entry updates the all-time total, the count for its day and the
+    label's day streak in O(1). The tables are saved to rollups.json together
+    with a watermark of how far into each log file they have counted; on
+    load only the records past the watermark are aggregated, and a log that
+    shrank since causes a full recount.
+    """
+
+    SAVE_INTERVAL = 5.0
+
+    def __init__(self, path):
+        """Initialize the store; state is loaded on the writer thread."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._dirty = False
+        self._last_save = 0.0
+        self._reset()
+
+    def _reset(self):
+        """Start from empty tables."""
+        self.totals = {}
+        # YYYYMMDD -> {label: count}
+        self.daily = {}
+        # label -> [ordinal of the last day with an entry, consecutive days up to it]
+        self.streaks = {}
+        # log file name -> byte offset already counted
+        self.watermark = {}
+
+    @property
+    def ready(self):
+        """True once the saved tables are loaded and caught up."""
+        return self._ready.is_set()
+
+    def load(self, store):
+        """Load saved rollups and aggregate whatever the store wrote since.
+
+        The saved tables are published at once. The catch-up counts into a
+        copy of its own and takes the lock only to swap the result in, so
+        readers on the GUI thread never wait for it.
+        """
+        try:
+            scratch = RollupStore(self.path)
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                # Parsed twice: one copy is shown while the other is counted into
+                saved = self._restore(text)
+                with self._lock:
+                    self.totals, self.daily, self.streaks, self.watermark = saved
+                scratch.totals, scratch.daily, scratch.streaks, scratch.watermark = \
+                    self._restore(text)
+            except (FileNotFoundError, KeyError, ValueError):
+                pass
+            try:
+                scratch._catch_up(store)
+            except StaleWatermark:
+                scratch._reset()
+                scratch._catch_up(store)
+            with self._lock:
+                self.totals, self.daily = scratch.totals, scratch.daily
+                self.streaks, self.watermark = scratch.streaks, scratch.watermark
+                self._dirty = True
+                self._save()
+        finally:
+            self._ready.set()
+
+    @staticmethod
+    def _restore(text):
+        """Return (totals, daily, streaks, watermark) from the text of rollups.json."""
+        saved = json.loads(text)
+        if saved.get('version') != ROLLUPS_VERSION:
+            raise ValueError("rollups version changed")
+        return saved['totals'], saved['daily'], saved['streaks'], saved['watermark']
+
+    def _catch_up(self, store):
+        """Aggregate every record past the watermark."""
+        for entry, source, _, end_offset in store.iter_since(self.watermark):
+            if entry is not None:
+                self._add(entry)
+            self.watermark[source] = end_offset
+
+    def _add(self, entry):
+        """Count one entry."""
+        label = entry.label or NO_LABEL
+        day = date.fromtimestamp(entry.timestamp)
+        self.totals[label] = self.totals.get(label, 0) + 1
+        counts = self.daily.setdefault(_day_key(day), {})
+        counts[label] = counts.get(label, 0) + 1
+
+        ordinal = day.toordinal()
+        streak = self.streaks.get(label)
+        if streak is None or ordinal > streak[0] + 1:
+            self.streaks[label] = [ordinal, 1]
+        elif ordinal == streak[0] + 1:
+            streak[0] = ordinal
+            streak[1] += 1
+
+    def add(self, entry, source, offset, end_offset):
+        """Count an entry just written to source."""
+        with self._lock:
+            self._add(entry)
+            self.watermark[source] = end_offset
+            self._dirty = True
+
+    def _save(self):
+        """Atomically write the tables and watermark."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ROLLUPS_VERSION, 'totals': self.totals,
+                       'daily': self.daily, 'streaks': self.streaks,
+                       'watermark': self.watermark}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self, fsync=False):
+        """Save at most every SAVE_INTERVAL seconds; the watermark covers the rest."""
+        with self._lock:
+            if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+                self._save()
+
+    def close(self):
+        """Save any unsaved counts."""
+        with self._lock:
+            self._save()
+
+    def usage(self, half_life_days=14, today=None):
+        """Return {label: recency-weighted count} for ranking labels.
+
+        Each day's count is halved for every half_life_days of age, so
+        labels used often and lately rank first. Returns {} without waiting
+        while the rollups are still loading.
+        """
+        if not self._ready.is_set():
+            return {}
+        today = today or date.today()
+        horizon = half_life_days * 8
+        weights = [(_day_key(today - timedelta(days=age)), 0.5 ** (age / half_life_days))
+                   for age in range(horizon)]
+        with self._lock:
+            usage = {label: 0.0 for label in self.totals if label != NO_LABEL}
+            for key, weight in weights:
+                for label, count in self.daily.get(key, {}).items():
+                    if label != NO_LABEL:
+                        usage[label] += count * weight
+            return usage
+
+    def snapshot(self, today=None):
+        """Return LabelStats rows for today, this week (from Monday) and all time.
+
+        Never waits: while the rollups are catching up (see ready), the rows
+        are those of the last saved tables.
+        """
+        today = today or date.today()
+        monday = today - timedelta(days=today.weekday())
+        week_keys = [_day_key(monday + timedelta(days=i)) for i in range(today.weekday() + 1)]
+        today_ordinal = today.toordinal()
+        with self._lock:
+            rows = []
+            for label in sorted(self.totals):
+                last_day, streak = self.streaks.get(label, (0, 0))
+                rows.append(LabelStats(
+                    label,
+                    self.daily.get(_day_key(today), {}).get(label, 0),
+                    sum(self.daily.get(key, {}).get(label, 0) for key in week_keys),
+                    self.totals[label],
+                    # A streak is still current if it reached yesterday
+                    streak if last_day >= today_ordinal - 1 else 0,
+                ))
+            return rows
@@ -0,0 +1,664 @@
+"""Full-text search over the entry history.
+
+Entry texts are split into lowercase words, and each word maps to a posting
+list of entry numbers. Posting lists live in immutable segment files that
+each cover a consecutive range of at most MAX_SEGMENT_ENTRIES entries:
+every save writes the words added since then as new segments, and a
+background thread merges runs of small segments into bigger ones. Postings
+are stored as zlib-compressed deltas and per-entry columns only record where
+an entry's line is, so the index holds no text and stays a fraction of the
+log size.
+
+Queries visit segments newest first and stop as soon as no older entry can
+outrank the results found so far, so they usually only decode the postings
+of the newest segment or two, however long the history is.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from collections import namedtuple
+from itertools import accumulate
+from operator import sub
+
+from src.storage.archive import open_log
+from src.storage.eventstore import SEGMENT_SUFFIX as EVENTS_SUFFIX, read_event
+from src.storage.textlog import Entry, StaleWatermark, day_of_source, find_input_log, parse_line
+
+SEARCH_DIRNAME = 'search'
+SEARCH_VERSION = 1
+META_FILENAME = 'meta.json'
+SEGMENT_MAGIC = b'URGEIDX1'
+SEGMENT_PREFIX = 'postings_'
+SEGMENT_SUFFIX = '.seg'
+# Segment header: u32 length of the compressed term dictionary that follows
+_HEADER = struct.Struct('<I')
+
+# Entries covered by one segment at most
+MAX_SEGMENT_ENTRIES = 32768
+# Mergeable segments allowed to pile up before they are merged
+MAX_SEGMENTS = 8
+# Longer words are not indexed
+MAX_TERM_LENGTH = 32
+# Words a prefix query expands to, most frequent first
+MAX_EXPANSIONS = 64
+NO_LABEL = 0
+
+# BM25 parameters; entries are short, so every word counts once per entry
+K1 = 1.2
+B = 0.75
+# Bonus for a brand-new entry, halved every RECENCY_HALF_LIFE seconds
+RECENCY_WEIGHT = 2.0
+RECENCY_HALF_LIFE = 30 * 86400
+
+_WORD = re.compile(r'\w+')
+_QUERY_WORD = re.compile(r'(\w+)(\*?)')
+
+# Column files: one value per indexed entry, in write order
+_COLUMNS = {
+    'timestamps': 'I',  # epoch seconds
+    'labels': 'H',      # label number, 0 = no label
+    'sources': 'H',     # number of the log file holding the entry
+    'offsets': 'I',     # byte offset of the entry in that file
+    'lengths': 'B',     # words in the entry, capped at 255
+}
+
+# One search result
+SearchHit = namedtuple('SearchHit', ['score', 'entry'])
+
+
+def tokenize(text):
+    """Return the lowercase words of a text, in order."""
+    return [word for word in _WORD.findall(text.lower()) if len(word) <= MAX_TERM_LENGTH]
+
+
+def parse_query(query, prefix=False):
+    """Return (word, is_prefix) for every word of a query.
+
+    A word ending in * matches every word it starts. With prefix set, so
+    does the last word unless the query ends in whitespace, which suits
+    search as you type.
+    """
+    matches = _QUERY_WORD.findall(query.lower())
+    words = []
+    for i, (word, star) in enumerate(matches):
+        is_prefix = bool(star) or (prefix and i == len(matches) - 1
+                                   and not query[-1:].isspace())
+        if (word, is_prefix) not in words:
+            words.append((word, is_prefix))
+    return words
+
+
+def segment_filename(number):
+    """Return the file name of the numbered posting segment."""
+    return f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+
+def _encode(docs):
+    """Compress an ascending list of entry numbers."""
+    deltas = array('I', docs[:1])
+    deltas.extend(map(sub, docs[1:], docs[:-1]))
+    return zlib.compress(deltas.tobytes())
+
+
+def _decode(data):
+    """Return the entry numbers of a compressed posting list."""
+    return list(accumulate(array('I', zlib.decompress(data))))
+
+
+def write_segment(path, postings):
+    """Atomically write {term: ascending entry numbers} as a segment file."""
+    terms = {}
+    blobs = []
+    offset = 0
+    for term in sorted(postings):
+        data = _encode(postings[term])
+        terms[term] = [offset, len(data), len(postings[term])]
+        blobs.append(data)
+        offset += len(data)
+    dictionary = zlib.compress(json.dumps(terms, separators=(',', ':')).encode('utf-8'))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(SEGMENT_MAGIC + _HEADER.pack(len(dictionary)) + dictionary)
+        f.writelines(blobs)
+    os.replace(tmp_path, path)
+
+
+class _Segment:
+    """An open posting segment for entries [first, end).
+
+    The term dictionary is held in memory; posting lists are read from disk
+    when a query needs them.
+    """
+
+    def __init__(self, path, first, end):
+        """Read the term dictionary of a segment file."""
+        self.path = path
+        self.name = os.path.basename(path)
+        self.first = first
+        self.end = end
+        self._file = open(path, 'rb')
+        try:
+            head = self._file.read(len(SEGMENT_MAGIC) + _HEADER.size)
+            if head[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                raise ValueError(f"Not a posting segment: {path}")
+            (length,) = _HEADER.unpack_from(head, len(SEGMENT_MAGIC))
+            # term -> [offset in the postings area, compressed length, entries]
+            self.terms = json.loads(zlib.decompress(self._file.read(length)))
+        except Exception:
+            self._file.close()
+            raise
+        self._base = len(head) + length
+
+    def postings(self, term):
+        """Return the entry numbers of a term, or None; the caller holds the index lock."""
+        found = self.terms.get(term)
+        if found is None:
+            return None
+        self._file.seek(self._base + found[0])
+        return _decode(self._file.read(found[1]))
+
+    def iter_postings(self):
+        """Yield (term, entry numbers) for every term, through a separate file handle."""
+        with open(self.path, 'rb') as f:
+            for term, (offset, length, _) in self.terms.items():
+                f.seek(self._base + offset)
+                yield term, _decode(f.read(length))
+
+    def close(self):
+        """Close the segment file."""
+        self._file.close()
+
+
+class SearchIndex:
+    """Incremental inverted index over every stored entry.
+
+    Attached to the store as an observer like RollupStore: each written
+    entry is added to in-memory postings, which are saved at most every
+    SAVE_INTERVAL seconds together with a watermark of how far into each
+    log they reach. On load only records past the watermark are read, and
+    a log that shrank since causes a full reindex.
+    """
+
+    SAVE_INTERVAL = 5.0
+
+    def __init__(self, index_dir, logs_dir):
+        """Initialize the index; state is loaded on the writer thread."""
+        self.index_dir = index_dir
+        self.logs_dir = logs_dir
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._dirty = False
+        self._last_save = 0.0
+        self._compactor = None
+        self._closing = False
+        # Read-only connection to the entries database, opened on the first sqlite hit
+        self._queries = None
+        self.segments = []
+        self._reset()
+
+    # ------------------------------------------------------------------ loading
+
+    def _path(self, name):
+        """Return the path of an index file."""
+        return os.path.join(self.index_dir, name)
+
+    def _reset(self):
+        """Start from an empty index."""
+        for segment in self.segments:
+            segment.close()
+        self.columns = {name: array(code) for name, code in _COLUMNS.items()}
+        self.label_names = []
+        self.label_numbers = {}
+        self.source_names = []
+        self.source_numbers = {}
+        # log file name -> byte offset already indexed
+        self.watermark = {}
+        self.segments = []
+        # term -> entry numbers added since the last save
+        self.pending = {}
+        # term -> number of entries containing it, and the terms in order
+        self.frequency = {}
+        self.vocabulary = []
+        self.total_length = 0
+        # Entries whose postings and columns are on disk
+        self._saved_count = 0
+        self._next_segment = 1
+
+    @property
+    def ready(self):
+        """True once the saved index is loaded and caught up."""
+        return self._ready.is_set()
+
+    def load(self, store):
+        """Load the saved index and index whatever the store wrote since.
+
+        With store None the saved index is only read, as the command line
+        does when the app is not running. The index in memory is dropped
+        first, so the store can call this again after add() failed.
+        """
+        compactor = self._compactor
+        if compactor is not None:
+            # A merge must not swap its segment into the reloaded index
+            compactor.join()
+        try:
+            with self._lock:
+                self._reset()
+                try:
+                    self._load_saved()
+                except (FileNotFoundError, KeyError, ValueError, OSError, zlib.error):
+                    self._reset()
+                    if store is not None:
+                        shutil.rmtree(self.index_dir, ignore_errors=True)
+                if store is None:
+                    return
+                self._tidy_files()
+                try:
+                    self._catch_up(store)
+                except StaleWatermark:
+                    self._reset()
+                    shutil.rmtree(self.index_dir, ignore_errors=True)
+                    self._catch_up(store)
+                self._dirty = True
+                self._save()
+        finally:
+            self._ready.set()
+
+    def _load_saved(self):
+        """Read meta.json, the columns and the term dictionaries."""
+        with open(self._path(META_FILENAME), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != SEARCH_VERSION:
+            raise ValueError("search index version changed")
+        count = meta['count']
+        self.label_names = meta['labels']
+        self.label_numbers = {name: i + 1 for i, name in enumerate(self.label_names)}
+        self.source_names = meta['sources']
+        self.source_numbers = {name: i for i, name in enumerate(self.source_names)}
+        self.watermark = meta['watermark']
+        self._next_segment = meta['next_segment']
+
+        # meta.json is replaced after the columns are appended, so columns may
+        # run past its count after a crash but never fall short of it
+        for name, values in self.columns.items():
+            try:
+                with open(self._path(f'{name}.bin'), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b''
+            values.frombytes(data[:len(data) - len(data) % values.itemsize])
+            if len(values) < count:
+                raise ValueError(f"search column {name} is shorter than the index")
+            del values[count:]
+        self._saved_count = count
+        self.total_length = sum(self.columns['lengths'])
+
+        for name, first, end in meta['segments']:
+            self.segments.append(_Segment(self._path(name), first, end))
+        frequency = self.frequency
+        for segment in self.segments:
+            for term, (_, _, entries) in segment.terms.items():
+                frequency[term] = frequency.get(term, 0) + entries
+        self.vocabulary = sorted(frequency)
+
+    def _tidy_files(self):
+        """Cut columns back to the saved count and remove unreferenced segments."""
+        if not os.path.isdir(self.index_dir):
+            return
+        for name, values in self.columns.items():
+            path = self._path(f'{name}.bin')
+            size = len(values) * values.itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+        live = {segment.name for segment in self.segments}
+        for name in os.listdir(self.index_dir):
+            # Left behind by a save or merge interrupted before meta.json named it
+            if name.startswith(SEGMENT_PREFIX) and name not in live:
+                os.unlink(self._path(name))
+
+    def _catch_up(self, store):
+        """Index every record past the watermark."""
+        for entry, source, offset, end_offset in store.iter_since(self.watermark):
+            if entry is not None:
+                self._add(entry, source, offset)
+            self.watermark[source] = end_offset
+
+    # ----------------------------------------------------------------- updating
+
+    @staticmethod
+    def _number(name, names, numbers, first):
+        """Return the number of a label or source name, assigning the next one if new."""
+        number = numbers.get(name)
+        if number is None:
+            names.append(name)
+            number = numbers[name] = len(names) - 1 + first
+        return number
+
+    def _add(self, entry, source, offset):
+        """Index one entry; the caller holds the lock."""
+        columns = self.columns
+        number = len(columns['timestamps'])
+        words = tokenize(entry.text)
+        length = min(len(words), 255)
+        label = NO_LABEL
+        if entry.label:
+            label = self._number(entry.label, self.label_names, self.label_numbers, 1)
+        columns['timestamps'].append(max(0, int(entry.timestamp)))
+        columns['labels'].append(label)
+        columns['sources'].append(self._number(source, self.source_names, self.source_numbers, 0))
+        columns['offsets'].append(offset)
+        columns['lengths'].append(length)
+        self.total_length += length
+
+        pending = self.pending
+        frequency = self.frequency
+        for term in set(words):
+            docs = pending.get(term)
+            if docs is None:
+                docs = pending[term] = []
+            docs.append(number)
+            count = frequency.get(term)
+            if count is None:
+                insort(self.vocabulary, term)
+                frequency[term] = 1
+            else:
+                frequency[term] = count + 1
+
+    def add(self, entry, source, offset, end_offset):
+        """Index an entry just written to source."""
+        with self._lock:
+            self._add(entry, source, offset)
+            self.watermark[source] = end_offset
+            self._dirty = True
+
+    def _write_pending(self, count):
+        """Write the unsaved postings as segments of at most MAX_SEGMENT_ENTRIES entries."""
+        for first in range(self._saved_count, count, MAX_SEGMENT_ENTRIES):
+            end = min(count, first + MAX_SEGMENT_ENTRIES)
+            postings = {}
+            for term, docs in self.pending.items():
+                part = docs[bisect_left(docs, first):bisect_left(docs, end)]
+                if part:
+                    postings[term] = part
+            name = segment_filename(self._next_segment)
+            self._next_segment += 1
+            write_segment(self._path(name), postings)
+            self.segments.append(_Segment(self._path(name), first, end))
+        self.pending = {}
+
+    def _save(self):
+        """Write new postings and append the columns, then replace meta.json."""
+        if not self._dirty:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        count = len(self.columns['timestamps'])
+        if count > self._saved_count:
+            self._write_pending(count)
+            for name, values in self.columns.items():
+                with open(self._path(f'{name}.bin'), 'ab' if self._saved_count else 'wb') as f:
+                    values[self._saved_count:].tofile(f)
+            self._saved_count = count
+        tmp_path = self._path(META_FILENAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SEARCH_VERSION, 'count': count,
+                       'labels': self.label_names, 'sources': self.source_names,
+                       'watermark': self.watermark, 'next_segment': self._next_segment,
+                       'segments': [[segment.name, segment.first, segment.end]
+                                    for segment in self.segments]}, f)
+        os.replace(tmp_path, self._path(META_FILENAME))
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._start_compaction()
+
+    def flush(self, fsync=False):
+        """Save at most every SAVE_INTERVAL seconds; the watermark covers the rest."""
+        with self._lock:
+            if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+                self._save()
+
+    def close(self):
+        """Save anything unsaved and wait for a running merge."""
+        with self._lock:
+            self._closing = True
+            self._save()
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join(10)
+        with self._lock:
+            for segment in self.segments:
+                segment.close()
+            if self._queries is not None:
+                self._queries.close()
+                self._queries = None
+
+    # --------------------------------------------------------------- compaction
+
+    def _start_compaction(self):
+        """Merge the newest segments in the background once too many fit in one.
+
+        The caller holds the lock. Only a run of segments that together stay
+        within MAX_SEGMENT_ENTRIES is merged, so full segments are never
+        rewritten again.
+        """
+        if self._closing or (self._compactor is not None and self._compactor.is_alive()):
+            return
+        run = 0
+        entries = 0
+        for segment in reversed(self.segments):
+            entries += segment.end - segment.first
+            if entries > MAX_SEGMENT_ENTRIES:
+                break
+            run += 1
+        if run <= MAX_SEGMENTS:
+            return
+        merging = self.segments[-run:]
+        name = segment_filename(self._next_segment)
+        self._next_segment += 1
+        self._compactor = threading.Thread(target=self._compact, args=(merging, name),
+                                           name='urge-search-compactor', daemon=True)
+        self._compactor.start()
+
+    def _compact(self, merging, name):
+        """Merge consecutive segments into one and swap it in."""
+        try:
+            merged = {}
+            # Segments hold ascending entry ranges, so appending keeps postings sorted
+            for segment in merging:
+                for term, docs in segment.iter_postings():
+                    found = merged.get(term)
+                    if found is None:
+                        merged[term] = docs
+                    else:
+                        found.extend(docs)
+            write_segment(self._path(name), merged)
+            replacement = _Segment(self._path(name), merging[0].first, merging[-1].end)
+            with self._lock:
+                first = self.segments.index(merging[0])
+                self.segments[first:first + len(merging)] = [replacement]
+                self._dirty = True
+                # Saving may start the next merge if segments piled up meanwhile
+                self._compactor = None
+                self._save()
+                for segment in merging:
+                    segment.close()
+                    os.unlink(segment.path)
+        except Exception as e:
+            logging.getLogger('urge').error(f"Error merging search segments: {str(e)}")
+
+    # ------------------------------------------------------------------ queries
+
+    def _expand(self, word):
+        """Return the most frequent indexed words starting with word."""
+        vocabulary = self.vocabulary
+        lo = bisect_left(vocabulary, word)
+        hi = bisect_left(vocabulary, word + '\uffff', lo)
+        terms = vocabulary[lo:hi]
+        if len(terms) > MAX_EXPANSIONS:
+            terms = heapq.nlargest(MAX_EXPANSIONS, terms, key=self.frequency.__getitem__)
+        return terms
+
+    def _postings(self, segment, terms, lo, hi):
+        """Return the ascending entries in [lo, hi) of a segment (None: unsaved) with any term."""
+        lists = []
+        for term in terms:
+            docs = segment.postings(term) if segment is not None else self.pending.get(term)
+            if docs:
+                lists.append(docs[bisect_left(docs, lo):bisect_left(docs, hi)])
+        if len(lists) <= 1:
+            return lists[0] if lists else []
+        return sorted(set().union(*lists))
+
+    def search(self, query, label=None, start=None, end=None, limit=20, prefix=False,
+               timeout=2.0):
+        """Return up to limit SearchHits for entries containing every word of query.
+
+        label is a label id; start and end bound the entry time in epoch
+        seconds. Hits are ranked by BM25 plus a bonus for recent entries.
+        Entries are visited newest first and the scan stops once no older
+        entry could still make the list, which assumes entries are written
+        roughly in time order, as HistoryIndex does. Returns [] while the
+        index is still loading after timeout seconds.
+        """
+        words = parse_query(query, prefix)
+        if not words or not self._ready.wait(timeout):
+            return []
+        with self._lock:
+            timestamps = self.columns['timestamps']
+            total = len(timestamps)
+            label_number = None
+            if label is not None:
+                label_number = self.label_numbers.get(label)
+                if label_number is None:
+                    return []
+            lo = bisect_left(timestamps, math.floor(start)) if start is not None else 0
+            hi = bisect_left(timestamps, math.ceil(end)) if end is not None else total
+
+            groups = []
+            idf = 0.0
+            for word, is_prefix in words:
+                terms = self._expand(word) if is_prefix else \
+                    [word] if word in self.frequency else []
+                if not terms:
+                    return []
+                matching = min(total, sum(self.frequency[term] for term in terms))
+                idf += math.log(1.0 + (total - matching + 0.5) / (matching + 0.5))
+                groups.append((matching, terms))
+            # Intersect starting from the rarest word
+            groups.sort()
+
+            average = (self.total_length / total if total else 1.0) or 1.0
+            norm = [idf * (K1 + 1.0) / (1.0 + K1 * (1.0 - B + B * length / average))
+                    for length in range(256)]
+            # An entry matching every word has at least that many words
+            best = norm[len(groups)]
+            labels, lengths = self.columns['labels'], self.columns['lengths']
+            now = time.time()
+            decay = math.log(2.0) / RECENCY_HALF_LIFE
+            top = []
+            partitions = [(segment.first, segment.end, segment) for segment in self.segments]
+            partitions.append((self._saved_count, total, None))
+            for first, last, segment in reversed(partitions):
+                first, last = max(first, lo), min(last, hi)
+                if first >= last:
+                    continue
+                newest = RECENCY_WEIGHT * math.exp(min(0.0, timestamps[last - 1] - now) * decay)
+                if len(top) == limit and best + newest <= top[0][0]:
+                    break
+                candidates = self._postings(segment, groups[0][1], first, last)
+                if candidates and len(groups) > 1:
+                    common = set(candidates)
+                    for _, terms in groups[1:]:
+                        common.intersection_update(self._postings(segment, terms, first, last))
+                        if not common:
+                            break
+                    candidates = sorted(common)
+                for number in reversed(candidates):
+                    stamp = timestamps[number]
+                    if (start is not None and stamp < start) or (end is not None and stamp >= end):
+                        continue
+                    if label_number is not None and labels[number] != label_number:
+                        continue
+                    recency = RECENCY_WEIGHT * math.exp((stamp - now) * decay)
+                    score = norm[lengths[number]] + recency
+                    if len(top) < limit:
+                        heapq.heappush(top, (score, number))
+                    elif score > top[0][0]:
+                        heapq.heapreplace(top, (score, number))
+                    elif best + recency <= top[0][0]:
+                        break
+            top.sort(reverse=True)
+            located = [(score, timestamps[number],
+                        self.label_names[labels[number] - 1] if labels[number] else None,
+                        self.source_names[self.columns['sources'][number]],
+                        self.columns['offsets'][number])
+                       for score, number in top]
+        return self._read_hits(located)
+
+    def _open_source(self, source):
+        """Open the log file an entry was written to, or return None."""
+        if source.endswith(EVENTS_SUFFIX):
+            from src.storage.backends import EVENTS_DIRNAME
+            path = os.path.join(self.logs_dir, EVENTS_DIRNAME, source)
+            return open(path, 'rb') if os.path.exists(path) else None
+        from src.storage.backends import SQLITE_FILENAME
+        if source == SQLITE_FILENAME:
+            return self._entry_queries()
+        path = find_input_log(self.logs_dir, day_of_source(source))
+        return open_log(path) if path else None
+
+    def _entry_queries(self):
+        """Return the shared read-only connection to the entries database, or None."""
+        from src.storage.backends import SQLITE_FILENAME
+        with self._lock:
+            if self._queries is None:
+                path = os.path.join(self.logs_dir, SQLITE_FILENAME)
+                if not os.path.exists(path):
+                    return None
+                from src.storage.sqlitestore import EntryQueries
+                self._queries = EntryQueries(path)
+            return self._queries
+
+    def _read_hits(self, located):
+        """Read the texts of located hits from the logs, opening each file once."""
+        from src.storage.backends import SQLITE_FILENAME
+        files = {}
+        hits = []
+        try:
+            for score, timestamp, label, source, offset in located:
+                if source not in files:
+                    files[source] = self._open_source(source)
+                f = files[source]
+                if f is None:
+                    continue
+                if source.endswith(EVENTS_SUFFIX):
+                    event = read_event(f, offset)
+                    text = event.text.decode('utf-8', errors='replace') if event else None
+                elif source == SQLITE_FILENAME:
+                    entry = f.get(offset)
+                    text = entry.text if entry else None
+                else:
+                    f.seek(offset)
+                    entry = parse_line(f.readline().decode('utf-8', errors='replace'), False)
+                    text = entry.text if entry else None
+                # A line still in the writer's buffer is skipped until it is flushed
+                if text is not None:
+                    hits.append(SearchHit(score, Entry(float(timestamp), label, text)))
+        finally:
+            # The database connection is kept for the next search
+            for source, f in files.items():
+                if f is not None and source != SQLITE_FILENAME:
+                    f.close()
+        return hits
+
+    def __len__(self):
+        with self._lock:
+            return len(self.columns['timestamps'])
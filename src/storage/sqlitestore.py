@@ -0,0 +1,369 @@
+"""SQLite storage backend.
+
+Entries live in one table of a database in WAL mode, so readers (search
+hits, suggestions, the command line) never block the writer or each other.
+The writer thread inserts every batch inside a transaction that the next
+flush commits, so the flush interval groups many entries into one commit;
+a crash loses at most the uncommitted entries and never the file.
+
+Every entry has a stable integer id in write order, which observers are
+given as its offset. Indexes on (timestamp) and (label, timestamp) also
+carry the id, so counts and id lookups by time or label never touch the
+table itself. On first open the existing daily inputs logs are imported,
+one log per transaction, so an interrupted import resumes where it stopped.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.request import pathname2url
+
+from src.storage.textlog import (
+    Entry, ObserverGroup, StaleWatermark, in_order, inputs_filename, iter_log_rows,
+    list_input_logs
+)
+
+SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    label TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_time ON entries (timestamp);
+CREATE INDEX IF NOT EXISTS entries_by_label ON entries (label, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+# Meta keys: the schema version and how far the text log import got
+_SCHEMA_KEY = 'schema'
+_MIGRATED_KEY = 'migrated'
+_MIGRATION_DONE = 'complete'
+
+_INSERT = "INSERT INTO entries (id, timestamp, label, text) VALUES (?, ?, ?, ?)"
+_IMPORT = "INSERT INTO entries (timestamp, label, text) VALUES (?, ?, ?)"
+_SINCE = "SELECT id, timestamp, label, text FROM entries WHERE id >= ? ORDER BY id"
+_GET_META = "SELECT value FROM meta WHERE key = ?"
+_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+
+
+def _to_epoch(value):
+    """Accept epoch seconds or a datetime and return epoch seconds."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _get_meta(conn, key):
+    """Return a meta value, or None."""
+    row = conn.execute(_GET_META, (key,)).fetchone()
+    return row[0] if row else None
+
+
+def connect(path):
+    """Open the database for writing, creating the schema if needed."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Transactions are begun and committed explicitly
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL only syncs at checkpoints and never corrupts the file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    version = _get_meta(conn, _SCHEMA_KEY)
+    if version is None:
+        conn.execute(_SET_META, (_SCHEMA_KEY, str(SCHEMA_VERSION)))
+    elif int(version) != SCHEMA_VERSION:
+        conn.close()
+        raise ValueError(f"Unsupported entries database schema: {version}")
+    return conn
+
+
+def migrate_text_logs(conn, logs_dir):
+    """Import the daily inputs logs into the database once; return the entries imported.
+
+    Each log is streamed in its own transaction, which also records the log
+    as done, so a crash never imports a log twice.
+    """
+    done = _get_meta(conn, _MIGRATED_KEY)
+    if done == _MIGRATION_DONE:
+        return 0
+    imported = 0
+    for day, path in list_input_logs(logs_dir):
+        source = inputs_filename(day)
+        if done is not None and source <= done:
+            continue
+        before = conn.total_changes
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(_IMPORT, iter_log_rows(path))
+            imported += conn.total_changes - before
+            conn.execute(_SET_META, (_MIGRATED_KEY, source))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    conn.execute(_SET_META, (_MIGRATED_KEY, _MIGRATION_DONE))
+    return imported
+
+
+class SqliteStore:
+    """Writes entries to the SQLite database from the writer thread.
+
+    Observers are notified like those of TextLogStore, with the database
+    file name as the source and the entry id as the offset.
+    """
+
+    def __init__(self, path, logs_dir=None, observers=()):
+        """Initialize the store; the database is opened on the writer thread.
+
+        When logs_dir is given its inputs logs are imported on first open.
+        """
+        self.path = path
+        self.logs_dir = logs_dir
+        self.observers = ObserverGroup(observers)
+        self.source = os.path.basename(path)
+        self._conn = None
+        self._next_id = 1
+        # Newest timestamp in the database, known once it is open
+        self.last_timestamp = None
+        self._in_transaction = False
+        self._fsync = None
+
+    def _connect(self):
+        """Return the writer connection, opening it on first use."""
+        if self._conn is None:
+            self._conn = connect(self.path)
+            if self.logs_dir is not None:
+                migrate_text_logs(self._conn, self.logs_dir)
+            self._read_position()
+        return self._conn
+
+    def _read_position(self):
+        """Read the next free id and the newest timestamp from the database."""
+        self._next_id, self.last_timestamp = self._conn.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1, MAX(timestamp) FROM entries").fetchone()
+
+    def open(self):
+        """Open the database, import the text logs once and let observers load."""
+        self._connect()
+        self.observers.load(self)
+
+    def write(self, entries):
+        """Insert a batch of entries into the open transaction.
+
+        Entries are kept in time order like those of TextLogStore. A batch
+        that fails to insert is undone as a whole and the error raised; the
+        batches before it stay in the transaction.
+        """
+        conn = self._connect()
+        ordered = []
+        last = self.last_timestamp
+        for entry in entries:
+            entry = in_order(entry, last)
+            last = entry.timestamp
+            ordered.append(entry)
+        entries = ordered
+        if not self._in_transaction:
+            conn.execute("BEGIN")
+            self._in_transaction = True
+        first = self._next_id
+        conn.execute("SAVEPOINT batch")
+        try:
+            conn.executemany(_INSERT, [(first + i, entry.timestamp, entry.label or None,
+                                        entry.text) for i, entry in enumerate(entries)])
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK TO batch")
+                conn.execute("RELEASE batch")
+            else:
+                # SQLite rolled back the whole transaction (a full disk, say),
+                # taking earlier batches the observers were already told about
+                self._in_transaction = False
+                self._read_position()
+                self.observers.reload()
+            raise
+        conn.execute("RELEASE batch")
+        self._next_id += len(entries)
+        self.last_timestamp = last
+        for entry_id, entry in enumerate(entries, first):
+            self.observers.add(entry, self.source, entry_id, entry_id + 1)
+
+    def flush(self, fsync=False):
+        """Commit the open transaction; with fsync the commit waits for the disk."""
+        if self._in_transaction:
+            self._conn.execute("COMMIT")
+            self._in_transaction = False
+        if self._conn is not None and fsync != self._fsync:
+            # NORMAL keeps the database consistent after a power loss but may
+            # drop the last commits; FULL syncs the WAL on every commit
+            self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+            self._fsync = fsync
+        self.observers.flush(self, fsync)
+
+    def close(self):
+        """Commit and close the database."""
+        if self._conn is not None:
+            if self._in_transaction:
+                self._conn.execute("COMMIT")
+                self._in_transaction = False
+            self._conn.close()
+            self._conn = None
+        self.observers.close()
+
+    def iter_since(self, watermark):
+        """Yield (entry, source, id, id + 1) for entries past a watermark.
+
+        A watermark that names other sources was taken over another backend's
+        files, so it is stale here as a whole.
+        """
+        for source in watermark:
+            if source != self.source:
+                raise StaleWatermark(source)
+        conn = self._connect()
+        start = watermark.get(self.source, 0)
+        if start > self._next_id:
+            raise StaleWatermark(self.source)
+        for entry_id, timestamp, label, text in conn.execute(_SINCE, (start,)):
+            yield Entry(timestamp, label, text), self.source, entry_id, entry_id + 1
+
+    def reader(self):
+        """Return a read-only query API over everything committed so far."""
+        return EntryQueries(self.path)
+
+
+class EntryQueries:
+    """Read-only queries over the database on one reused connection.
+
+    Each query is a fixed SQL string, so sqlite3 prepares it once and reuses
+    the statement from the connection's cache on every later call.
+    """
+
+    def __init__(self, path):
+        """Open the database read-only."""
+        self._conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro",
+                                     uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _all(self, sql, params):
+        """Run a query and return every row."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def count(self, start, end, label=None):
+        """Return how many entries fall in [start, end), optionally for one label."""
+        if label is None:
+            sql = "SELECT COUNT(*) FROM entries WHERE timestamp >= ? AND timestamp < ?"
+            params = (_to_epoch(start), _to_epoch(end))
+        else:
+            sql = ("SELECT COUNT(*) FROM entries "
+                   "WHERE label = ? AND timestamp >= ? AND timestamp < ?")
+            params = (label, _to_epoch(start), _to_epoch(end))
+        return self._all(sql, params)[0][0]
+
+    def label_counts(self, start, end):
+        """Return {label: count} for the entries in [start, end); None is no label."""
+        rows = self._all("SELECT label, COUNT(*) FROM entries "
+                         "WHERE timestamp >= ? AND timestamp < ? GROUP BY label",
+                         (_to_epoch(start), _to_epoch(end)))
+        return dict(rows)
+
+    def query(self, start, end, label=None, limit=-1):
+        """Return the entries in [start, end) oldest first, optionally for one label."""
+        if label is None:
+            sql = ("SELECT timestamp, label, text FROM entries "
+                   "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id LIMIT ?")
+            params = (_to_epoch(start), _to_epoch(end), limit)
+        else:
+            sql = ("SELECT timestamp, label, text FROM entries "
+                   "WHERE label = ? AND timestamp >= ? AND timestamp < ? "
+                   "ORDER BY timestamp, id LIMIT ?")
+            params = (label, _to_epoch(start), _to_epoch(end), limit)
+        return [Entry(*row) for row in self._all(sql, params)]
+
+    def get(self, entry_id):
+        """Return the entry with an id, or None."""
+        rows = self._all("SELECT timestamp, label, text FROM entries WHERE id = ?", (entry_id,))
+        return Entry(*rows[0]) if rows else None
+
+    def bucket_counts(self, seconds):
+        """Return [(bucket, label, count)] with entries, bucket being timestamp // seconds."""
+        return self._all("SELECT CAST(timestamp / ? AS INTEGER), label, COUNT(*) "
+                         "FROM entries GROUP BY 1, 2", (seconds,))
+
+    def iter_entries(self, chunk_size=4096):
+        """Yield every entry in write order, fetched in chunks."""
+        last = 0
+        while True:
+            rows = self._all("SELECT id, timestamp, label, text FROM entries "
+                             "WHERE id > ? ORDER BY id LIMIT ?", (last, chunk_size))
+            if not rows:
+                return
+            for _, timestamp, label, text in rows:
+                yield Entry(timestamp, label, text)
+            last = rows[-1][0]
+
+    def __len__(self):
+        return self._all("SELECT COUNT(*) FROM entries", ())[0][0]
+
+    def close(self):
+        """Close the connection."""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD[ HH:MM] command line argument."""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Invalid date: {value}")
+
+
+def main():
+    """Command line entry point: import the text logs or query the database."""
+    from src.storage.backends import SQLITE_FILENAME, default_logs_dir
+
+    parser = argparse.ArgumentParser(description="Urge entries database")
+    parser.add_argument('--logs-dir', default=default_logs_dir())
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help="import the daily inputs logs")
+    query = commands.add_parser('query', help="count or list entries in a time range")
+    query.add_argument('start', type=_parse_date)
+    query.add_argument('end', type=_parse_date)
+    query.add_argument('--label')
+    query.add_argument('--list', action='store_true', help="print the entries")
+    args = parser.parse_args()
+
+    path = os.path.join(args.logs_dir, SQLITE_FILENAME)
+    if args.command == 'migrate':
+        started = time.perf_counter()
+        conn = connect(path)
+        try:
+            imported = migrate_text_logs(conn, args.logs_dir)
+        finally:
+            conn.close()
+        print(f"Imported {imported} entries in {time.perf_counter() - started:.2f} s")
+        return
+    with EntryQueries(path) as queries:
+        if args.list:
+            for entry in queries.query(args.start, args.end, args.label):
+                stamp = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+                print(f"{stamp}\t{entry.label or ''}\t{entry.text}")
+        else:
+            print(queries.count(args.start, args.end, args.label))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+from src.storage.textlog import iter_log_entries
+
+# Distinct texts kept per label; the least used are evicted beyond this
+MAX_ENTRIES = 2000
+# Texts longer than this are never suggested
+MAX_TEXT_LENGTH = 200
+# Ranked completions cached per prefix, and prefixes cached per label
+CACHED_RESULTS = 10
+MAX_CACHED_PREFIXES = 4096
+# Prefix ranges up to this size are ranked directly instead of cached
+SMALL_RANGE = 64
+# Entries indexed per lock hold while loading, so lookups never wait long
+LOAD_CHUNK = 256
+
+
+class _PrefixTable:
+    """Past texts of one label in a sorted array, ranked by use within a prefix range."""
+
+    def __init__(self, max_entries):
+        """Initialize an empty table."""
+        self.max_entries = max_entries
+        # lowercased text -> [latest text, count, sequence number of last use]
+        self.entries = {}
+        self.keys = []
+        self.cache = {}
+
+    def add(self, text, sequence):
+        """Count one use of a text."""
+        key = text.lower()
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [text, 1, sequence]
+            insort(self.keys, key)
+        else:
+            entry[0] = text
+            entry[1] += 1
+            entry[2] = sequence
+        # Only rankings under a prefix of this text can change
+        cache = self.cache
+        for end in range(1, len(key) + 1):
+            cache.pop(key[:end], None)
+        if len(self.entries) > self.max_entries:
+            self._evict(key)
+
+    def _evict(self, newest):
+        """Drop the least used texts down to 90% of the limit, keeping the newest."""
+        keep = int(self.max_entries * 0.9)
+        newest_entry = self.entries.pop(newest)
+        ranked = heapq.nlargest(keep - 1, self.entries.items(),
+                                key=lambda item: (item[1][1], item[1][2]))
+        self.entries = dict(ranked)
+        self.entries[newest] = newest_entry
+        self.keys = sorted(self.entries)
+        self.cache = {}
+
+    def _ranked(self, prefix):
+        """Return the keys under a prefix, most used first."""
+        cached = self.cache.get(prefix)
+        if cached is not None:
+            return cached
+        keys = self.keys
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + '\uffff', lo)
+        entries = self.entries
+        rank = lambda key: (entries[key][1], entries[key][2])
+        if hi - lo <= SMALL_RANGE:
+            return sorted(keys[lo:hi], key=rank, reverse=True)[:CACHED_RESULTS]
+        ranked = heapq.nlargest(CACHED_RESULTS, keys[lo:hi], key=rank)
+        if len(self.cache) >= MAX_CACHED_PREFIXES:
+            self.cache.clear()
+        self.cache[prefix] = ranked
+        return ranked
+
+    def suggest(self, prefix, limit):
+        """Return up to limit texts starting with prefix (case-insensitive), most used first."""
+        prefix = prefix.lower()
+        return [self.entries[key][0] for key in self._ranked(prefix)
+                if key != prefix][:limit]
+
+
+class SuggestionIndex:
+    """Per-label autocomplete over every text entered so far.
+
+    Attached to the input store as an observer, so each written entry is
+    added incrementally. Past history is only read on the first lookup, on
+    a background thread. Until that finishes, suggestions come from what
+    has been indexed so far. An entry written while the history is being
+    read may be counted twice, which only nudges its rank.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        """Initialize an empty index."""
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._sequence = 0
+        self._store = None
+        self._loading = None
+        self.loaded = threading.Event()
+
+    def load(self, store):
+        """Remember the store; its history is read on first use."""
+        self._store = store
+
+    def _history(self):
+        """Yield every stored entry without touching the writer's state."""
+        store = self._store
+        if hasattr(store, 'reader'):
+            # The binary and SQLite stores are read through their own readers
+            with store.reader() as reader:
+                yield from reader.iter_entries()
+        else:
+            # Only label and text matter here, so timestamps are not parsed
+            yield from iter_log_entries(store.logs_dir, timestamps=False)
+
+    def _load_history(self):
+        """Index the stored history in small locked chunks."""
+        try:
+            chunk = []
+            for entry in self._history():
+                chunk.append(entry)
+                if len(chunk) >= LOAD_CHUNK:
+                    self._add_all(chunk)
+                    chunk = []
+            self._add_all(chunk)
+        finally:
+            self.loaded.set()
+
+    def _add_all(self, entries):
+        """Index a list of entries under one lock hold."""
+        with self._lock:
+            for entry in entries:
+                self._add(entry)
+
+    def _add(self, entry):
+        """Index one entry; the caller holds the lock."""
+        text = entry.text.strip()
+        if not text or len(text) > MAX_TEXT_LENGTH:
+            return
+        table = self._tables.get(entry.label)
+        if table is None:
+            table = self._tables[entry.label] = _PrefixTable(self.max_entries)
+        self._sequence += 1
+        table.add(text, self._sequence)
+
+    def add(self, entry, source=None, offset=None, end_offset=None):
+        """Index a newly written entry once the history is being loaded."""
+        if self._loading is None:
+            # The history read on first use will include it once flushed
+            return
+        with self._lock:
+            self._add(entry)
+
+    def flush(self, fsync=False):
+        """Nothing to persist; the index is rebuilt from the history."""
+
+    def close(self):
+        """Nothing to persist; the index is rebuilt from the history."""
+
+    def start_loading(self):
+        """Begin reading the history in the background, once."""
+        with self._lock:
+            if self._loading is not None or self._store is None:
+                return
+            self._loading = threading.Thread(target=self._load_history,
+                                             name='urge-suggestions', daemon=True)
+        self._loading.start()
+
+    def suggest(self, label, prefix, limit=5):
+        """Return up to limit past texts for a label that start with prefix."""
+        if self._loading is None:
+            self.start_loading()
+        if not prefix.strip():
+            return []
+        with self._lock:
+            table = self._tables.get(label)
+            return table.suggest(prefix, limit) if table is not None else []
@@ -0,0 +1,435 @@
+"""Merging the entry history of several machines.
+
+Every machine keeps its own daily inputs logs. A sync target holds the
+merged history in the same layout: a directory (a USB stick or a folder
+shared by other means) or a small HTTP server in front of one, started with
+    python -m src.storage.sync serve DIR
+
+Each side lists an entry count and an order-independent checksum per day,
+cached by file size and modification time, so comparing a year of unchanged
+history only stats the logs and nothing is read or transferred. A day that
+differs is rebuilt by a k-way merge of the time-sorted logs of every side
+that has a distinct version of it, holding one line per side in memory, and
+written back wherever it differs.
+
+An entry is identified by a hash of its log line. An entry found on several
+sides is kept once; one logged twice within the same second on a machine
+is kept twice, as often as the side that has it most.
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import ExitStack
+from functools import partial
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import groupby
+from operator import itemgetter
+from urllib.request import Request, urlopen
+
+from src.storage.archive import log_size, open_log, replace_log
+from src.storage.index import INDEX_DIRNAME
+from src.storage.pyramid import PYRAMID_DIRNAME
+from src.storage.risk import RISK_FILENAME
+from src.storage.rollups import ROLLUPS_FILENAME
+from src.storage.search import SEARCH_DIRNAME
+from src.storage.textlog import find_input_log, inputs_filename, list_input_logs
+from src.utils.write_behind import atomic_write
+
+MANIFEST_FILENAME = 'sync_manifest.json'
+MANIFEST_VERSION = 1
+DEFAULT_PORT = 8765
+# Timestamp width and the marker that follows it on a well-formed line
+_STAMP_WIDTH = 19
+_MARKER = b' - Input: '
+_DIGEST_MASK = (1 << 64) - 1
+
+# Days compared, days that differed, days rewritten locally and on targets,
+# and entries added to the local history
+SyncResult = namedtuple('SyncResult', ['days', 'merged', 'pulled', 'pushed', 'added'])
+
+
+def entry_id(line):
+    """Return the stable 64-bit id of an inputs log line."""
+    return int.from_bytes(hashlib.blake2b(line, digest_size=8).digest(), 'big')
+
+
+def _entry_lines(lines):
+    """Yield the complete, well-formed entry lines of a day's log."""
+    marker_end = _STAMP_WIDTH + len(_MARKER)
+    for raw in lines:
+        if raw.endswith(b'\n') and raw[_STAMP_WIDTH:marker_end] == _MARKER:
+            yield raw
+
+
+def _digest(count, total):
+    """Return the [count, checksum] pair compared between sides."""
+    return [count, format(total & _DIGEST_MASK, '016x')]
+
+
+def day_digest(lines):
+    """Return [count, checksum] of a day's entry lines, whatever their order."""
+    count = total = 0
+    for raw in _entry_lines(lines):
+        total += entry_id(raw)
+        count += 1
+    return _digest(count, total)
+
+
+class Manifest:
+    """Per-day digests of a directory of inputs logs, cached in the directory."""
+
+    def __init__(self, logs_dir):
+        """Initialize the manifest; nothing is read until days()."""
+        self.logs_dir = logs_dir
+        self.path = os.path.join(logs_dir, MANIFEST_FILENAME)
+        # day -> [file name, size, mtime_ns, count, checksum]
+        self._rows = {}
+        self._dirty = False
+
+    def _load(self):
+        """Return the cached rows, or nothing if the cache is missing or outdated."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('version') == MANIFEST_VERSION:
+                return saved['days']
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+        return {}
+
+    def days(self):
+        """Return {day: [count, checksum]} for every day with entries.
+
+        Only logs whose size or modification time changed since the cache
+        was written are read.
+        """
+        cached = self._load()
+        self._rows = {}
+        for day, path in list_input_logs(self.logs_dir):
+            stat = os.stat(path)
+            key = [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+            row = cached.get(day)
+            if row is None or row[:3] != key:
+                with open_log(path) as f:
+                    row = key + day_digest(f)
+            self._rows[day] = row
+        self._dirty = self._rows != cached
+        self.save()
+        return {day: row[3:] for day, row in self._rows.items() if row[3]}
+
+    def record(self, day, path, digest):
+        """Remember the digest of a day's log just written to path."""
+        stat = os.stat(path)
+        self._rows[day] = [os.path.basename(path), stat.st_size, stat.st_mtime_ns] + digest
+        self._dirty = True
+
+    def save(self):
+        """Write the cache if it changed."""
+        if self._dirty:
+            os.makedirs(self.logs_dir, exist_ok=True)
+            atomic_write(self.path, json.dumps({'version': MANIFEST_VERSION,
+                                                'days': self._rows}).encode('utf-8'))
+            self._dirty = False
+
+
+class _Unsorted(Exception):
+    """Raised when a day's log is not in time order."""
+
+
+def _sorted_lines(side, lines):
+    """Yield (timestamp, side, line) for each entry line; raise _Unsorted if time goes back."""
+    previous = b''
+    for raw in _entry_lines(lines):
+        stamp = raw[:_STAMP_WIDTH]
+        if stamp < previous:
+            raise _Unsorted()
+        previous = stamp
+        yield stamp, side, raw
+
+
+def _merge(sources, out, presorted):
+    """Merge the day logs opened by sources into out; return the merged digest."""
+    count = total = 0
+    with ExitStack() as stack:
+        files = [stack.enter_context(source()) for source in sources]
+        if presorted:
+            streams = [_sorted_lines(side, f) for side, f in enumerate(files)]
+        else:
+            # Lines logged with an explicit past timestamp can be out of order;
+            # a day is small enough to sort in memory
+            streams = [sorted(((raw[:_STAMP_WIDTH], side, raw) for raw in _entry_lines(f)),
+                              key=itemgetter(0)) for side, f in enumerate(files)]
+        merged = heapq.merge(*streams, key=itemgetter(0))
+        for _, group in groupby(merged, key=itemgetter(0)):
+            # line -> {side: occurrences} for the lines sharing this second
+            seen = {}
+            for _, side, raw in group:
+                sides = seen.setdefault(raw, {})
+                sides[side] = sides.get(side, 0) + 1
+            for raw in sorted(seen):
+                times = max(seen[raw].values())
+                out.write(raw * times)
+                count += times
+                total += entry_id(raw) * times
+    return _digest(count, total)
+
+
+def merge_day(sources, out):
+    """Write the k-way merge of several versions of a day's log to out.
+
+    sources are callables that open one version each as a binary file.
+    Lines sharing a second are written in a fixed order, so every side
+    ends up with the same bytes. Returns [count, checksum] of the result.
+    """
+    try:
+        return _merge(sources, out, presorted=True)
+    except _Unsorted:
+        out.seek(0)
+        out.truncate()
+        return _merge(sources, out, presorted=False)
+
+
+class DirectoryTarget:
+    """Daily inputs logs in a directory: the local logs or a shared copy."""
+
+    def __init__(self, path):
+        """Initialize the target; the directory is created on the first write."""
+        self.path = path
+        self._manifest = Manifest(path)
+
+    def manifest(self):
+        """Return {day: [count, checksum]} for every day with entries."""
+        return self._manifest.days()
+
+    def open_day(self, day):
+        """Open a day's log for reading."""
+        path = find_input_log(self.path, day)
+        if path is None:
+            raise FileNotFoundError(inputs_filename(day))
+        return open_log(path)
+
+    def write_day(self, day, lines):
+        """Atomically replace a day's log with the given lines; return its digest."""
+        os.makedirs(self.path, exist_ok=True)
+        target = os.path.join(self.path, inputs_filename(day))
+        tmp_path = f"{target}.{os.getpid()}.sync"
+        count = total = 0
+        with open(tmp_path, 'wb') as out:
+            for raw in _entry_lines(lines):
+                out.write(raw)
+                total += entry_id(raw)
+                count += 1
+            out.flush()
+            os.fsync(out.fileno())
+        # The merged day includes whatever was archived, so the archive goes
+        replace_log(tmp_path, target)
+        digest = _digest(count, total)
+        self._manifest.record(day, target, digest)
+        return digest
+
+    def close(self):
+        """Save the cached digests."""
+        self._manifest.save()
+
+
+class HttpTarget:
+    """A directory target behind the server started by serve()."""
+
+    def __init__(self, url, timeout=30.0):
+        """Initialize the target for a base URL such as http://127.0.0.1:8765."""
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def manifest(self):
+        """Fetch {day: [count, checksum]} from the server."""
+        with urlopen(f"{self.url}/manifest", timeout=self.timeout) as response:
+            return json.load(response)
+
+    def open_day(self, day):
+        """Stream a day's log from the server."""
+        return urlopen(f"{self.url}/days/{day}", timeout=self.timeout)
+
+    def write_day(self, day, f):
+        """Upload a day's log from a seekable binary file."""
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        request = Request(f"{self.url}/days/{day}", data=f, method='PUT',
+                          headers={'Content-Length': str(size),
+                                   'Content-Type': 'text/plain; charset=utf-8'})
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def close(self):
+        """Nothing to release; the server saves its own digests."""
+
+
+def open_target(spec):
+    """Return the target for a directory path or an http:// URL."""
+    if spec.startswith(('http://', 'https://')):
+        return HttpTarget(spec)
+    return DirectoryTarget(os.path.abspath(os.path.expanduser(spec)))
+
+
+def drop_derived(logs_dir):
+    """Remove the indexes and rollups built from the logs; the app rebuilds them on start."""
+    for name in (INDEX_DIRNAME, SEARCH_DIRNAME, PYRAMID_DIRNAME):
+        shutil.rmtree(os.path.join(logs_dir, name), ignore_errors=True)
+    for name in (ROLLUPS_FILENAME, RISK_FILENAME):
+        try:
+            os.unlink(os.path.join(logs_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def sync(logs_dir, targets, pull=True, push=True):
+    """Merge the local history with every target and return a SyncResult.
+
+    With pull unset the local logs are left alone, and with push unset the
+    targets are only read. The app must not be writing to logs_dir while
+    days are pulled.
+    """
+    local = DirectoryTarget(logs_dir)
+    sides = [local] + list(targets)
+    merged = pulled = pushed = added = 0
+    try:
+        manifests = [side.manifest() for side in sides]
+        days = sorted(set().union(*manifests))
+        for day in days:
+            digests = [manifest.get(day) for manifest in manifests]
+            if all(digest == digests[0] for digest in digests):
+                continue
+            if not push and all(digest is None for digest in digests[1:]):
+                # Only this machine has the day, and the targets are not written
+                continue
+            merged += 1
+            # Each distinct version of the day is read once
+            versions = {}
+            for side, digest in zip(sides, digests):
+                if digest is not None:
+                    versions.setdefault(tuple(digest), side)
+            with tempfile.TemporaryFile() as out:
+                result = merge_day([partial(side.open_day, day) for side in versions.values()],
+                                   out)
+                for side, digest in zip(sides, digests):
+                    if digest == result or not (pull if side is local else push):
+                        continue
+                    out.seek(0)
+                    side.write_day(day, out)
+                    if side is local:
+                        pulled += 1
+                        added += result[0] - (digest[0] if digest else 0)
+                    else:
+                        pushed += 1
+    finally:
+        for side in sides:
+            side.close()
+    if pulled:
+        drop_derived(logs_dir)
+    return SyncResult(len(days), merged, pulled, pushed, added)
+
+
+def _body_lines(stream, size):
+    """Yield the lines of a request body of the given size."""
+    while size > 0:
+        raw = stream.readline(size)
+        if not raw:
+            break
+        size -= len(raw)
+        yield raw
+
+
+class _SyncRequestHandler(BaseHTTPRequestHandler):
+    """Serves a DirectoryTarget: GET /manifest, GET and PUT /days/YYYYMMDD."""
+
+    target = None
+
+    def _day(self):
+        """Return the day named by a /days/YYYYMMDD path, or None."""
+        prefix = '/days/'
+        day = self.path[len(prefix):] if self.path.startswith(prefix) else ''
+        return day if len(day) == 8 and day.isdigit() else None
+
+    def _send_json(self, value):
+        """Reply with a JSON document."""
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/manifest':
+            self._send_json(self.target.manifest())
+            return
+        day = self._day()
+        path = find_input_log(self.target.path, day) if day else None
+        if path is None:
+            self.send_error(404)
+            return
+        # The size is fixed up front, so a log growing meanwhile is cut at it
+        size = log_size(path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        with open_log(path) as f:
+            while size > 0:
+                chunk = f.read(min(size, 64 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                size -= len(chunk)
+
+    def do_PUT(self):
+        day = self._day()
+        if day is None:
+            self.send_error(404)
+            return
+        try:
+            size = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self.send_error(411)
+            return
+        digest = self.target.write_day(day, _body_lines(self.rfile, size))
+        self.target.close()
+        self._send_json(digest)
+
+    def log_message(self, format, *args):
+        """Keep request logging off the console."""
+
+
+def serve(directory, host='127.0.0.1', port=DEFAULT_PORT):
+    """Serve a directory as a sync target until interrupted.
+
+    Requests are handled one at a time, so uploads of the same day never race.
+    """
+    handler = type('SyncRequestHandler', (_SyncRequestHandler,),
+                   {'target': DirectoryTarget(os.path.abspath(directory))})
+    with HTTPServer((host, port), handler) as server:
+        print(f"Serving {directory} at http://{host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    """Command line entry point: serve a directory as a sync target."""
+    parser = argparse.ArgumentParser(description="Urge history sync")
+    commands = parser.add_subparsers(dest='command', required=True)
+    server = commands.add_parser('serve', help="serve a directory of logs over HTTP")
+    server.add_argument('directory')
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    serve(args.directory, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+import logging
+import os
+import time
+from collections import namedtuple
+
+from src.storage.archive import ARCHIVE_SUFFIX, discard_merged, log_size, open_log
+
+# A single recorded urge: epoch seconds, label text (or None) and the entry text
+Entry = namedtuple('Entry', ['timestamp', 'label', 'text'])
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+INPUTS_PREFIX = 'inputs_'
+INPUTS_SUFFIX = '.log'
+_INPUT_MARKER = ' - Input: '
+_LABEL_MARKER = ', Label: '
+# How far ahead of this machine's clock a client's timestamp may be
+MAX_CLOCK_SKEW = 300.0
+
+
+def inputs_filename(day):
+    """Return the inputs log file name for a YYYYMMDD day string."""
+    return f"{INPUTS_PREFIX}{day}{INPUTS_SUFFIX}"
+
+
+def format_entry(entry):
+    """Format an entry as a line of the daily inputs log."""
+    timestamp = time.strftime(TIMESTAMP_FORMAT, time.localtime(entry.timestamp))
+    label_info = f", Label: {entry.label}" if entry.label else ""
+    return f"{timestamp} - Input: {entry.text}{label_info}\n"
+
+
+def list_input_logs(logs_dir):
+    """Return (YYYYMMDD day, path) for every daily inputs log, oldest first.
+
+    Finished days may have been compressed into archives, and an archived
+    day may have a plain log again. The plain log is returned whenever there
+    is one, but open_log() and log_size() read a day's archive and plain log
+    together, whichever of the two path names.
+    """
+    try:
+        names = os.listdir(logs_dir)
+    except FileNotFoundError:
+        return []
+    logs = {}
+    for name in names:
+        plain = name[:-len(ARCHIVE_SUFFIX)] if name.endswith(ARCHIVE_SUFFIX) else name
+        day = plain[len(INPUTS_PREFIX):-len(INPUTS_SUFFIX)]
+        if plain.startswith(INPUTS_PREFIX) and plain.endswith(INPUTS_SUFFIX) \
+                and len(day) == 8 and day.isdigit():
+            if day not in logs or name == plain:
+                logs[day] = os.path.join(logs_dir, name)
+    return sorted(logs.items())
+
+
+def find_input_log(logs_dir, day):
+    """Return the path of a day's inputs log or archive, or None; it stands for both."""
+    path = os.path.join(logs_dir, inputs_filename(day))
+    if os.path.exists(path):
+        return path
+    if os.path.exists(path + ARCHIVE_SUFFIX):
+        return path + ARCHIVE_SUFFIX
+    return None
+
+
+def iter_file_lines(path, start=0):
+    """Yield (byte offset, end offset, decoded line) for each complete line from start.
+
+    Offsets are positions in the uncompressed log, also for archives.
+    """
+    with open_log(path) as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                # A partially written last line is picked up on the next pass
+                break
+            yield offset, offset + len(raw), raw.decode('utf-8', errors='replace')
+            offset += len(raw)
+
+
+def iter_log_entries(logs_dir, timestamps=True):
+    """Yield every parseable Entry from the daily inputs logs, oldest first.
+
+    Without timestamps, entries carry None instead of the parsed time, which
+    skips the costliest part of parsing.
+    """
+    for _, path in list_input_logs(logs_dir):
+        for _, _, line in iter_file_lines(path):
+            entry = parse_line(line, timestamps)
+            if entry is not None:
+                yield entry
+
+
+def iter_log_rows(path):
+    """Yield (timestamp, label, text) for every entry line of a daily inputs log.
+
+    The log is read whole and its lines parsed inline like parse_line. Local
+    times are converted once per hour from the digits of the line, and the
+    minutes and seconds added, which avoids the strptime call that otherwise
+    dominates parsing.
+    """
+    with open_log(path) as f:
+        data = f.read()
+    # A partially written last line is left out, as in iter_file_lines
+    data = data[:data.rfind(b'\n') + 1].decode('utf-8', errors='replace')
+    body_start = 19 + len(_INPUT_MARKER)
+    hours = {}
+    for line in data.split('\n'):
+        if line[19:body_start] != _INPUT_MARKER:
+            continue
+        text, sep, label = line[body_start:].rpartition(_LABEL_MARKER)
+        if not sep:
+            text, label = label, None
+        hour = line[:13]
+        base = hours.get(hour)
+        try:
+            if base is None:
+                base = hours[hour] = time.mktime((int(line[0:4]), int(line[5:7]),
+                                                  int(line[8:10]), int(line[11:13]),
+                                                  0, 0, 0, 0, -1))
+            yield base + int(line[14:16]) * 60 + int(line[17:19]), label, text
+        except ValueError:
+            continue
+
+
+def parse_line(line, timestamps=True):
+    """Parse an inputs log line into an Entry, or return None if malformed.
+
+    The text format cannot tell a label apart from text that itself contains
+    ", Label: ", so the last occurrence is taken as the label separator.
+    """
+    line = line.rstrip('\n')
+    if line[19:19 + len(_INPUT_MARKER)] != _INPUT_MARKER:
+        return None
+    timestamp = None
+    if timestamps:
+        try:
+            timestamp = time.mktime(time.strptime(line[:19], TIMESTAMP_FORMAT))
+        except ValueError:
+            return None
+    body = line[19 + len(_INPUT_MARKER):]
+    text, sep, label = body.rpartition(_LABEL_MARKER)
+    if not sep:
+        return Entry(timestamp, None, body)
+    return Entry(timestamp, label, text)
+
+
+def check_timestamp(timestamp, now=None):
+    """Raise ValueError unless timestamp is epoch seconds from 1970 up to shortly after now.
+
+    Milliseconds passed for seconds would otherwise name a log thousands of
+    years ahead and hold every later entry there.
+    """
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)):
+        raise ValueError("'timestamp' must be epoch seconds")
+    latest = (time.time() if now is None else now) + MAX_CLOCK_SKEW
+    # The comparisons also refuse NaN and infinities
+    if not 0 <= timestamp <= latest:
+        raise ValueError(f"Timestamp {timestamp!r} is not epoch seconds up to now")
+
+
+def in_order(entry, last_timestamp):
+    """Return the entry, moved to last_timestamp if it is older."""
+    if last_timestamp is not None and entry.timestamp < last_timestamp:
+        return entry._replace(timestamp=last_timestamp)
+    return entry
+
+
+class StaleWatermark(Exception):
+    """Raised when a log shrank or vanished since a saved watermark."""
+
+
+class ObserverGroup:
+    """The observers of a store, each kept apart from the others' failures.
+
+    An observer whose add() raises has missed an entry, so it is neither told
+    about later entries nor saved. On the next flush, once the store's
+    records are readable, its load() runs again to catch up from its saved
+    watermark; if that fails too it is left out until the app restarts.
+    """
+
+    def __init__(self, observers=()):
+        """Initialize the group."""
+        self.observers = list(observers)
+        self._reload = []
+        self._broken = []
+
+    def __iter__(self):
+        return iter(self.observers)
+
+    def _working(self):
+        """Return the observers that have seen every entry."""
+        return [observer for observer in self.observers
+                if observer not in self._reload and observer not in self._broken]
+
+    def load(self, store):
+        """Let every observer load its state from the store."""
+        for observer in self.observers:
+            observer.load(store)
+
+    def add(self, entry, source, offset, end_offset):
+        """Tell every working observer about an entry the store wrote."""
+        for observer in self._working():
+            try:
+                observer.add(entry, source, offset, end_offset)
+            except Exception as e:
+                logging.getLogger('urge').error(
+                    f"Error adding an entry to {type(observer).__name__}: {str(e)}")
+                self._reload.append(observer)
+
+    def reload(self):
+        """Reload every working observer on the next flush, after the store lost entries."""
+        self._reload.extend(self._working())
+
+    def flush(self, store, fsync=False):
+        """Flush every working observer, then reload those that failed."""
+        for observer in self._working():
+            observer.flush(fsync)
+        while self._reload:
+            observer = self._reload.pop()
+            try:
+                observer.load(store)
+            except Exception as e:
+                logging.getLogger('urge').error(
+                    f"Error reloading {type(observer).__name__}: {str(e)}")
+                self._broken.append(observer)
+
+    def close(self):
+        """Close every working observer; the others keep their last saved state."""
+        for observer in self._working():
+            observer.close()
+
+
+def day_of_source(source):
+    """Return the YYYYMMDD day of an inputs log file name."""
+    return source[len(INPUTS_PREFIX):-len(INPUTS_SUFFIX)]
+
+
+class TextLogStore:
+    """Appends entries to the daily inputs_YYYYMMDD.log text files.
+
+    Observers (the history index, rollups) are told about every entry with
+    add(entry, source, offset, end_offset), where source is the log file name
+    and the offsets locate the line, and are flushed after the lines they
+    describe have been written.
+    """
+
+    def __init__(self, logs_dir, observers=()):
+        """Initialize the store for the given logs directory."""
+        self.logs_dir = logs_dir
+        self.observers = ObserverGroup(observers)
+        self._source = None
+        self._file = None
+        self._offset = 0
+        # Newest timestamp in the logs, known once open() has run
+        self.last_timestamp = None
+
+    def open(self):
+        """Find the newest entry and let observers load their state; runs on the writer thread."""
+        logs = list_input_logs(self.logs_dir)
+        if logs:
+            self.last_timestamp = max((row[0] for row in iter_log_rows(logs[-1][1])),
+                                      default=None)
+        self.observers.load(self)
+
+    def _file_for(self, timestamp):
+        """Return the open file for the day of the given timestamp."""
+        source = inputs_filename(time.strftime("%Y%m%d", time.localtime(timestamp)))
+        if source != self._source:
+            if self._file is not None:
+                self._file.close()
+            path = os.path.join(self.logs_dir, source)
+            discard_merged(path)
+            self._file = open(path, 'ab')
+            # An archived day goes on in a plain log, after the archived offsets
+            self._offset = log_size(path)
+            self._source = source
+        return self._file
+
+    def write(self, entries):
+        """Append a batch of entries.
+
+        Entries are kept in time order for the indexes: one older than the
+        last entry is written at the last entry's time.
+        """
+        for entry in entries:
+            entry = in_order(entry, self.last_timestamp)
+            self.last_timestamp = entry.timestamp
+            f = self._file_for(entry.timestamp)
+            data = format_entry(entry).encode('utf-8')
+            f.write(data)
+            offset = self._offset
+            self._offset += len(data)
+            self.observers.add(entry, self._source, offset, self._offset)
+
+    def flush(self, fsync=False):
+        """Flush buffered lines to the OS, and to disk when fsync is set."""
+        if self._file is not None:
+            self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+        # Observers are only persisted once the lines they point at are written
+        self.observers.flush(self, fsync)
+
+    def close(self):
+        """Flush and close the current day's file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._source = None
+        self.observers.close()
+
+    def iter_since(self, watermark):
+        """Yield (entry, source, offset, end_offset) for lines past a watermark.
+
+        The watermark maps log file names to the byte offset already
+        consumed. Malformed lines are yielded with entry None so the
+        watermark still advances past them.
+        """
+        for day, path in list_input_logs(self.logs_dir):
+            # Archives keep the plain name as their source so watermarks survive compression
+            source = inputs_filename(day)
+            start = watermark.get(source, 0)
+            if log_size(path) < start:
+                raise StaleWatermark(source)
+            for offset, end_offset, line in iter_file_lines(path, start):
+                yield parse_line(line), source, offset, end_offset
@@ -1,4 +1,5 @@
 from .label_window import LabelSelectionWindow
 from .input_window import InputWindow
+from .stats_window import StatsWindow
 
-__all__ = ['LabelSelectionWindow', 'InputWindow']
\ No newline at end of file
+__all__ = ['LabelSelectionWindow', 'InputWindow', 'StatsWindow']
\ No newline at end of file
@@ -0,0 +1,328 @@
+import time
+from datetime import datetime, timezone
+
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QPushButton, QCheckBox, QHBoxLayout, QVBoxLayout, QApplication
+)
+from PyQt5.QtCore import Qt, QTimer, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+
+from src.config import Config
+from src.storage.pyramid import NO_LABEL, local_seconds
+from src.ui import theme
+from src.utils.logger import Logger
+from src.utils.metrics import Metrics
+
+# Line colors, given to labels in the order they are listed
+COLORS = ['#4e79a7', '#f28e2b', '#e15759', '#76b7b2', '#59a14f',
+          '#edc948', '#b07aa1', '#ff9da7', '#9c755f', '#bab0ac']
+# Range buttons: (title, seconds back from now or None for the whole history)
+RANGES = [('Day', 86400), ('Week', 7 * 86400), ('Month', 30 * 86400),
+          ('Year', 365 * 86400), ('All', None)]
+MIN_SPAN = 3600
+MAX_SPAN = 50 * 365 * 86400
+# Range change per wheel notch
+ZOOM_STEP = 1.25
+# Plot margins in pixels: left for the count axis, bottom for the dates
+MARGIN_LEFT = 40
+MARGIN_BOTTOM = 22
+X_TICKS = 5
+# How often an open chart looks for new entries
+REFRESH_MS = 2000
+REDRAW_STAGE = 'chart_redraw'
+UNITS = {60: 'minute', 3600: 'hour', 86400: 'day', 7 * 86400: 'week'}
+
+
+def _tick_format(span):
+    """Return the strftime format of date labels for a visible span in seconds."""
+    if span > 2 * 365 * 86400:
+        return "%Y"
+    if span > 60 * 86400:
+        return "%b %Y"
+    if span > 2 * 86400:
+        return "%d %b"
+    return "%d %b %H:%M"
+
+
+class TimelineChart(QWidget):
+    """Entries per bucket over time, one line per label.
+
+    The visible range is in local seconds. The wheel zooms around the
+    cursor and dragging pans; every redraw asks the pyramid for at most one
+    point per pixel, so it costs the same at any zoom.
+    """
+
+    # Emitted after each redraw with the bucket length in seconds and the time taken in ms
+    drawn = pyqtSignal(int, float)
+
+    def __init__(self, pyramid, parent=None):
+        """Initialize the chart over the past month."""
+        super().__init__(parent)
+        self.config = Config()
+        self.metrics = Metrics()
+        self.pyramid = pyramid
+        # (label, color) to draw, in legend order
+        self.lines = []
+        now = local_seconds(time.time())
+        self.start, self.end = now - 30 * 86400, now
+        # (press x, start, end) while dragging
+        self._drag = None
+        self._version = None
+        self.setMinimumSize(400, 220)
+
+    def set_lines(self, lines):
+        """Draw the given (label, color) pairs."""
+        self.lines = lines
+        self.update()
+
+    def set_range(self, start, end):
+        """Show [start, end) in local seconds, keeping the span within limits."""
+        span = min(max(end - start, MIN_SPAN), MAX_SPAN)
+        middle = (start + end) / 2
+        self.start, self.end = int(middle - span / 2), int(middle + span / 2)
+        self.update()
+
+    def refresh_if_changed(self):
+        """Redraw if entries were counted since the last redraw."""
+        if self.pyramid.version != self._version:
+            self.update()
+
+    def _plot_rect(self):
+        """Return the rectangle lines are drawn in."""
+        return self.rect().adjusted(MARGIN_LEFT, 8, -10, -MARGIN_BOTTOM)
+
+    def paintEvent(self, event):
+        """Draw the axes and the visible part of every line."""
+        started = time.perf_counter()
+        ui = self.config.snapshot().ui
+        lines = []
+        painter = QPainter(self)
+        try:
+            painter.fillRect(self.rect(), QColor(ui.background_color))
+            area = self._plot_rect()
+            self._version = self.pyramid.version
+            for label, color in self.lines:
+                series = self.pyramid.series(label, self.start, self.end, area.width())
+                if series is not None:
+                    lines.append((series, color))
+            peak = max([max(series.ys, default=0) for series, _ in lines] + [1])
+
+            text = QColor(ui.text_color)
+            painter.setPen(QPen(text, 1))
+            painter.drawLine(area.bottomLeft(), area.bottomRight())
+            painter.drawLine(area.bottomLeft(), area.topLeft())
+            painter.drawText(0, area.top(), MARGIN_LEFT - 6, 20,
+                             Qt.AlignRight | Qt.AlignTop, str(peak))
+            painter.drawText(0, area.bottom() - 20, MARGIN_LEFT - 6, 20,
+                             Qt.AlignRight | Qt.AlignBottom, "0")
+            span = self.end - self.start
+            pattern = _tick_format(span)
+            for tick in range(X_TICKS):
+                at = self.start + span * tick // (X_TICKS - 1)
+                x = area.left() + area.width() * tick // (X_TICKS - 1)
+                # Local seconds read back as UTC give the local wall time
+                label = datetime.fromtimestamp(at, timezone.utc).strftime(pattern)
+                align = Qt.AlignLeft if tick == 0 else Qt.AlignRight if tick == X_TICKS - 1 \
+                    else Qt.AlignHCenter
+                left = x if tick == 0 else x - 120 if tick == X_TICKS - 1 else x - 60
+                painter.drawText(left, area.bottom() + 4, 120, MARGIN_BOTTOM - 4,
+                                 align | Qt.AlignTop, label)
+
+            painter.setRenderHint(QPainter.Antialiasing)
+            scale_x = area.width() / span
+            scale_y = area.height() / peak
+            left, bottom = area.left(), area.bottom()
+            for series, color in lines:
+                # Points sit in the middle of their bucket
+                offset = series.bucket_seconds / 2 - self.start
+                painter.setPen(QPen(QColor(color), 1.5))
+                painter.drawPolyline(QPolygonF([
+                    QPointF(left + (x + offset) * scale_x, bottom - y * scale_y)
+                    for x, y in zip(series.xs, series.ys)]))
+        finally:
+            painter.end()
+        elapsed = time.perf_counter() - started
+        self.metrics.record(REDRAW_STAGE, elapsed)
+        if lines:
+            self.drawn.emit(lines[0][0].bucket_seconds, elapsed * 1000)
+
+    def wheelEvent(self, event):
+        """Zoom around the cursor."""
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return
+        area = self._plot_rect()
+        fraction = min(max((event.pos().x() - area.left()) / max(area.width(), 1), 0.0), 1.0)
+        anchor = self.start + fraction * (self.end - self.start)
+        factor = ZOOM_STEP ** -steps
+        span = min(max((self.end - self.start) * factor, MIN_SPAN), MAX_SPAN)
+        self.set_range(anchor - fraction * span, anchor + (1 - fraction) * span)
+
+    def mousePressEvent(self, event):
+        """Start panning."""
+        if event.button() == Qt.LeftButton:
+            self._drag = (event.x(), self.start, self.end)
+
+    def mouseMoveEvent(self, event):
+        """Pan with the pointer."""
+        if self._drag is not None:
+            x, start, end = self._drag
+            shift = (x - event.x()) * (end - start) / max(self._plot_rect().width(), 1)
+            self.set_range(start + shift, end + shift)
+
+    def mouseReleaseEvent(self, event):
+        """Stop panning."""
+        self._drag = None
+
+
+class ChartWindow(QWidget):
+    """Window charting how often each label was logged over days, months or years."""
+
+    def __init__(self):
+        """Initialize the chart window."""
+        super().__init__()
+        self.config = Config()
+        self.logger = Logger()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint)
+        # label -> legend checkbox
+        self.checkboxes = {}
+        # Redraws while open as new entries are counted
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.initUI()
+        self.logger.info("Chart Window initialized")
+
+    def initUI(self):
+        """Initialize the user interface."""
+        try:
+            # Styles come from the shared application stylesheet, by object name
+            theme.apply_stylesheet()
+
+            self.setWindowTitle('Urge Chart')
+            self.setObjectName('chartWindow')
+
+            layout = QVBoxLayout()
+            layout.setContentsMargins(20, 20, 20, 20)
+
+            title = QLabel("History Chart")
+            title.setObjectName('chartTitle')
+            layout.addWidget(title)
+
+            ranges = QHBoxLayout()
+            for title_text, seconds in RANGES:
+                button = QPushButton(title_text)
+                button.setObjectName('chartRange')
+                button.setFocusPolicy(Qt.NoFocus)
+                button.clicked.connect(lambda checked, seconds=seconds: self.show_range(seconds))
+                ranges.addWidget(button)
+            ranges.addStretch(1)
+            layout.addLayout(ranges)
+
+            self.chart = TimelineChart(self.logger.pyramid(), self)
+            self.chart.setObjectName('timelineChart')
+            self.chart.drawn.connect(self.show_redraw)
+            layout.addWidget(self.chart, 1)
+
+            self.legend = QHBoxLayout()
+            layout.addLayout(self.legend)
+
+            self.status = QLabel("")
+            self.status.setObjectName('chartStatus')
+            layout.addWidget(self.status)
+
+            self.setLayout(layout)
+            self.apply_geometry()
+        except Exception as e:
+            self.logger.error(f"Error initializing chart UI: {str(e)}")
+            raise
+
+    def apply_geometry(self):
+        """Size the window for the current config version."""
+        width = theme.geometry().window_width
+        self.resize(max(width * 2, 640), max(width, 360))
+
+    def refresh(self):
+        """List every label with entries in the legend and redraw if anything changed."""
+        try:
+            pyramid = self.chart.pyramid
+            if not pyramid.ready:
+                self.status.setText("The chart is still loading")
+            # Configured labels first, in catalog order, then any others logged
+            catalog = [label.id for label in self.config.snapshot().catalog]
+            present = pyramid.label_names()
+            labels = [label for label in catalog if label in present] + \
+                [label for label in present if label not in catalog]
+            if labels != list(self.checkboxes):
+                unchecked = {label for label, box in self.checkboxes.items() if not box.isChecked()}
+                for box in self.checkboxes.values():
+                    self.legend.removeWidget(box)
+                    box.deleteLater()
+                self.checkboxes = {}
+                for index, label in enumerate(labels):
+                    box = QCheckBox(self.config.label_name(label) if label != NO_LABEL
+                                    else '(no label)')
+                    box.setObjectName('chartLabel')
+                    # Each box is the legend entry of its line, so it takes the line's color
+                    box.setStyleSheet(f"color: {COLORS[index % len(COLORS)]};")
+                    box.setChecked(label not in unchecked)
+                    box.toggled.connect(self.update_lines)
+                    self.legend.addWidget(box)
+                    self.checkboxes[label] = box
+                self.update_lines()
+            self.chart.refresh_if_changed()
+        except Exception as e:
+            self.logger.error(f"Error refreshing chart: {str(e)}")
+
+    def update_lines(self, *args):
+        """Draw a line for every checked label."""
+        self.chart.set_lines([(label, COLORS[index % len(COLORS)])
+                              for index, (label, box) in enumerate(self.checkboxes.items())
+                              if box.isChecked()])
+
+    def show_range(self, seconds):
+        """Show the past seconds up to now, or the whole history for None."""
+        now = local_seconds(time.time())
+        if seconds is None:
+            extent = self.chart.pyramid.extent()
+            start, end = extent if extent is not None else (now - 30 * 86400, now)
+        else:
+            start, end = now - seconds, now
+        self.chart.set_range(start, end)
+
+    def show_redraw(self, bucket_seconds, elapsed_ms):
+        """Report the resolution and cost of the last redraw."""
+        self.status.setText(f"Entries per {UNITS.get(bucket_seconds, 'bucket')}; "
+                            f"drawn in {elapsed_ms:.1f} ms")
+
+    def reset(self):
+        """Prepare the window to be shown again."""
+        self.refresh()
+
+    def center_on_screen(self):
+        """Center the window on the screen."""
+        try:
+            screen = QApplication.primaryScreen().geometry()
+            x = (screen.width() - self.width()) // 2
+            y = (screen.height() - self.height()) // 2
+            self.move(x, y)
+        except Exception as e:
+            self.logger.error(f"Error centering chart window: {str(e)}")
+
+    def keyPressEvent(self, event):
+        """Handle key press events."""
+        try:
+            if event.key() == Qt.Key_Escape:
+                self.close()
+        except Exception as e:
+            self.logger.error(f"Error handling key press in chart window: {str(e)}")
+
+    def showEvent(self, event):
+        """Start following new entries while the window is open."""
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        """Stop following new entries when the window closes."""
+        self.refresh_timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,60 @@
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from src.config import Config, ConfigError
+from src.ui import theme
+from src.utils.logger import Logger
+
+# Editors often write a file in several steps; wait for them to finish
+RELOAD_DELAY_MS = 200
+
+
+class ConfigWatcher(QObject):
+    """Reloads config.json when it changes on disk and announces new versions."""
+    # Emitted with the new Snapshot after a successful reload
+    config_changed = pyqtSignal(object)
+    # Emitted with the error when label edits could not be written to config.json
+    save_failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        """Initialize the watcher; start() begins watching."""
+        super().__init__(parent)
+        self.config = Config()
+        self.logger = Logger()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._schedule)
+        self.watcher.directoryChanged.connect(self._schedule)
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.timeout.connect(self.reload)
+        # The config writer thread reports here; the signal crosses to the GUI thread
+        self.config.on_save_error = lambda error: self.save_failed.emit(str(error))
+
+    def start(self):
+        """Watch config.json and its directory."""
+        # Watching the directory catches editors that replace the file
+        # instead of writing it in place, which drops the file watch
+        paths = [os.path.dirname(self.config.path)]
+        if os.path.exists(self.config.path):
+            paths.append(self.config.path)
+        self.watcher.addPaths(paths)
+
+    def _schedule(self, path):
+        """Coalesce bursts of change notifications into one reload."""
+        self.reload_timer.start(RELOAD_DELAY_MS)
+
+    def reload(self):
+        """Reload the file and emit config_changed if the configuration changed."""
+        if os.path.exists(self.config.path) and self.config.path not in self.watcher.files():
+            self.watcher.addPath(self.config.path)
+        try:
+            snapshot = self.config.reload()
+        except ConfigError as e:
+            self.logger.warning(f"Ignoring invalid config.json: {str(e)}")
+            return
+        if snapshot is None:
+            return
+        theme.apply_stylesheet()
+        self.logger.info(f"Configuration reloaded (version {snapshot.version})")
+        self.config_changed.emit(snapshot)
@@ -2,14 +2,18 @@ import os
 from datetime import datetime
 
 from PyQt5.QtWidgets import (
-    QWidget, QLineEdit, QHBoxLayout, QLabel, QWidgetAction
+    QWidget, QLineEdit, QHBoxLayout, QLabel, QWidgetAction, QApplication, QCompleter
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QStringListModel, pyqtSignal
 from PyQt5.QtGui import QIcon
 
 from src.config import Config
+from src.ui import theme
 from src.utils.logger import Logger
 
+# Number of past entries offered while typing
+MAX_SUGGESTIONS = 5
+
 class InputWindow(QWidget):
     """Window for user input after label selection."""
     input_complete = pyqtSignal(str,str)
@@ -29,39 +33,48 @@ class InputWindow(QWidget):
         self.startTimer()
         self.logger.info(f"Input Window initialized with label: {selected_label}")
 
+    def set_label(self, selected_label):
+        """Prepare the window for a new entry under the given label id."""
+        self.selected_label = selected_label
+        title = 'User Input'
+        if selected_label:
+            title += f" - {self.config.label_name(selected_label)}"
+        self.setWindowTitle(title)
+        self.textInput.clear()
+        self.completer.popup().hide()
+        self.updateTime()
+
     def initUI(self):
         """Initialize the user interface."""
         try:
-            # Get UI settings from config
-            bg_color = self.config.get('ui', 'background_color')
-            text_color = self.config.get('ui', 'text_color')
-            window_width = self.config.get('app', 'window_width')
+            # Styles come from the shared application stylesheet, by object name
+            theme.apply_stylesheet()
+            self.setObjectName('inputWindow')
             
             title = 'User Input'
             if self.selected_label:
-                title += f" - {self.selected_label}"
+                title += f" - {self.config.label_name(self.selected_label)}"
             self.setWindowTitle(title)
             self.setWindowFlags(Qt.FramelessWindowHint)
             
             self.textInput = QLineEdit()
+            self.textInput.setObjectName('inputText')
             self.textInput.setPlaceholderText('Enter your text...')
             self.textInput.returnPressed.connect(self.onSubmit)
-            self.textInput.setStyleSheet(f"""
-                QLineEdit {{
-                    background-color: {bg_color};
-                    color: {text_color};
-                    border: none;
-                    padding: 10px;
-                }}
-                QLineEdit:focus {{
-                    border: none;
-                    outline: none;
-                }}
-            """)
+            
+            # Suggestions come ranked from the history index, so the
+            # completer shows its model as is instead of filtering it
+            self.suggestion_model = QStringListModel(self)
+            self.completer = QCompleter(self.suggestion_model, self)
+            self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+            self.completer.setWidget(self.textInput)
+            self.completer.popup().setObjectName('inputSuggestions')
+            self.completer.activated[str].connect(self.textInput.setText)
+            self.textInput.textEdited.connect(self.updateSuggestions)
             
             now = datetime.now()
             self.timeLabel = QLabel("{:02d}:{:02d}".format(now.hour, now.minute))
-            self.timeLabel.setStyleSheet(f"color: {text_color}; background: transparent;")
+            self.timeLabel.setObjectName('inputTime')
             
             # Try to load enter icon from assets
             icon_path = os.path.join(
@@ -91,20 +104,24 @@ class InputWindow(QWidget):
             layout.addWidget(self.textInput)
             self.setLayout(layout)
 
-            self.textInput.adjustSize()
-            height = self.textInput.sizeHint().height()
-            self.setFixedSize(window_width, height)
+            self.apply_geometry()
             
         except Exception as e:
             self.logger.error(f"Error initializing input UI: {str(e)}")
             raise
         
+    def apply_geometry(self):
+        """Size the window for the current config version."""
+        self.textInput.adjustSize()
+        self.setFixedSize(theme.geometry().window_width, self.textInput.sizeHint().height())
+
     def startTimer(self):
-        """Start the timer for updating the time display."""
+        """Create the timer for updating the time display while shown."""
         try:
             self.timer = QTimer(self)
             self.timer.timeout.connect(self.updateTime)
-            self.timer.start(1000)
+            if self.isVisible():
+                self.timer.start(1000)
         except Exception as e:
             self.logger.error(f"Error starting timer: {str(e)}")
 
@@ -115,6 +132,19 @@ class InputWindow(QWidget):
         except Exception as e:
             self.logger.error(f"Error updating time: {str(e)}")
         
+    def updateSuggestions(self, text):
+        """Offer past entries for the selected label that start with the typed text."""
+        try:
+            suggestions = self.logger.suggestions().suggest(
+                self.selected_label, text, MAX_SUGGESTIONS)
+            self.suggestion_model.setStringList(suggestions)
+            if suggestions:
+                self.completer.complete()
+            else:
+                self.completer.popup().hide()
+        except Exception as e:
+            self.logger.error(f"Error updating suggestions: {str(e)}")
+
     def onSubmit(self):
         """Handle text submission."""
         try:
@@ -142,8 +172,29 @@ class InputWindow(QWidget):
         except Exception as e:
             self.logger.error(f"Error handling key press in input window: {str(e)}")
 
+    def center_on_screen(self):
+        """Center the window on the screen."""
+        try:
+            screen = QApplication.primaryScreen().geometry()
+            x = (screen.width() - self.width()) // 2
+            y = (screen.height() - self.height()) // 2
+            self.move(x, y)
+        except Exception as e:
+            self.logger.error(f"Error centering input window: {str(e)}")
+
     def showEvent(self, event):
         """Handle window show event."""
         super().showEvent(event)
+        self.updateTime()
+        self.timer.start(1000)
         # Set focus to the text input when shown
-        QTimer.singleShot(10, lambda: self.textInput.setFocus())
\ No newline at end of file
+        self.activateWindow()
+        self.textInput.setFocus()
+        # Read the history for suggestions in the background before the first keystroke
+        self.logger.suggestions().start_loading()
+
+    def hideEvent(self, event):
+        """Stop the clock while the window is hidden."""
+        super().hideEvent(event)
+        self.timer.stop()
+        self.completer.popup().hide()
\ No newline at end of file
@@ -1,13 +1,52 @@
+import time
+
 from PyQt5.QtWidgets import QWidget, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout, QPushButton
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QKeySequence
 
-from src.config import Config
-from src.ui.input_window import InputWindow
+from src.catalog import LabelCatalog
+from src.config import Config, Label
+from src.ui import theme
 from src.utils.logger import Logger
-from PyQt5.QtWidgets import QSizePolicy, QApplication
+from PyQt5.QtWidgets import QSizePolicy, QApplication, QListView
+
+# Rows kept in the filtered list; the view only paints the visible ones
+MAX_RESULTS = 200
+VISIBLE_ROWS = 6
+
+
+def shortcut_modifier(key):
+    """Return the modifier a label shortcut needs: Alt for letters, which start a search."""
+    return Qt.NoModifier if Qt.Key_0 <= key <= Qt.Key_9 else Qt.AltModifier
+
+
+class LabelListModel(QAbstractListModel):
+    """List model over the filtered labels; rows are painted, never made into widgets."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.labels = []
+
+    def set_labels(self, labels):
+        """Replace the rows."""
+        self.beginResetModel()
+        self.labels = labels
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.labels)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            label = self.labels[index.row()]
+            return f"{label.key}   {label.name}" if label.key else label.name
+        return None
+
 
 class LabelSelectionWindow(QWidget):
     """Window for selecting urge labels."""
+    # Emitted with the chosen label id and the perf_counter() of the keypress
+    label_selected = pyqtSignal(str, float)
     
     def __init__(self):
         """Initialize the label selection window."""
@@ -26,38 +65,34 @@ class LabelSelectionWindow(QWidget):
         self.setAttribute(Qt.WA_ShowWithoutActivating, False)
         self.setFocusPolicy(Qt.StrongFocus)
         
-        # Load labels from config and create mapping of shortcuts to text
-        self.options = {}  # mapping of key code to default label
-        labels_config = self.config.get('labels')
-        for key, label in labels_config.items():
-            key_val = getattr(Qt, f"Key_{key}")
-            self.options[key_val] = label
+        # Mapping of key code to Label for the current config version
+        self.options = theme.label_keys()
             
         # Dictionary to hold QLineEdit widgets for each option
         self.option_edits = {}
         
+        # Every known label for the type-to-filter list
+        self.catalog = None
+        self.catalog_version = None
+        
         self.initUI()
         self.logger.info("Label Selection Window initialized")
 
     def initUI(self):
         """Initialize the user interface."""
         try:
-            # Get UI settings from config
-            bg_color = self.config.get('ui', 'background_color')
-            text_color = self.config.get('ui', 'text_color')
-            font_size_large = self.config.get('ui', 'font_size_large')
-            font_size_normal = self.config.get('ui', 'font_size_normal')
-            window_width = self.config.get('app', 'window_width')
+            # Styles come from the shared application stylesheet, by object name
+            theme.apply_stylesheet()
             
             self.setWindowTitle('Select a Label')
+            self.setObjectName('labelSelectionWindow')
             self.setWindowFlags(Qt.FramelessWindowHint)
-            self.setStyleSheet(f"background-color: {bg_color};")
             
             layout = QVBoxLayout()
             layout.setContentsMargins(20, 20, 20, 20)
 
             instruction = QLabel("Select a Urge:")
-            instruction.setStyleSheet(f"font-size: {font_size_large}; color: {text_color}; margin-bottom: 5px;")
+            instruction.setObjectName('selectionTitle')
             layout.addWidget(instruction)
             
             # Create a horizontal layout for options
@@ -66,26 +101,21 @@ class LabelSelectionWindow(QWidget):
             hLayout.setSpacing(20)
             
             # For each option, create a label for the shortcut and an editable QLineEdit
-            for key, label_text in self.options.items():
+            for key, label in self.options.items():
                 # Create a vertical layout for the key and its editable label
                 optionLayout = QVBoxLayout()
                 optionLayout.setSpacing(5)
                 
-                # Show the key number (assumes keys are numeric)
-                key_label = QLabel(f"{key - Qt.Key_0}:")
-                key_label.setStyleSheet(f"font-size: {font_size_normal}; color: {text_color}; margin: 0;")
+                # Show the key, with Alt for letter shortcuts
+                key_label = QLabel(f"{QKeySequence(int(shortcut_modifier(key)) | key).toString()}:")
+                key_label.setObjectName('optionKey')
                 optionLayout.addWidget(key_label)
                 
                 # Create an editable line for the label text, with no border to look cleaner.
                 edit = QLineEdit()
-                edit.setText(label_text)
+                edit.setObjectName('optionEdit')
+                edit.setText(label.name)
                 edit.setReadOnly(True)
-                edit.setStyleSheet(f"""
-                    font-size: {font_size_normal};
-                    color: {text_color};
-                    border: none;
-                    background: transparent;
-                """)
                 optionLayout.addWidget(edit)
                 
                 # Store the QLineEdit widget for later access on key press
@@ -95,17 +125,32 @@ class LabelSelectionWindow(QWidget):
                 
             layout.addLayout(hLayout)
 
+            # Type to filter every label, shortcut or not
+            self.search_box = QLineEdit()
+            self.search_box.setObjectName('labelSearch')
+            self.search_box.setPlaceholderText('Type to search labels...')
+            self.search_box.textChanged.connect(self.apply_filter)
+            self.search_box.installEventFilter(self)
+            layout.addWidget(self.search_box)
+
+            self.model = LabelListModel(self)
+            self.label_list = QListView()
+            self.label_list.setObjectName('labelList')
+            self.label_list.setModel(self.model)
+            self.label_list.setUniformItemSizes(True)
+            self.label_list.setFocusPolicy(Qt.NoFocus)
+            self.label_list.setEditTriggers(QListView.NoEditTriggers)
+            self.label_list.setFixedHeight(VISIBLE_ROWS * (self.fontMetrics().height() + 8))
+            self.label_list.clicked.connect(
+                lambda index: self.select(self.model.labels[index.row()], time.perf_counter()))
+            layout.addWidget(self.label_list)
+            self.refresh_catalog()
+
             # Add the toggle button to allow switching between editing and selection mode.
             top_layout = QHBoxLayout()
             top_layout.addStretch()  # Push the button to the right side
             self.toggle_button = QPushButton("Edit")
-            self.toggle_button.setStyleSheet(f"""
-                font-size: {font_size_normal};
-                color: {text_color};
-                padding: 5px 10px;
-                border: 1px solid {text_color};
-                background: transparent;
-            """)
+            self.toggle_button.setObjectName('editToggle')
             # Set size policy so that the button is just wide as its text
             self.toggle_button.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Fixed)
             self.toggle_button.clicked.connect(self.toggle_edit)
@@ -113,17 +158,17 @@ class LabelSelectionWindow(QWidget):
             layout.insertLayout(0, top_layout)
             
             self.setLayout(layout)
-            self.adjustSize()
-            self.setFixedWidth(window_width)
-            
-            # Add this at the end of the method
-            # We'll call this later when showing the window
-            self.center_requested = True
+            self.apply_geometry()
             
         except Exception as e:
             self.logger.error(f"Error initializing UI: {str(e)}")
             raise
 
+    def apply_geometry(self):
+        """Size the window for the current config version."""
+        self.adjustSize()
+        self.setFixedWidth(theme.geometry().window_width)
+
     def toggle_edit(self):
         """Toggle between editing and selection mode."""
         try:
@@ -133,30 +178,124 @@ class LabelSelectionWindow(QWidget):
                     edit.setReadOnly(False)
                 self.toggle_button.setText("Save")
             else:
-                # Save the new names and disable editing.
+                # Save the new names and disable editing. Entries keep the
+                # label ids, so renaming never touches the history.
+                names = {}
                 for key, edit in self.option_edits.items():
-                    self.options[key] = edit.text()
+                    if edit.text().strip() and edit.text() != self.options[key].name:
+                        names[self.options[key].key] = edit.text()
                     edit.setReadOnly(True)
+                if names:
+                    # Applies at once; config.json is written in the background
+                    self.config.rename_labels(names)
+                    self.logger.info(f"Labels renamed: {names}")
+                self.options = theme.label_keys()
+                for key, edit in self.option_edits.items():
+                    edit.setText(self.options[key].name)
                 self.toggle_button.setText("Edit")
-                # Remove focus from the edits so key presses are registered by the window.
-                self.setFocus()
+                self.refresh_catalog()
+                # Remove focus from the edits so typing goes to the search box.
+                self.search_box.setFocus()
         except Exception as e:
             self.logger.error(f"Error toggling edit mode: {str(e)}")
 
-    def keyPressEvent(self, event):
-        """Handle key press events."""
+    def reset(self):
+        """Reset the window to selection mode so it can be shown again."""
         try:
-            if event.key() in self.option_edits and all(edit.isReadOnly() for edit in self.option_edits.values()):
-                # Retrieve the text from the corresponding editable field
-                self.selected_label = self.option_edits[event.key()].text()
-                self.logger.info(f"Label selected: {self.selected_label}")
-                self.input_window = InputWindow(selected_label=self.selected_label)
-                # self.input_window.input_complete.connect(self.close)
-                self.input_window.show()
-                self.close()
-            elif event.key() == Qt.Key_Escape:
+            self.selected_label = None
+            # Pick up names changed in config.json since the window was built
+            self.options = theme.label_keys()
+            for key, edit in self.option_edits.items():
+                edit.setText(self.options[key].name)
+                edit.setReadOnly(True)
+            self.toggle_button.setText("Edit")
+            self.refresh_catalog()
+            self.search_box.clear()
+            self.apply_filter('')
+        except Exception as e:
+            self.logger.error(f"Error resetting selection window: {str(e)}")
+
+    def refresh_catalog(self):
+        """Rebuild the catalog for a new config version and re-rank it by recent use."""
+        # Labels that only appear in the history are listed too
+        usage = self.logger.rollups().usage()
+        version = self.config.snapshot().version
+        if self.catalog is None or version != self.catalog_version or \
+                any(label_id not in self.known_ids for label_id in usage):
+            labels = list(self.config.snapshot().catalog)
+            self.known_ids = {label.id for label in labels}
+            labels.extend(Label(None, label_id, label_id) for label_id in sorted(usage)
+                          if label_id not in self.known_ids)
+            self.known_ids.update(usage)
+            self.catalog = LabelCatalog(labels, usage)
+            self.catalog_version = version
+        else:
+            self.catalog.set_usage(usage)
+
+    def apply_filter(self, text):
+        """Show the labels matching the search text, best first."""
+        self.model.set_labels(self.catalog.filter(text, MAX_RESULTS))
+        if self.model.labels:
+            self.label_list.setCurrentIndex(self.model.index(0))
+
+    def select(self, label, pressed_at):
+        """Choose a label: hide the window and announce its id."""
+        self.selected_label = label.id
+        self.catalog.touch(label.id)
+        self.logger.info(f"Label selected: {label.name}")
+        self.hide()
+        self.label_selected.emit(self.selected_label, pressed_at)
+
+    def handle_key(self, event):
+        """Handle a selection key; return True if it was consumed."""
+        if not all(edit.isReadOnly() for edit in self.option_edits.values()):
+            return False
+        key = event.key()
+        # Digit shortcuts select at once while nothing has been typed, and letter
+        # shortcuts take Alt so that typed letters always filter
+        if key in self.option_edits:
+            if shortcut_modifier(key) == Qt.AltModifier:
+                chosen = bool(event.modifiers() & Qt.AltModifier)
+            else:
+                chosen = not self.search_box.text()
+            if chosen:
+                self.select(self.options[key], time.perf_counter())
+                return True
+        if key in (Qt.Key_Up, Qt.Key_Down) and self.model.labels:
+            step = -1 if key == Qt.Key_Up else 1
+            row = self.label_list.currentIndex().row() + step
+            row = max(0, min(len(self.model.labels) - 1, row))
+            self.label_list.setCurrentIndex(self.model.index(row))
+            return True
+        if key in (Qt.Key_Return, Qt.Key_Enter) and self.label_list.currentIndex().isValid():
+            self.select(self.model.labels[self.label_list.currentIndex().row()],
+                        time.perf_counter())
+            return True
+        if key == Qt.Key_Escape:
+            if self.search_box.text():
+                self.search_box.clear()
+            else:
                 self.logger.info("Label selection canceled")
                 self.close()
+            return True
+        return False
+
+    def eventFilter(self, obj, event):
+        """Route selection keys typed into the search box."""
+        if obj is self.search_box and event.type() == QEvent.KeyPress:
+            try:
+                return self.handle_key(event)
+            except Exception as e:
+                self.logger.error(f"Error handling key press: {str(e)}")
+        return super().eventFilter(obj, event)
+
+    def keyPressEvent(self, event):
+        """Handle key press events."""
+        try:
+            if not self.handle_key(event) and event.text().isprintable() and event.text():
+                # Typing anywhere in the window starts a search
+                self.search_box.setFocus()
+                self.search_box.insert(event.text())
         except Exception as e:
             self.logger.error(f"Error handling key press: {str(e)}")
 
@@ -170,13 +309,12 @@ class LabelSelectionWindow(QWidget):
             y = (screen.height() - self.height()) // 2
             # Move the window
             self.move(x, y)
-            self.logger.info(f"Window centered at ({x}, {y})")
         except Exception as e:
             self.logger.error(f"Error centering window: {str(e)}")
 
     def showEvent(self, event):
         """Handle window show event."""
         super().showEvent(event)
-        # Request focus when window is shown
-        self.setFocus()
-        self.activateWindow()
\ No newline at end of file
+        # Request focus when window is shown; typing goes to the search box
+        self.activateWindow()
+        self.search_box.setFocus()
\ No newline at end of file
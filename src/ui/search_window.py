@@ -0,0 +1,178 @@
+import time
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QLineEdit, QComboBox, QHBoxLayout, QVBoxLayout, QTableWidget,
+    QTableWidgetItem, QHeaderView, QAbstractItemView, QApplication
+)
+from PyQt5.QtCore import Qt, QTimer
+
+from src.config import Config
+from src.ui import theme
+from src.utils.logger import Logger
+
+COLUMNS = ['When', 'Label', 'Text']
+MAX_RESULTS = 100
+# Typing pauses this long before a search runs
+SEARCH_DELAY_MS = 150
+# Period choices: (title, seconds back from now or None for all time)
+PERIODS = [('Any time', None), ('Today', 86400), ('Past week', 7 * 86400),
+           ('Past month', 30 * 86400), ('Past year', 365 * 86400)]
+
+
+class SearchWindow(QWidget):
+    """Window for finding past entries by the words in them."""
+
+    def __init__(self):
+        """Initialize the search window."""
+        super().__init__()
+        self.config = Config()
+        self.logger = Logger()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint)
+        # One restartable timer so a burst of keystrokes runs a single search
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.run_search)
+        self.initUI()
+        self.logger.info("Search Window initialized")
+
+    def initUI(self):
+        """Initialize the user interface."""
+        try:
+            # Styles come from the shared application stylesheet, by object name
+            theme.apply_stylesheet()
+
+            self.setWindowTitle('Urge Search')
+            self.setObjectName('searchWindow')
+
+            layout = QVBoxLayout()
+            layout.setContentsMargins(20, 20, 20, 20)
+
+            title = QLabel("Search History")
+            title.setObjectName('searchTitle')
+            layout.addWidget(title)
+
+            filters = QHBoxLayout()
+            self.search_box = QLineEdit()
+            self.search_box.setObjectName('historySearch')
+            self.search_box.setPlaceholderText("Words to find")
+            self.search_box.textEdited.connect(self.schedule_search)
+            filters.addWidget(self.search_box, 1)
+            self.label_filter = QComboBox()
+            self.label_filter.setObjectName('searchLabel')
+            self.label_filter.currentIndexChanged.connect(self.schedule_search)
+            filters.addWidget(self.label_filter)
+            self.period_filter = QComboBox()
+            self.period_filter.setObjectName('searchPeriod')
+            for title_text, _ in PERIODS:
+                self.period_filter.addItem(title_text)
+            self.period_filter.currentIndexChanged.connect(self.schedule_search)
+            filters.addWidget(self.period_filter)
+            layout.addLayout(filters)
+
+            self.table = QTableWidget(0, len(COLUMNS))
+            self.table.setObjectName('searchResults')
+            self.table.setHorizontalHeaderLabels(COLUMNS)
+            self.table.verticalHeader().setVisible(False)
+            header = self.table.horizontalHeader()
+            header.setSectionResizeMode(QHeaderView.ResizeToContents)
+            header.setSectionResizeMode(len(COLUMNS) - 1, QHeaderView.Stretch)
+            self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            layout.addWidget(self.table)
+
+            self.status = QLabel("")
+            self.status.setObjectName('searchStatus')
+            layout.addWidget(self.status)
+
+            self.setLayout(layout)
+            self.apply_geometry()
+        except Exception as e:
+            self.logger.error(f"Error initializing search UI: {str(e)}")
+            raise
+
+    def apply_geometry(self):
+        """Size the window for the current config version."""
+        self.setFixedWidth(theme.geometry().window_width)
+
+    def refresh_labels(self):
+        """List the configured labels in the label filter, keeping the selection."""
+        selected = self.label_filter.currentData()
+        self.label_filter.blockSignals(True)
+        self.label_filter.clear()
+        self.label_filter.addItem("All labels", None)
+        for label in self.config.snapshot().catalog:
+            self.label_filter.addItem(label.name, label.id)
+        index = self.label_filter.findData(selected)
+        self.label_filter.setCurrentIndex(max(0, index))
+        self.label_filter.blockSignals(False)
+
+    def schedule_search(self, *args):
+        """Search once typing pauses."""
+        self.search_timer.start(SEARCH_DELAY_MS)
+
+    def run_search(self):
+        """Fill the table with the entries matching the current query and filters."""
+        try:
+            query = self.search_box.text()
+            index = self.logger.search_index()
+            if index is None:
+                self.status.setText("Search is disabled in config.json")
+                return
+            if not query.strip():
+                self.table.setRowCount(0)
+                self.status.setText("")
+                return
+            if not index.ready:
+                self.status.setText("The search index is still loading")
+                self.search_timer.start(500)
+                return
+            seconds = PERIODS[self.period_filter.currentIndex()][1]
+            start = time.time() - seconds if seconds is not None else None
+            started = time.perf_counter()
+            hits = index.search(query, label=self.label_filter.currentData(), start=start,
+                                limit=MAX_RESULTS, prefix=True, timeout=0)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.table.setRowCount(len(hits))
+            for row, hit in enumerate(hits):
+                entry = hit.entry
+                values = [datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M"),
+                          self.config.label_name(entry.label) if entry.label else '',
+                          entry.text]
+                for column, value in enumerate(values):
+                    self.table.setItem(row, column, QTableWidgetItem(value))
+            self.status.setText(f"{len(hits)} entries in {elapsed_ms:.1f} ms")
+        except Exception as e:
+            self.logger.error(f"Error searching history: {str(e)}")
+
+    def reset(self):
+        """Prepare the window for a new search."""
+        self.refresh_labels()
+        self.search_box.selectAll()
+        self.search_box.setFocus()
+
+    def center_on_screen(self):
+        """Center the window on the screen."""
+        try:
+            screen = QApplication.primaryScreen().geometry()
+            x = (screen.width() - self.width()) // 2
+            y = (screen.height() - self.height()) // 2
+            self.move(x, y)
+        except Exception as e:
+            self.logger.error(f"Error centering search window: {str(e)}")
+
+    def keyPressEvent(self, event):
+        """Handle key press events."""
+        try:
+            if event.key() == Qt.Key_Escape:
+                self.close()
+            elif event.key() in (Qt.Key_Return, Qt.Key_Enter):
+                self.search_timer.stop()
+                self.run_search()
+        except Exception as e:
+            self.logger.error(f"Error handling key press in search window: {str(e)}")
+
+    def hideEvent(self, event):
+        """Drop a pending search when the window closes."""
+        self.search_timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,120 @@
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
+    QAbstractItemView, QApplication
+)
+from PyQt5.QtCore import Qt, QTimer
+
+from src.config import Config
+from src.ui import theme
+from src.utils.logger import Logger
+
+COLUMNS = ['Label', 'Today', 'This week', 'All time', 'Streak (days)']
+# How often the table is refilled while the rollups are still catching up
+LOADING_REFRESH_MS = 500
+
+
+class StatsWindow(QWidget):
+    """Window showing per-label counts and streaks from the stored rollups."""
+
+    def __init__(self):
+        """Initialize the stats window."""
+        super().__init__()
+        self.config = Config()
+        self.logger = Logger()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint)
+        # Refills the table until the rollups have caught up
+        self.loading_timer = QTimer(self)
+        self.loading_timer.setSingleShot(True)
+        self.loading_timer.setInterval(LOADING_REFRESH_MS)
+        self.loading_timer.timeout.connect(self.refresh)
+        self.initUI()
+        self.logger.info("Stats Window initialized")
+
+    def initUI(self):
+        """Initialize the user interface."""
+        try:
+            # Styles come from the shared application stylesheet, by object name
+            theme.apply_stylesheet()
+
+            self.setWindowTitle('Urge Stats')
+            self.setObjectName('statsWindow')
+
+            layout = QVBoxLayout()
+            layout.setContentsMargins(20, 20, 20, 20)
+
+            title = QLabel("Urge Stats")
+            title.setObjectName('statsTitle')
+            layout.addWidget(title)
+
+            self.table = QTableWidget(0, len(COLUMNS))
+            self.table.setHorizontalHeaderLabels(COLUMNS)
+            self.table.verticalHeader().setVisible(False)
+            self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            self.table.setSelectionMode(QAbstractItemView.NoSelection)
+            self.table.setFocusPolicy(Qt.NoFocus)
+            layout.addWidget(self.table)
+
+            self.status = QLabel("")
+            self.status.setObjectName('statsStatus')
+            layout.addWidget(self.status)
+
+            self.setLayout(layout)
+            self.apply_geometry()
+        except Exception as e:
+            self.logger.error(f"Error initializing stats UI: {str(e)}")
+            raise
+
+    def apply_geometry(self):
+        """Size the window for the current config version."""
+        self.setFixedWidth(theme.geometry().window_width)
+
+    def refresh(self):
+        """Fill the table from the current rollups."""
+        try:
+            rollups = self.logger.rollups()
+            rows = rollups.snapshot()
+            if rollups.ready:
+                self.status.hide()
+            else:
+                # The saved counts are shown meanwhile, without waiting on the catch-up
+                self.status.setText("Counting the latest entries...")
+                self.status.show()
+                self.loading_timer.start()
+            self.table.setRowCount(len(rows))
+            for row, stats in enumerate(rows):
+                values = [self.config.label_name(stats.label) if stats.label else '(no label)',
+                          stats.today, stats.week,
+                          stats.all_time, stats.streak]
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(str(value))
+                    if column:
+                        item.setTextAlignment(Qt.AlignCenter)
+                    self.table.setItem(row, column, item)
+            self.table.resizeRowsToContents()
+            self.adjustSize()
+        except Exception as e:
+            self.logger.error(f"Error refreshing stats: {str(e)}")
+
+    def center_on_screen(self):
+        """Center the window on the screen."""
+        try:
+            screen = QApplication.primaryScreen().geometry()
+            x = (screen.width() - self.width()) // 2
+            y = (screen.height() - self.height()) // 2
+            self.move(x, y)
+        except Exception as e:
+            self.logger.error(f"Error centering stats window: {str(e)}")
+
+    def keyPressEvent(self, event):
+        """Handle key press events."""
+        try:
+            if event.key() == Qt.Key_Escape:
+                self.close()
+        except Exception as e:
+            self.logger.error(f"Error handling key press in stats window: {str(e)}")
+
+    def hideEvent(self, event):
+        """Stop waiting for the rollups when the window closes."""
+        self.loading_timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,144 @@
+"""Qt artifacts derived from the configuration, built once per config version.
+
+Every window styles its widgets through object names in one application
+stylesheet, so showing a popup never rebuilds style strings and a config
+change restyles all windows at once.
+"""
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+from src.config import Config
+
+
+def build_stylesheet(snapshot):
+    """Return the application stylesheet for a config snapshot."""
+    ui = snapshot.ui
+    return f"""
+        #labelSelectionWindow, #labelSelectionWindow *,
+        #statsWindow, #statsWindow *, #searchWindow, #searchWindow *,
+        #chartWindow, #chartWindow * {{
+            background-color: {ui.background_color};
+        }}
+        #labelSelectionWindow QLabel#selectionTitle, #statsWindow QLabel#statsTitle,
+        #searchWindow QLabel#searchTitle, #chartWindow QLabel#chartTitle {{
+            font-size: {ui.font_size_large};
+            color: {ui.text_color};
+            margin-bottom: 5px;
+        }}
+        #labelSelectionWindow QLabel#optionKey {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            margin: 0;
+        }}
+        #labelSelectionWindow QLineEdit#optionEdit {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            border: none;
+            background: transparent;
+        }}
+        #labelSelectionWindow QPushButton#editToggle {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            padding: 5px 10px;
+            border: 1px solid {ui.text_color};
+            background: transparent;
+        }}
+        #labelSelectionWindow QLineEdit#labelSearch {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            border: 1px solid {ui.text_color};
+            padding: 4px;
+            margin-top: 10px;
+        }}
+        #labelSelectionWindow QListView#labelList {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            border: none;
+        }}
+        #labelSelectionWindow QListView#labelList::item:selected {{
+            background-color: {ui.text_color};
+            color: {ui.background_color};
+        }}
+        #inputWindow QLineEdit#inputText {{
+            background-color: {ui.background_color};
+            color: {ui.text_color};
+            border: none;
+            padding: 10px;
+        }}
+        #inputWindow QLineEdit#inputText:focus {{
+            border: none;
+            outline: none;
+        }}
+        QListView#inputSuggestions {{
+            background-color: {ui.background_color};
+            color: {ui.text_color};
+            font-size: {ui.font_size_normal};
+        }}
+        #inputWindow QLabel#inputTime {{
+            color: {ui.text_color};
+            background: transparent;
+        }}
+        #searchWindow QLineEdit#historySearch {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            border: 1px solid {ui.text_color};
+            padding: 4px;
+        }}
+        #searchWindow QComboBox, #searchWindow QLabel#searchStatus {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+        }}
+        #chartWindow QPushButton#chartRange {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            padding: 4px 10px;
+            border: 1px solid {ui.text_color};
+            background: transparent;
+        }}
+        #chartWindow QCheckBox#chartLabel, #chartWindow QLabel#chartStatus,
+        #statsWindow QLabel#statsStatus {{
+            font-size: {ui.font_size_normal};
+        }}
+        #chartWindow QLabel#chartStatus, #statsWindow QLabel#statsStatus {{
+            color: {ui.text_color};
+        }}
+        #statsWindow QTableWidget, #searchWindow QTableWidget {{
+            font-size: {ui.font_size_normal};
+            color: {ui.text_color};
+            border: none;
+            gridline-color: {ui.text_color};
+        }}
+        #statsWindow QHeaderView::section, #searchWindow QHeaderView::section {{
+            background-color: {ui.background_color};
+            color: {ui.text_color};
+            border: none;
+            padding: 5px;
+        }}
+    """
+
+
+def build_label_keys(snapshot):
+    """Return {Qt key code: Label} for the configured label shortcuts."""
+    return {getattr(Qt, f"Key_{label.key.upper()}"): label for label in snapshot.labels}
+
+
+def label_keys():
+    """Return the label key map of the current config version."""
+    return Config().derived('label_keys', build_label_keys)
+
+
+def geometry():
+    """Return the window Geometry of the current config version."""
+    return Config().snapshot().geometry
+
+
+def apply_stylesheet():
+    """Install the current stylesheet on the application if it is out of date."""
+    app = QApplication.instance()
+    if app is None:
+        return
+    config = Config()
+    version = config.snapshot().version
+    if app.property('urgeStylesheetVersion') != version:
+        app.setStyleSheet(config.derived('stylesheet', build_stylesheet))
+        app.setProperty('urgeStylesheetVersion', version)
@@ -1,3 +1,5 @@
 from .logger import Logger
+from .writer import BatchWriter
+from .metrics import Metrics, LatencyHistogram
 
-__all__ = ['Logger']
\ No newline at end of file
+__all__ = ['Logger', 'BatchWriter', 'Metrics', 'LatencyHistogram']
\ No newline at end of file
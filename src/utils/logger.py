@@ -1,6 +1,193 @@
 import os
+import time
+import queue
+import atexit
 import logging
-from datetime import datetime
+import logging.handlers
+import threading
+from datetime import datetime, timedelta
+
+from src.config import Config
+from src.storage.textlog import TIMESTAMP_FORMAT, Entry, check_timestamp, inputs_filename
+
+# Process-wide background writer for user inputs, created on first use
+_writer = None
+_rollups = None
+_suggestions = None
+_search = None
+_pyramid = None
+_risk = None
+_writer_lock = threading.Lock()
+# Newest timestamp queued, so entries reach the store in time order
+_last_timestamp = 0.0
+_order_lock = threading.Lock()
+
+# Process-wide logging pipeline shared by every Logger instance
+_logs_dir = None
+_listener = None
+_queue_handler = None
+_archiver = None
+_pipeline_lock = threading.Lock()
+
+
+def _default_logs_dir():
+    """Return the logs directory; URGE_LOGS_DIR redirects it for benchmarks and soak runs."""
+    from src.storage.backends import default_logs_dir
+    return default_logs_dir()
+
+
+class DailyFileHandler(logging.FileHandler):
+    """File handler that writes each record to <prefix>YYYYMMDD.log for its own day."""
+
+    def __init__(self, logs_dir, prefix):
+        """Initialize the handler; the file is opened on the first record."""
+        self.logs_dir = logs_dir
+        self.prefix = prefix
+        self.day = datetime.now().strftime("%Y%m%d")
+        super().__init__(self._path(self.day), encoding='utf-8', delay=True)
+
+    def _path(self, day):
+        """Return the log path for a day."""
+        return os.path.join(self.logs_dir, f"{self.prefix}{day}.log")
+
+    def emit(self, record):
+        """Switch to the record's day file at midnight, then write it."""
+        day = time.strftime("%Y%m%d", time.localtime(record.created))
+        if day != self.day:
+            self.acquire()
+            try:
+                if self.stream is not None:
+                    self.stream.close()
+                    self.stream = None
+                self.day = day
+                self.baseFilename = self._path(day)
+            finally:
+                self.release()
+        super().emit(record)
+
+
+class LogArchiver:
+    """Background thread that compresses finished days of both log streams."""
+
+    CHECK_INTERVAL = 3600.0
+
+    def __init__(self, logs_dir, compress_after_days=2, retention_days=None):
+        """Initialize the archiver; start() launches the thread."""
+        self.logs_dir = logs_dir
+        self.compress_after_days = compress_after_days
+        self.retention_days = retention_days
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='urge-archiver', daemon=True)
+
+    def start(self):
+        """Start compressing in the background."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread after the file it is compressing, if any."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(10)
+
+    def run_once(self):
+        """Compress every eligible day now."""
+        from src.storage.archive import compress_finished_logs
+
+        today = datetime.now()
+        before = (today - timedelta(days=self.compress_after_days - 1)).strftime("%Y%m%d")
+        compress_finished_logs(self.logs_dir, ['inputs_'], before)
+        delete_before = None
+        if self.retention_days:
+            delete_before = (today - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+        # Diagnostic logs may expire; user inputs never do
+        compress_finished_logs(self.logs_dir, ['urge_'], before, delete_before)
+
+    def _run(self):
+        """Archiver thread main loop."""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.getLogger('urge').error(f"Error compressing logs: {str(e)}")
+            self._stop.wait(self.CHECK_INTERVAL)
+
+
+def _setup_pipeline():
+    """Create the shared logs directory and queue-based handler once per process."""
+    global _logs_dir, _listener, _queue_handler
+    with _pipeline_lock:
+        if _queue_handler is not None:
+            return
+        _logs_dir = _default_logs_dir()
+        os.makedirs(_logs_dir, exist_ok=True)
+        file_handler = DailyFileHandler(_logs_dir, 'urge_')
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s'))
+        # Records are queued by the caller and written by the listener thread
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        logging.getLogger('urge').addHandler(_queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+
+
+def _stop_pipeline():
+    """Write out queued log records and remove the shared handler."""
+    global _listener, _queue_handler, _archiver
+    with _pipeline_lock:
+        if _archiver is not None:
+            _archiver.stop()
+            _archiver = None
+        if _queue_handler is not None:
+            logging.getLogger('urge').removeHandler(_queue_handler)
+            _queue_handler = None
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+atexit.register(_stop_pipeline)
+
+
+def _get_writer(logs_dir):
+    """Return the shared input writer, starting it if needed."""
+    global _writer, _rollups, _suggestions, _search, _pyramid, _risk
+    with _writer_lock:
+        if _writer is None:
+            # Storage code is only needed once something is written or read
+            from src.storage.backends import create_store
+            from src.storage.pyramid import PYRAMID_DIRNAME, CountPyramid
+            from src.storage.risk import RISK_FILENAME, RiskModel
+            from src.storage.rollups import ROLLUPS_FILENAME, RollupStore
+            from src.storage.search import SEARCH_DIRNAME, SearchIndex
+            from src.storage.suggestions import SuggestionIndex
+            from src.utils.writer import BatchWriter
+            
+            storage = Config().get('storage')
+            _rollups = RollupStore(os.path.join(logs_dir, ROLLUPS_FILENAME))
+            _suggestions = SuggestionIndex()
+            observers = [_rollups, _suggestions]
+            if storage.get('search', True):
+                _search = SearchIndex(os.path.join(logs_dir, SEARCH_DIRNAME), logs_dir)
+                observers.append(_search)
+            if storage.get('chart', True):
+                _pyramid = CountPyramid(os.path.join(logs_dir, PYRAMID_DIRNAME))
+                observers.append(_pyramid)
+            if storage.get('risk', True):
+                _risk = RiskModel(os.path.join(logs_dir, RISK_FILENAME))
+                observers.append(_risk)
+            _writer = BatchWriter(
+                [create_store(storage.get('backend'), logs_dir,
+                              index=storage.get('index', True),
+                              observers=observers)],
+                flush_mode=storage.get('flush_mode', 'interval'),
+                flush_interval_ms=storage.get('flush_interval_ms', 200),
+                fsync=storage.get('fsync', False),
+            )
+        return _writer
+
 
 class Logger:
     """Custom logger for the application."""
@@ -10,22 +197,15 @@ class Logger:
         self.logger = logging.getLogger('urge')
         self.logger.setLevel(log_level)
         
-        # Create logs directory if it doesn't exist
-        logs_dir = os.path.join(os.path.dirname(os.path.dirname(
-            os.path.dirname(os.path.abspath(__file__)))), 'logs')
-        os.makedirs(logs_dir, exist_ok=True)
-        
-        # File handler for general logs
-        log_file = os.path.join(logs_dir, f'urge_{datetime.now().strftime("%Y%m%d")}.log')
-        if not self.logger.handlers:
-            # Add handlers here
-            file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(logging.Formatter(
-                '%(asctime)s - %(levelname)s - %(message)s'))
-            self.logger.addHandler(file_handler)
-        
-        # File handler for user inputs
-        self.inputs_file = os.path.join(logs_dir, f'inputs_{datetime.now().strftime("%Y%m%d")}.log')
+        # The logs directory and handlers are shared, so this is cheap after the first call
+        if _queue_handler is None:
+            _setup_pipeline()
+        self.logs_dir = _logs_dir
+    
+    @property
+    def inputs_file(self):
+        """Path of today's inputs log."""
+        return os.path.join(self.logs_dir, inputs_filename(datetime.now().strftime("%Y%m%d")))
     
     def info(self, message):
         """Log info level message."""
@@ -39,14 +219,90 @@ class Logger:
         """Log warning level message."""
         self.logger.warning(message)
     
-    def log_input(self, text, label=None):
-        """Log user input with timestamp and selected label."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        label_info = f", Label: {label}" if label else ""
-        
-        # Log to both regular log and inputs log
-        self.logger.info(f"User input: {text}{label_info}")
-        
-        # Log to dedicated inputs file
-        with open(self.inputs_file, 'a') as f:
-            f.write(f"{timestamp} - Input: {text}{label_info}\n")
\ No newline at end of file
+    def start(self):
+        """Start the input writer and log archiver so stored state loads in the background."""
+        global _archiver
+        _get_writer(self.logs_dir)
+        with _pipeline_lock:
+            if _archiver is None:
+                settings = Config().get('logging')
+                _archiver = LogArchiver(self.logs_dir,
+                                        settings.get('compress_after_days', 2),
+                                        settings.get('retention_days'))
+                _archiver.start()
+
+    def rollups(self):
+        """Return the shared RollupStore kept current by the input writer."""
+        _get_writer(self.logs_dir)
+        return _rollups
+
+    def suggestions(self):
+        """Return the shared SuggestionIndex kept current by the input writer."""
+        _get_writer(self.logs_dir)
+        return _suggestions
+
+    def search_index(self):
+        """Return the shared SearchIndex, or None if search is disabled in config.json."""
+        _get_writer(self.logs_dir)
+        return _search
+
+    def pyramid(self):
+        """Return the shared CountPyramid, or None if the chart is disabled in config.json."""
+        _get_writer(self.logs_dir)
+        return _pyramid
+
+    def risk_model(self):
+        """Return the shared RiskModel, or None if risk prediction is disabled in config.json."""
+        _get_writer(self.logs_dir)
+        return _risk
+
+    def log_input(self, text, label=None, timestamp=None):
+        """Queue user input with timestamp and selected label for the inputs log."""
+        self.log_inputs([(text, label, timestamp)])
+
+    def log_inputs(self, inputs):
+        """Queue (text, label, timestamp) inputs in order; a None timestamp means now.
+
+        The history indexes rely on entries being written in time order. A
+        timestamp older than the last entry, or not epoch seconds up to a
+        little after now, raises ValueError before any input is queued.
+        Entries stamped now never go back past the last one, in case the
+        clock was set back.
+        """
+        global _last_timestamp
+        writer = _get_writer(self.logs_dir)
+        with _order_lock:
+            # The store knows the newest entry written before this process started
+            last = max(_last_timestamp, writer.sinks[0].last_timestamp or 0.0)
+            entries = []
+            for text, label, timestamp in inputs:
+                if timestamp is None:
+                    timestamp = max(time.time(), last)
+                else:
+                    check_timestamp(timestamp)
+                if timestamp < last:
+                    at, before = (time.strftime(TIMESTAMP_FORMAT, time.localtime(value))
+                                  for value in (timestamp, last))
+                    raise ValueError(f"Timestamp {at} is before the last entry, at {before}")
+                last = timestamp
+                entries.append(Entry(timestamp, label, text))
+            for entry in entries:
+                writer.submit(entry)
+            _last_timestamp = last
+
+    @staticmethod
+    def flush(timeout=None):
+        """Block until all queued inputs have been written."""
+        if _writer is not None:
+            return _writer.flush(timeout)
+        return True
+
+    @staticmethod
+    def shutdown():
+        """Flush queued inputs and log records and stop the background threads."""
+        global _writer
+        with _writer_lock:
+            if _writer is not None:
+                _writer.close()
+                _writer = None
+        _stop_pipeline()
\ No newline at end of file
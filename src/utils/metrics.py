@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from array import array
+
+# Log-linear buckets in the style of HdrHistogram: values below SUB_BUCKETS
+# microseconds are exact, larger ones keep 7 significant bits (< 1.6% error).
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+# Enough buckets for values up to 2**40 us (about 12 days)
+MAX_VALUE_BITS = 40
+BUCKET_COUNT = SUB_BUCKETS + (MAX_VALUE_BITS - SUB_BUCKET_BITS) * HALF_SUB_BUCKETS
+
+
+def _bucket_index(value):
+    """Return the bucket of a non-negative integer value."""
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+
+def _bucket_value(index):
+    """Return the highest value that falls in a bucket."""
+    if index < SUB_BUCKETS:
+        return index
+    shift, sub = divmod(index - SUB_BUCKETS, HALF_SUB_BUCKETS)
+    shift += 1
+    return ((sub + HALF_SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Fixed-memory histogram of latencies in microseconds."""
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = array('Q', bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, micros):
+        """Record one latency in microseconds."""
+        value = min(max(int(micros), 0), (1 << MAX_VALUE_BITS) - 1)
+        self.counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def percentile(self, percent):
+        """Return the value at the given percentile (0-100)."""
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(_bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Return count, mean and percentiles in milliseconds."""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count / 1000.0, 3) if self.count else 0,
+            'min_ms': round((self.min or 0) / 1000.0, 3),
+            'p50_ms': round(self.percentile(50) / 1000.0, 3),
+            'p90_ms': round(self.percentile(90) / 1000.0, 3),
+            'p99_ms': round(self.percentile(99) / 1000.0, 3),
+            'max_ms': round(self.max / 1000.0, 3),
+        }
+
+
+class StageTimer:
+    """Times consecutive stages of one operation into the shared histograms."""
+
+    def __init__(self, metrics, started_at=None):
+        """Start timing from started_at (a perf_counter() value) or now."""
+        self.metrics = metrics
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.last = self.started_at
+
+    def mark(self, stage):
+        """Record the time since the previous mark under the stage name."""
+        now = time.perf_counter()
+        self.metrics.record(stage, now - self.last)
+        self.last = now
+
+    def total(self, name):
+        """Record the time since the timer started; return it in milliseconds."""
+        elapsed = time.perf_counter() - self.started_at
+        self.metrics.record(name, elapsed)
+        return elapsed * 1000
+
+
+class Metrics:
+    """Process-wide registry of latency histograms keyed by stage name."""
+
+    _instance = None
+
+    def __new__(cls):
+        """Implement singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._histograms = {}
+        return cls._instance
+
+    def record(self, stage, seconds):
+        """Record a duration in seconds under a stage name."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(seconds * 1e6)
+
+    def timer(self, started_at=None):
+        """Return a StageTimer that records into this registry."""
+        return StageTimer(self, started_at)
+
+    def summary(self):
+        """Return {stage: summary dict} in first-recorded order."""
+        with self._lock:
+            return {stage: h.summary() for stage, h in self._histograms.items()}
+
+    def format_table(self):
+        """Return the p50/p99 summary as aligned text."""
+        lines = [f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for stage, s in self.summary().items():
+            lines.append(f"{stage:<22}{s['count']:>7}{s['p50_ms']:>10.2f}"
+                         f"{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """Write the summary to a JSON metrics file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'written_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+                       'stages': self.summary()}, f, indent=2)
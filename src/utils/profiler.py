@@ -0,0 +1,118 @@
+"""On-demand profiling, started and stopped from the tray menu.
+
+The sampling profiler records the stack of every thread at a fixed
+interval from a background thread, so it shows where the event loop, the
+hotkey listener and the writer spend their time at a small, bounded cost;
+its output is in the collapsed-stack format that flame graph tools read.
+The cProfile mode traces every call on the thread that starts it (the GUI
+thread) and writes a pstats file. Nothing runs while profiling is off.
+"""
+import os
+import sys
+import threading
+import time
+
+PROFILER_SAMPLING = 'sampling'
+PROFILER_CPROFILE = 'cprofile'
+
+
+class SamplingProfiler:
+    """Counts the stacks of all other threads every interval_ms."""
+
+    def __init__(self, interval_ms=10):
+        """Initialize the profiler; start() launches the sampling thread."""
+        self.interval = interval_ms / 1000.0
+        # (thread name, frames outermost first) -> samples
+        self.counts = {}
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='urge-profiler', daemon=True)
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code):
+        """Return the display name of a code object, cached."""
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = \
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self):
+        """Sampling thread main loop."""
+        own = threading.get_ident()
+        counts = self.counts
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                key = (names.get(ident, str(ident)), tuple(reversed(stack)))
+                counts[key] = counts.get(key, 0) + 1
+            self.samples += 1
+
+    def write(self, path):
+        """Write the samples as collapsed stacks: thread;outer;...;inner count."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for (thread, stack), count in sorted(self.counts.items(), key=lambda item: -item[1]):
+                f.write(';'.join((thread,) + stack).replace(' ', '_') + f" {count}\n")
+
+
+class Profiler:
+    """Toggle for one profiling session at a time, written to the logs directory."""
+
+    def __init__(self, logs_dir, mode=PROFILER_SAMPLING, interval_ms=10):
+        """Initialize the toggle; nothing runs until start()."""
+        if mode not in (PROFILER_SAMPLING, PROFILER_CPROFILE):
+            raise ValueError(f"Unknown profiler: {mode}")
+        self.logs_dir = logs_dir
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self._session = None
+        self._started_at = None
+
+    @property
+    def running(self):
+        """True while a session is recording."""
+        return self._session is not None
+
+    def start(self):
+        """Start a session; cProfile traces the calling thread only."""
+        if self._session is not None:
+            return
+        if self.mode == PROFILER_CPROFILE:
+            import cProfile
+            self._session = cProfile.Profile()
+            self._session.enable()
+        else:
+            self._session = SamplingProfiler(self.interval_ms)
+            self._session.start()
+        self._started_at = time.strftime("%Y%m%d_%H%M%S")
+
+    def stop(self):
+        """Stop the session and return the path of the profile written, or None."""
+        session, self._session = self._session, None
+        if session is None:
+            return None
+        os.makedirs(self.logs_dir, exist_ok=True)
+        if self.mode == PROFILER_CPROFILE:
+            session.disable()
+            path = os.path.join(self.logs_dir, f"profile_{self._started_at}.prof")
+            session.dump_stats(path)
+        else:
+            session.stop()
+            path = os.path.join(self.logs_dir, f"profile_{self._started_at}.folded")
+            session.write(path)
+        return path
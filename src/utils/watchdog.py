@@ -0,0 +1,115 @@
+"""Event-loop stall detection.
+
+The GUI thread calls beat() from a repeating timer. A monitor thread sleeps
+until the moment a missed beat would cross the stall threshold, so while
+the loop is healthy it wakes a few times per second and does nothing else.
+When a stall is detected the stacks of every thread are logged once, which
+shows whether the event loop, the hotkey listener or the writer thread was
+stuck; the full length of the stall is logged when the beats resume.
+"""
+import sys
+import threading
+import time
+import traceback
+
+from src.utils.metrics import Metrics
+
+# Histogram of how late each heartbeat fired, in the latency metrics
+LAG_STAGE = 'event_loop_lag'
+
+
+def format_thread_stacks(labels=None, skip=()):
+    """Return the current stack of every thread as text.
+
+    labels maps thread idents to extra notes for the heading; threads whose
+    ident is in skip are left out.
+    """
+    labels = labels or {}
+    names = {thread.ident: thread for thread in threading.enumerate()}
+    sections = []
+    for ident, frame in sys._current_frames().items():
+        if ident in skip:
+            continue
+        thread = names.get(ident)
+        heading = f"Thread {thread.name if thread else '?'} ({ident}"
+        if thread is not None and thread.daemon:
+            heading += ", daemon"
+        if ident in labels:
+            heading += f", {labels[ident]}"
+        sections.append(heading + "):\n" + ''.join(traceback.format_stack(frame)))
+    return '\n'.join(sections)
+
+
+class StallWatchdog:
+    """Detects when the thread calling beat() stops running for too long."""
+
+    def __init__(self, logger, interval_ms=100, threshold_ms=500):
+        """Initialize the watchdog; start() launches the monitor thread."""
+        self.logger = logger
+        self.metrics = Metrics()
+        self.configure(interval_ms, threshold_ms)
+        self._last_beat = None
+        self._reported = None
+        self._beat_thread = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='urge-watchdog', daemon=True)
+
+    def configure(self, interval_ms, threshold_ms, precise=True):
+        """Change the expected beat interval and the stall threshold.
+
+        Beats from a coarse timer may fire late by design, so unless precise
+        is set their lag is not recorded.
+        """
+        self.interval = interval_ms / 1000.0
+        self.threshold = max(threshold_ms, interval_ms * 2) / 1000.0
+        self.precise = precise
+
+    def start(self):
+        """Start monitoring; the first beat arms the watchdog."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop the monitor thread."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(1)
+
+    def beat(self):
+        """Record that the event loop is running; call every interval from its thread."""
+        now = time.monotonic()
+        last = self._last_beat
+        self._last_beat = now
+        if last is None:
+            self._beat_thread = threading.get_ident()
+            return
+        if self.precise:
+            self.metrics.record(LAG_STAGE, max(0.0, now - last - self.interval))
+        if self._reported == last:
+            self.logger.warning(f"Event loop resumed after a {(now - last) * 1000:.0f} ms stall")
+
+    def _run(self):
+        """Monitor thread main loop: sleep until a beat is overdue."""
+        while not self._stop.is_set():
+            last = self._last_beat
+            if last is None:
+                self._stop.wait(self.threshold)
+                continue
+            remaining = last + self.threshold - time.monotonic()
+            if remaining > 0:
+                self._stop.wait(remaining)
+                continue
+            if self._reported != last:
+                # Reported once per stall; beat() logs its end
+                self._reported = last
+                self._report(time.monotonic() - last)
+            self._stop.wait(self.threshold)
+
+    def _report(self, stalled):
+        """Log the stacks of every thread during a stall."""
+        try:
+            stacks = format_thread_stacks({self._beat_thread: 'event loop'},
+                                          skip={threading.get_ident()})
+            self.logger.warning(f"Event loop stalled for over {stalled * 1000:.0f} ms; "
+                                f"thread stacks:\n{stacks}")
+        except Exception as e:
+            self.logger.error(f"Error capturing stall stacks: {str(e)}")
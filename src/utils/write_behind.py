@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+
+
+def atomic_write(path, data):
+    """Replace path with data (bytes) so readers see the old or the new file, never a mix."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehind:
+    """Runs a save function on a background thread after changes settle.
+
+    schedule() only marks the state dirty, so callers on the UI thread never
+    wait for the disk. The save runs once no change has been scheduled for
+    delay seconds, so a burst of edits becomes one write of the latest state.
+    A failed save is logged and passed to on_error, on the writer thread.
+    """
+
+    def __init__(self, save, delay=0.5, name='urge-write-behind', on_error=None):
+        """Initialize with the function that writes the current state."""
+        self.save = save
+        self.delay = delay
+        self.name = name
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._due = 0.0
+        self._flushing = False
+        self._saving = False
+        self._closed = False
+        self._thread = None
+        self.error = None
+
+    @property
+    def pending(self):
+        """True while a save is scheduled or running."""
+        return self._dirty or self._saving
+
+    def schedule(self):
+        """Request a save of the latest state."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehind is closed")
+            self._dirty = True
+            self._due = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Save now if anything is pending; return False if it did not finish in time."""
+        with self._cond:
+            if not self._dirty and not self._saving:
+                return True
+            if self._dirty:
+                self._flushing = True
+                self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._dirty and not self._saving, timeout)
+
+    def close(self, timeout=None):
+        """Save anything pending and stop the thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Writer thread main loop."""
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if not self._dirty:
+                    return
+                # Debounce: every new change pushes the save back
+                while not self._flushing and time.monotonic() < self._due:
+                    self._cond.wait(self._due - time.monotonic())
+                self._dirty = False
+                self._flushing = False
+                self._saving = True
+            try:
+                self.save()
+                self.error = None
+            except Exception as e:
+                # Keep the error for the caller; the next change retries
+                self.error = e
+                logging.getLogger('urge').error(f"Error saving in {self.name}: {str(e)}")
+                if self.on_error is not None:
+                    try:
+                        self.on_error(e)
+                    except Exception as handler_error:
+                        logging.getLogger('urge').error(
+                            f"Error reporting a failed save: {str(handler_error)}")
+            finally:
+                with self._cond:
+                    self._saving = False
+                    self._cond.notify_all()
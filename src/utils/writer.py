@@ -0,0 +1,139 @@
+import logging
+import queue
+import threading
+import time
+
+FLUSH_ALWAYS = 'always'
+FLUSH_INTERVAL = 'interval'
+
+# Control messages passed through the queue alongside records
+_FLUSH = object()
+_STOP = object()
+
+
+class BatchWriter:
+    """Background thread that batches records and writes them to storage sinks.
+
+    Records submitted from any thread are queued and written by a single
+    writer thread in batches (group commit). With the 'always' flush mode every
+    batch is flushed as soon as it is written; with 'interval' the sinks are
+    flushed at most every flush_interval_ms. When fsync is set each flush is
+    also forced to disk.
+    """
+
+    def __init__(self, sinks, flush_mode=FLUSH_INTERVAL, flush_interval_ms=200,
+                 fsync=False, max_batch=1024):
+        """Initialize the writer and start its thread."""
+        if flush_mode not in (FLUSH_ALWAYS, FLUSH_INTERVAL):
+            raise ValueError(f"Unknown flush mode: {flush_mode}")
+        self.sinks = list(sinks)
+        self.flush_mode = flush_mode
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.fsync = fsync
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='urge-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """Queue a record for writing; never blocks on disk I/O."""
+        if self._closed:
+            raise RuntimeError("BatchWriter is closed")
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """Write and flush everything queued so far; return True when done."""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush pending records, close the sinks and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        done = threading.Event()
+        self._queue.put((_STOP, done))
+        done.wait(timeout)
+        self._thread.join(timeout)
+
+    def _run(self):
+        """Writer thread main loop."""
+        for sink in self.sinks:
+            if hasattr(sink, 'open'):
+                try:
+                    sink.open()
+                except Exception as e:
+                    logging.getLogger('urge').error(f"Error opening {type(sink).__name__}: {str(e)}")
+        dirty = False
+        last_flush = time.monotonic()
+        while True:
+            timeout = None
+            if dirty:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush_sinks()
+                dirty = False
+                last_flush = time.monotonic()
+                continue
+
+            # Drain whatever else is already queued into the same batch
+            batch = []
+            control = None
+            while True:
+                if isinstance(item, tuple) and len(item) == 2 and item[0] in (_FLUSH, _STOP):
+                    control = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_sinks(batch)
+                dirty = True
+
+            if control is not None or self.flush_mode == FLUSH_ALWAYS or \
+                    (dirty and time.monotonic() - last_flush >= self.flush_interval):
+                if dirty or control is not None:
+                    self._flush_sinks()
+                dirty = False
+                last_flush = time.monotonic()
+
+            if control is not None:
+                kind, done = control
+                if kind is _STOP:
+                    self._close_sinks()
+                    done.set()
+                    return
+                done.set()
+
+    def _write_sinks(self, batch):
+        """Hand a batch of records to every sink."""
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception as e:
+                logging.getLogger('urge').error(f"Error writing to {type(sink).__name__}: {str(e)}")
+
+    def _flush_sinks(self):
+        """Flush every sink."""
+        for sink in self.sinks:
+            try:
+                sink.flush(self.fsync)
+            except Exception as e:
+                logging.getLogger('urge').error(f"Error flushing {type(sink).__name__}: {str(e)}")
+
+    def _close_sinks(self):
+        """Close every sink."""
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logging.getLogger('urge').error(f"Error closing {type(sink).__name__}: {str(e)}")